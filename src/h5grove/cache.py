@@ -0,0 +1,196 @@
+"""Caches shared between requests"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe least-recently-used cache bounded by its number of entries.
+
+    :param maxsize: Maximum number of entries kept in the cache
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> V | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        """Returns the cached value for key, computing and storing it if missing.
+
+        The computation is done outside the lock so that slow computations
+        do not block access to other entries.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def file_identity(filepath: str | os.PathLike) -> tuple[str, int, int]:
+    """Key identifying a version of a file: (real path, modification time, size).
+
+    :param filepath: Path of the file
+    """
+    realpath = os.path.realpath(filepath)
+    stat_result = os.stat(realpath)
+    return realpath, stat_result.st_mtime_ns, stat_result.st_size
+
+
+class DiskCache:
+    """Thread-safe cache of bytes stored as files in a directory, bounded by its total size.
+
+    Least recently used entries are evicted first. Keys are hashed with their `repr`.
+    The entries of the directory are listed once, their sizes and use order being then
+    tracked in memory.
+
+    :param directory: Directory where entries are stored, created when needed with
+        permissions restricted to the current user. Defaults to a new private temporary
+        directory, so that other users cannot read nor tamper with the entries,
+        removed when the process exits.
+    :param max_bytes: Maximum total size of the entries
+    """
+
+    def __init__(self, directory: str | None, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Sizes of the entries of _entries_directory, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._entries_directory: str | None = None
+        self._total_bytes = 0
+
+    def _get_directory(self) -> str:
+        with self._lock:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="h5grove-cache-")
+                atexit.register(shutil.rmtree, self.directory, ignore_errors=True)
+            else:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            return self.directory
+
+    def _get_filepath(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self._get_directory(), digest)
+
+    def get(self, key: Hashable) -> bytes | None:
+        if self.directory is None:
+            return None
+        filepath = self._get_filepath(key)
+        try:
+            with open(filepath, "rb") as f:
+                content = f.read()
+            os.utime(filepath)  # Keep use order across restarts
+        except OSError:
+            return None
+
+        with self._lock:
+            self._track(filepath, len(content))
+        return content
+
+    def set(self, key: Hashable, content: bytes) -> None:
+        """Stores content for key. Entries that cannot be written are skipped."""
+        if len(content) > self.max_bytes:
+            return
+
+        try:
+            directory = self._get_directory()
+            filepath = self._get_filepath(key)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, filepath)
+        except OSError:
+            return
+
+        with self._lock:
+            self._track(filepath, len(content))
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._list_entries():
+                os.remove(entry.path)
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _list_entries(self) -> list[os.DirEntry]:
+        if self.directory is None:
+            return []
+        try:
+            with os.scandir(self.directory) as entries:
+                return [
+                    entry
+                    for entry in entries
+                    if entry.is_file() and not entry.name.endswith(".tmp")
+                ]
+        except FileNotFoundError:
+            return []
+
+    def _load_entries(self) -> None:
+        """Read sizes and use order of the entries when the directory changes"""
+        if self._entries_directory == self.directory:
+            return
+
+        entries = []
+        for entry in self._list_entries():
+            try:
+                stat_result = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat_result.st_mtime_ns, entry.path, stat_result.st_size))
+
+        self._entries = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self._entries_directory = self.directory
+        self._total_bytes = sum(self._entries.values())
+
+    def _track(self, filepath: str, size: int) -> None:
+        """Record an entry as most recently used"""
+        self._load_entries()
+        self._total_bytes += size - self._entries.pop(filepath, 0)
+        self._entries[filepath] = size
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,327 @@
+"""Storage information of chunked datasets, read from the HDF5 chunk index without reading data"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import cast
+
+import h5py
+import numpy as np
+
+from .cache import LRUCache, file_identity
+from .models import ReadPlan
+from .utils import get_filters, get_selection_shape
+
+
+class ChunkIndex:
+    """Location of the stored chunks of a dataset, as in the HDF5 chunk index.
+
+    Chunks that were never written are not stored and read as the fill value.
+
+    :param chunk_shape: Shape of the chunks
+    :param offsets: (number of stored chunks, ndim) array of the logical offsets of the chunks in the dataset
+    :param byte_offsets: Positions of the chunks in the file
+    :param sizes: Stored (i.e. compressed) sizes in bytes of the chunks
+    :param filter_masks: Masks of the filters that were skipped for each chunk
+    """
+
+    def __init__(
+        self,
+        chunk_shape: tuple[int, ...],
+        offsets: np.ndarray,
+        byte_offsets: np.ndarray,
+        sizes: np.ndarray,
+        filter_masks: np.ndarray,
+    ):
+        self.chunk_shape = chunk_shape
+        self.offsets = offsets
+        self.byte_offsets = byte_offsets
+        self.sizes = sizes
+        self.filter_masks = filter_masks
+        self.hashes: np.ndarray | None = None
+        """Hashes of the chunks, computed by :func:`get_chunk_hashes`"""
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def stored_bytes(self) -> int:
+        return int(np.sum(self.sizes))
+
+    def to_array(
+        self,
+        start: int = 0,
+        stop: int | None = None,
+        hashes: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Structured array of a range of the stored chunks, with fields `offset`
+        (logical offset of the chunk in the dataset), `byte_offset`, `size` and `filter_mask`.
+
+        :param start: Index of the first chunk
+        :param stop: Index after the last chunk. Defaults to the last chunk.
+        :param hashes: Hashes of all the chunks (see :func:`get_chunk_hashes`),
+            to add as a `hash` field. Default: Hashes are not included.
+        """
+        entries = slice(start, stop)
+        fields: list[tuple] = [
+            ("offset", "<i8", (len(self.chunk_shape),)),
+            ("byte_offset", "<i8"),
+            ("size", "<i8"),
+            ("filter_mask", "<u4"),
+        ]
+        if hashes is not None:
+            fields.append(("hash", hashes.dtype))
+
+        array = np.empty(len(self.sizes[entries]), dtype=fields)
+        array["offset"] = self.offsets[entries]
+        array["byte_offset"] = self.byte_offsets[entries]
+        array["size"] = self.sizes[entries]
+        array["filter_mask"] = self.filter_masks[entries]
+        if hashes is not None:
+            array["hash"] = hashes[entries]
+        return array
+
+
+CHUNK_INDEX_CACHE: LRUCache[ChunkIndex] = LRUCache(maxsize=64)
+"""Chunk indices of recently inspected datasets, keyed by file version and dataset path"""
+
+
+def _read_chunk_index(dataset: h5py.Dataset) -> ChunkIndex:
+    dsid = dataset.id
+    infos: list = []
+    if hasattr(dsid, "chunk_iter"):
+        dsid.chunk_iter(infos.append)
+    else:
+        infos = [dsid.get_chunk_info(i) for i in range(dsid.get_num_chunks())]
+
+    return ChunkIndex(
+        dataset.chunks,
+        np.array([info.chunk_offset for info in infos], dtype=np.int64).reshape(
+            len(infos), dataset.ndim
+        ),
+        np.array([info.byte_offset for info in infos], dtype=np.int64),
+        np.array([info.size for info in infos], dtype=np.int64),
+        np.array([info.filter_mask for info in infos], dtype=np.uint32),
+    )
+
+
+def get_chunk_index(dataset: h5py.Dataset) -> ChunkIndex:
+    """Index of the stored chunks of a chunked dataset, cached per file version.
+
+    :param dataset: Chunked dataset
+    """
+    key = (file_identity(dataset.file.filename), dataset.name)
+    return CHUNK_INDEX_CACHE.get_or_compute(key, lambda: _read_chunk_index(dataset))
+
+
+HASH_SIZE = 8
+"""Size in bytes of the digests of chunks. Hashes are their hexadecimal representation."""
+
+
+def hash_chunk(offset: np.ndarray, filter_mask: int, raw_chunk: bytes) -> bytes:
+    """Hash of a stored chunk, covering its offset in the dataset, its filter mask and its
+    stored (i.e. compressed) bytes.
+
+    :param offset: Logical offset of the chunk in the dataset
+    :param filter_mask: Mask of the filters that were skipped for the chunk
+    :param raw_chunk: Stored bytes of the chunk
+    """
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    digest.update(np.asarray(offset, dtype="<i8").tobytes())
+    digest.update(np.asarray(filter_mask, dtype="<u4").tobytes())
+    digest.update(raw_chunk)
+    return digest.hexdigest().encode()
+
+
+def _hash_chunks(dataset: h5py.Dataset, index: ChunkIndex) -> np.ndarray:
+    hashes = np.empty(len(index), dtype=f"S{2 * HASH_SIZE}")
+    for i, offset in enumerate(index.offsets):
+        filter_mask, raw_chunk = dataset.id.read_direct_chunk(tuple(offset))
+        hashes[i] = hash_chunk(offset, filter_mask, raw_chunk)
+    return hashes
+
+
+def get_chunk_hashes(dataset: h5py.Dataset) -> np.ndarray:
+    """Hashes of the stored chunks of a chunked dataset, in the order of its chunk index.
+
+    Stored chunks are read without decoding them. Hashes are cached with the chunk index
+    (see :func:`get_chunk_index`) rather than per chunk location, since HDF5 can rewrite
+    a chunk in place, and so that they always describe the chunks of the cached index.
+
+    :param dataset: Chunked dataset
+    :returns: Array of hexadecimal hashes (see :func:`hash_chunk`)
+    """
+    index = get_chunk_index(dataset)
+    if index.hashes is None:
+        index.hashes = _hash_chunks(dataset, index)
+    return index.hashes
+
+
+def read_chunk(dataset: h5py.Dataset, offset: tuple[int, ...]) -> np.ndarray:
+    """Decoded data of a whole chunk.
+
+    The parts of the chunks at the end of the dataset that lie outside of it are filled
+    with the fill value of the dataset.
+
+    :param dataset: Chunked dataset
+    :param offset: Logical offset of the chunk in the dataset
+    """
+    chunk_shape = cast(tuple[int, ...], dataset.chunks)
+    data = dataset[
+        tuple(
+            slice(start, min(start + chunk_length, length))
+            for start, chunk_length, length in zip(offset, chunk_shape, dataset.shape)
+        )
+    ]
+    if data.shape == chunk_shape:
+        return data
+
+    chunk = np.full(chunk_shape, dataset.fillvalue, dtype=data.dtype)
+    chunk[tuple(slice(0, length) for length in data.shape)] = data
+    return chunk
+
+
+def get_changed_chunks(
+    dataset: h5py.Dataset,
+    known_hashes: set[bytes],
+    limit: int | None = None,
+    offset: int = 0,
+) -> np.ndarray:
+    """Stored chunks whose hash is not known, with their decoded data.
+
+    :param dataset: Chunked dataset
+    :param known_hashes: Hashes of the chunks already known, as returned by :func:`get_chunk_hashes`
+    :param limit: Maximum number of changed chunks to return. Defaults to all changed chunks.
+    :param offset: Number of changed chunks to skip
+    :returns: Structured array of the changed chunks, in the order of the chunk index,
+        with fields `offset` (logical offset of the chunk in the dataset), `hash` and `data`
+        (whole chunk, see :func:`read_chunk`)
+    """
+    index = get_chunk_index(dataset)
+    hashes = get_chunk_hashes(dataset)
+    changed = np.flatnonzero([chunk_hash not in known_hashes for chunk_hash in hashes])
+    changed = changed[offset : None if limit is None else offset + limit]
+
+    chunk_shape = cast(tuple[int, ...], dataset.chunks)
+    array = np.empty(
+        len(changed),
+        dtype=[
+            ("offset", "<i8", (len(chunk_shape),)),
+            ("hash", hashes.dtype),
+            ("data", dataset.dtype, chunk_shape),
+        ],
+    )
+    for position, i in enumerate(changed):
+        array[position] = (
+            index.offsets[i],
+            hashes[i],
+            read_chunk(dataset, tuple(index.offsets[i])),
+        )
+    return array
+
+
+def get_selected_chunk_positions(
+    chunk_shape: tuple[int, ...], indices: tuple[slice | int, ...]
+) -> list[np.ndarray]:
+    """Positions in the chunk grid of the chunks touched by a selection, along each dimension.
+
+    :param chunk_shape: Shape of the chunks
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    """
+    positions = []
+    for member, chunk_length in zip(indices, chunk_shape):
+        if isinstance(member, int):
+            positions.append(np.array([member // chunk_length]))
+        elif member.start >= member.stop:
+            positions.append(np.empty(0, dtype=np.int64))
+        elif member.step < chunk_length:
+            # Every chunk up to the one of the last selected index is touched
+            last = (
+                member.start
+                + (len(range(member.start, member.stop, member.step)) - 1) * member.step
+            )
+            positions.append(
+                np.arange(member.start // chunk_length, last // chunk_length + 1)
+            )
+        else:
+            positions.append(
+                np.unique(
+                    np.arange(member.start, member.stop, member.step) // chunk_length
+                )
+            )
+    return positions
+
+
+def _count_full_positions(
+    member: slice | int,
+    chunk_length: int,
+    length: int,
+    positions: np.ndarray,
+) -> int:
+    """Number of chunk positions along a dimension whose elements are all selected"""
+    starts = positions * chunk_length
+    ends = np.minimum(starts + chunk_length, length)
+    if isinstance(member, int) or member.step > 1:
+        return int(np.count_nonzero(ends - starts == 1))
+    return int(np.count_nonzero((starts >= member.start) & (ends <= member.stop)))
+
+
+def get_read_plan(dataset: h5py.Dataset, indices: tuple[slice | int, ...]) -> ReadPlan:
+    """Plan of the read of a selection from the layout of a dataset, without reading data.
+
+    Chunks are decoded as a whole, so that the read amplification is the ratio of the
+    decoded size of the chunks touched by the selection to the size of the selection.
+
+    :param dataset: Dataset the selection applies to
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    """
+    shape = get_selection_shape(indices)
+    itemsize = dataset.dtype.itemsize
+    selected_bytes = math.prod(shape) * itemsize
+    chunk_count = full_count = partial_count = stored_count = None
+    stored_bytes = decoded_bytes = selected_bytes
+
+    if dataset.chunks is not None:
+        positions = get_selected_chunk_positions(dataset.chunks, indices)
+        chunk_count = math.prod(len(dim_positions) for dim_positions in positions)
+        full_count = math.prod(
+            _count_full_positions(member, chunk_length, length, dim_positions)
+            for member, chunk_length, length, dim_positions in zip(
+                indices, dataset.chunks, dataset.shape, positions
+            )
+        )
+
+        index = get_chunk_index(dataset)
+        touched = np.ones(len(index), dtype=bool)
+        for dim, dim_positions in enumerate(positions):
+            touched &= np.isin(
+                index.offsets[:, dim] // index.chunk_shape[dim], dim_positions
+            )
+        partial_count = chunk_count - full_count
+        stored_count = int(np.count_nonzero(touched))
+        stored_bytes = int(np.sum(index.sizes[touched]))
+        decoded_bytes = chunk_count * math.prod(dataset.chunks) * itemsize
+
+    return {
+        "selection": [
+            member
+            if isinstance(member, int)
+            else [member.start, member.stop, member.step]
+            for member in indices
+        ],
+        "shape": list(shape),
+        "dtype": dataset.dtype.str,
+        "chunk_shape": dataset.chunks,
+        "filters": get_filters(dataset),
+        "chunks": chunk_count,
+        "full_chunks": full_count,
+        "partial_chunks": partial_count,
+        "stored_chunks": stored_count,
+        "stored_bytes": stored_bytes,
+        "decoded_bytes": decoded_bytes,
+        "selected_bytes": selected_bytes,
+        "read_amplification": (
+            decoded_bytes / selected_bytes if selected_bytes > 0 else None
+        ),
+    }
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import contextlib
+import re
 from collections.abc import Callable, Sequence
 from pathlib import Path
 from typing import (
@@ -12,40 +13,80 @@ from typing import (
 
 import h5py
 import numpy as np
+import orjson
 
 try:
     import hdf5plugin  # noqa: F401
 except ImportError:
     pass
 
+from . import decoding
+from .cache import file_identity
+from .chunks import (
+    get_changed_chunks,
+    get_chunk_hashes,
+    get_chunk_index,
+    get_read_plan,
+)
+from .encoders import Response, encode, get_encoded_size, orjson_encode
+from .expression import ExpressionContent
+from .memmap import read_memmap_slice
 from .models import (
     AttributeMetadata,
+    ChunkGrid,
     DatasetMetadata,
     DatatypeMetadata,
     EntityMetadata,
     ExternalLinkMetadata,
     GroupMetadata,
     LinkResolution,
+    Peaks,
+    ReadPlan,
     ResolvedEntityMetadata,
+    ResponseCost,
     Selection,
     SoftLinkMetadata,
     Stats,
 )
+from .preview import THUMBNAIL_CACHE, get_preview_factors, render_image
+from .query import INDEX_FIELD, Predicate, count_matching_rows, filter_rows
+from .ragged import is_ragged_dtype, read_ragged
+from .reductions import (
+    get_binned_data,
+    get_binned_dtype,
+    get_binned_shape,
+    get_peaks,
+    get_profile,
+    get_radial_average,
+    get_roi_series,
+)
 from .utils import (
     NotFoundError,
     QueryArgumentError,
     attr_metadata,
     convert,
     get_array_stats,
+    get_converted_dtype,
     get_dataset_slice,
     get_entity_from_file,
     get_filters,
+    get_mask,
+    get_mask_key,
+    get_selection_key,
+    get_selection_mask,
+    get_selection_shape,
+    get_string_encoding,
     get_type_metadata,
+    get_value_size,
     hdf_path_join,
+    normalize_selection,
     open_file_with_error_fallback,
+    parse_fields,
     parse_link_resolution_arg,
+    parse_number_list,
     sorted_dict,
 )
+from .workers import offloaded
 
 
 class EntityContent:
@@ -56,7 +97,7 @@ class EntityContent:
     def __init__(self, path: str):
         self._path = path
 
-    def metadata(self) -> EntityMetadata:
+    def metadata(self, depth=None, inline_values=None) -> EntityMetadata:
         """Entity metadata"""
         return {"name": self.name, "kind": self.kind}
 
@@ -79,7 +120,7 @@ class ExternalLinkContent(EntityContent):
         self._target_file = link.filename
         self._target_path = link.path
 
-    def metadata(self, depth=None) -> ExternalLinkMetadata:
+    def metadata(self, depth=None, inline_values=None) -> ExternalLinkMetadata:
         """External link metadata"""
         return sorted_dict(
             ("target_file", self._target_file),
@@ -106,7 +147,7 @@ class SoftLinkContent(EntityContent):
         self._target_path = link.path
         """The target path of the link"""
 
-    def metadata(self, depth=None) -> SoftLinkMetadata:
+    def metadata(self, depth=None, inline_values=None) -> SoftLinkMetadata:
         """Soft link metadata"""
         return sorted_dict(
             ("target_path", self._target_path), *super().metadata().items()
@@ -138,14 +179,20 @@ class ResolvedEntityContent(EntityContent, Generic[T]):
 
         return dict((key, self._h5py_entity.attrs[key]) for key in attr_keys)
 
-    def metadata(self, depth=None) -> ResolvedEntityMetadata:
-        """Resolved entity metadata"""
+    def metadata(
+        self, depth=None, inline_values: int | None = None
+    ) -> ResolvedEntityMetadata:
+        """Resolved entity metadata
+
+        :param inline_values: Size in bytes up to which the values of attributes
+            (and of datasets) are included in the metadata. Default: Values are not included.
+        """
         attribute_names = sorted(self._h5py_entity.attrs.keys())
         return sorted_dict(
             (
                 "attributes",
                 [
-                    attr_metadata(self._h5py_entity.attrs, name)
+                    attr_metadata(self._h5py_entity.attrs, name, inline_values)
                     for name in attribute_names
                 ],
             ),
@@ -156,21 +203,46 @@ class ResolvedEntityContent(EntityContent, Generic[T]):
 class DatasetContent(ResolvedEntityContent[h5py.Dataset]):
     kind = "dataset"
 
-    def metadata(self, depth=None) -> DatasetMetadata:
-        """Dataset metadata"""
-        return sorted_dict(
-            ("chunks", self._h5py_entity.chunks),
-            ("filters", get_filters(self._h5py_entity)),
-            ("shape", self._h5py_entity.shape),
-            ("type", get_type_metadata(self._h5py_entity.id.get_type())),
-            *super().metadata().items(),
-        )
+    def __init__(
+        self, path: str, h5py_entity: h5py.Dataset, h5py_options: dict[str, Any] = {}
+    ):
+        super().__init__(path, h5py_entity)
+        self._h5py_options = h5py_options
+        """Options the file was opened with, to open it the same way in reader pool workers"""
 
+    def metadata(self, depth=None, inline_values: int | None = None) -> DatasetMetadata:
+        """Dataset metadata
+
+        :param inline_values: Size in bytes up to which the data of the dataset and the values
+            of its attributes are included in the metadata. Default: Values are not included.
+        """
+        dataset = self._h5py_entity
+        items = [
+            ("chunks", dataset.chunks),
+            ("filters", get_filters(dataset)),
+            ("shape", dataset.shape),
+            ("type", get_type_metadata(dataset.id.get_type())),
+            *super().metadata(depth, inline_values).items(),
+        ]
+        nbytes = 0 if dataset.shape is None else dataset.size * dataset.dtype.itemsize
+        if inline_values is not None and nbytes <= inline_values:
+            # The size of variable-length types only counts pointers to the values
+            value = self.data()
+            if not dataset.dtype.hasobject or get_value_size(value) <= inline_values:
+                items.append(("value", value))
+        return sorted_dict(*items)
+
+    @offloaded
     def data(
         self,
         selection: Selection | None = None,
         flatten: bool = False,
         dtype: str | None = "origin",
+        binning: str | Sequence[int] | None = None,
+        reduction: str = "mean",
+        value_range: str | Sequence[float] | None = None,
+        fields: str | Sequence[str] | None = None,
+        mask: str | None = None,
     ):
         """Dataset data.
 
@@ -179,8 +251,66 @@ class DatasetContent(ResolvedEntityContent[h5py.Dataset]):
         :param dtype: Data type conversion query parameter
           - `origin` (default): No conversion
           - `safe`: Convert to a type supported by JS typedarray (https://developer.mozilla.org/fr/docs/Web/JavaScript/Reference/Global_Objects/TypedArray)
+          - `uint8`, `uint16`, `float16`: Lossy quantization (see :func:`h5grove.utils.quantize`)
+        :param binning: Integer binning factor of each dimension of the selected data (e.g. `2,2`).
+            The data is read and binned block by block. Elements that do not fill a whole bin are dropped.
+        :param reduction: Reduction of the elements of each bin: `mean` (default), `sum`, `max` or `min`
+        :param value_range: `min,max` range of values mapped to quantized integers, or `auto` (default)
+        :param fields: Names of the fields to read from a compound dataset, comma-separated.
+            A single field is returned as a plain array.
+        :param mask: Path of a mask dataset whose masked elements are ignored when binning.
+            Requires `binning`. See :meth:`data_stats`.
         """
-        result = convert(get_dataset_slice(self._h5py_entity, selection), dtype)
+        if mask is not None and binning is None:
+            raise QueryArgumentError("mask can only be combined with bin")
+        if fields is not None:
+            if binning is not None:
+                raise QueryArgumentError("bin cannot be combined with fields")
+            names = parse_fields(fields, self._h5py_entity.dtype)
+            if self._h5py_entity.shape is not None:
+                selection = normalize_selection(selection, self._h5py_entity.shape)
+            result = convert(
+                get_dataset_slice(
+                    self._h5py_entity.fields(names[0] if len(names) == 1 else names),
+                    selection,
+                ),
+                dtype,
+                value_range,
+            )
+            return np.ravel(result) if flatten and np.ndim(result) > 0 else result
+
+        if binning is None and is_ragged_dtype(self._h5py_entity.dtype):
+            ragged = read_ragged(
+                self._h5py_entity,
+                normalize_selection(selection, self._h5py_entity.shape),
+            )
+            ragged = ragged.with_values(convert(ragged.values, dtype, value_range))
+            return ragged.flatten() if flatten and ragged.shape != () else ragged
+
+        data: np.ndarray | None
+        if binning is not None:
+            self._check_numeric()
+            data = get_binned_data(
+                self._h5py_entity,
+                normalize_selection(selection, self._h5py_entity.shape),
+                parse_number_list(binning, int),
+                reduction,
+                None if mask is None else get_mask(self._h5py_entity.file, mask),
+            )
+        else:
+            # Contiguous uncompressed data is read from a memory map, without h5py,
+            # and chunks of compressed data are decoded in parallel
+            data = read_memmap_slice(self._h5py_entity, selection)
+            if data is None and decoding.MAX_WORKERS > 1:
+                data = decoding.read_decoded(self._h5py_entity, selection)
+        if data is None:
+            dataset = self._h5py_entity
+            encoding = get_string_encoding(dataset.dtype)
+            if encoding is not None and dataset.shape is not None:
+                # Decode strings while reading rather than element by element when encoding
+                dataset = dataset.asstr(encoding)
+            data = get_dataset_slice(dataset, selection)
+        result = convert(data, dtype, value_range)
 
         # Do not flatten scalars nor h5py.Empty
         if flatten and isinstance(result, np.ndarray):
@@ -188,26 +318,607 @@ class DatasetContent(ResolvedEntityContent[h5py.Dataset]):
 
         return result
 
-    def data_stats(self, selection: Selection | None = None) -> Stats:
+    def data_cost(
+        self,
+        selection: Selection | None = None,
+        dtype: str | None = "origin",
+        binning: str | Sequence[int] | None = None,
+        reduction: str = "mean",
+        fields: str | Sequence[str] | None = None,
+        encoding: str | None = "json",
+        mask: str | None = None,
+    ) -> ResponseCost:
+        """Size of the encoded response of :meth:`data` and cost of reading it, without reading data.
+
+        The selection is resolved against the shape and dtype of the dataset and the
+        number of chunks and stored bytes to read are taken from the HDF5 chunk index.
+
+        :param selection: Slicing information
+        :param dtype: Data type conversion query parameter. See :meth:`data`.
+        :param binning: Integer binning factor of each dimension of the selected data
+        :param reduction: Reduction of the elements of each bin
+        :param fields: Names of the fields to read from a compound dataset, comma-separated
+        :param encoding: Encoding of the response. See :func:`h5grove.encoders.encode`.
+        :param mask: Path of a mask dataset. See :meth:`data`.
+        """
+        dataset = self._h5py_entity
+        if dataset.shape is None:
+            # h5py.Empty is encoded as null in JSON and as an empty content in binary
+            return {
+                "content_length": 0 if encoding == "bin" else len(orjson_encode(None)),
+                "exact": encoding in ("json", "bin", None),
+                "chunks": None,
+                "stored_bytes": 0,
+            }
+
+        indices = normalize_selection(selection, dataset.shape)
+        shape, data_dtype = self._get_data_layout(
+            indices, dtype, binning, reduction, fields, mask
+        )
+        size, exact = get_encoded_size(shape, data_dtype, encoding)
+        plan = get_read_plan(dataset, indices)
+        return {
+            "content_length": size,
+            "exact": exact,
+            "chunks": plan["chunks"],
+            "stored_bytes": plan["stored_bytes"],
+        }
+
+    def explain(
+        self,
+        selection: Selection | None = None,
+        dtype: str | None = "origin",
+        binning: str | Sequence[int] | None = None,
+        reduction: str = "mean",
+        fields: str | Sequence[str] | None = None,
+        encoding: str | None = None,
+        mask: str | None = None,
+    ) -> ReadPlan:
+        """Plan of the read of a selection, without reading data.
+
+        See :func:`h5grove.chunks.get_read_plan`.
+
+        :param selection: Slicing information
+        :param dtype: Data type conversion query parameter. See :meth:`data`.
+        :param binning: Integer binning factor of each dimension of the selected data
+        :param reduction: Reduction of the elements of each bin
+        :param fields: Names of the fields to read from a compound dataset, comma-separated
+        :param encoding: Encoding of the response to :meth:`data` whose size to include
+            in the plan. Default: The size of the response is not included.
+        :param mask: Path of a mask dataset. See :meth:`data`.
+        """
+        dataset = self._h5py_entity
+        if dataset.shape is None:
+            raise QueryArgumentError(f"{self.path} is an empty dataset")
+
+        indices = normalize_selection(selection, dataset.shape)
+        plan = get_read_plan(dataset, indices)
+        if encoding is not None:
+            shape, data_dtype = self._get_data_layout(
+                indices, dtype, binning, reduction, fields, mask
+            )
+            plan["content_length"], plan["exact_length"] = get_encoded_size(
+                shape, data_dtype, encoding
+            )
+        return plan
+
+    def _get_data_layout(
+        self,
+        indices: tuple[slice | int, ...],
+        dtype: str | None,
+        binning: str | Sequence[int] | None,
+        reduction: str,
+        fields: str | Sequence[str] | None,
+        mask: str | None = None,
+    ) -> tuple[tuple[int, ...], np.dtype]:
+        """Shape and dtype of the result of :meth:`data`, without reading data"""
+        dataset = self._h5py_entity
+        if mask is not None and binning is None:
+            raise QueryArgumentError("mask can only be combined with bin")
+        shape = get_selection_shape(indices)
+        data_dtype = dataset.dtype
+        if fields is not None:
+            if binning is not None:
+                raise QueryArgumentError("bin cannot be combined with fields")
+            names = parse_fields(fields, dataset.dtype)
+            if len(names) == 1:
+                data_dtype = dataset.dtype[names[0]]
+                shape = (*shape, *data_dtype.shape)
+                data_dtype = data_dtype.base
+            else:
+                data_dtype = np.dtype([(name, dataset.dtype[name]) for name in names])
+        elif binning is not None:
+            self._check_numeric()
+            shape = get_binned_shape(shape, parse_number_list(binning, int))
+            data_dtype = get_binned_dtype(dataset.dtype, reduction, mask is not None)
+
+        return shape, get_converted_dtype(data_dtype, dtype)
+
+    @offloaded
+    def data_stats(
+        self,
+        selection: Selection | None = None,
+        mask: str | None = None,
+        fields: str | Sequence[str] | None = None,
+    ) -> Stats | dict[str, Stats]:
         """Statistics on the data. Providing a selection will compute stats only on the selected slice.
 
         :param selection: NumPy-like indexing to define a selection as a slice
+        :param mask: Path of a mask dataset broadcast over the last dimensions of the dataset.
+            Its non-zero values flag elements to ignore. See :func:`h5grove.utils.get_mask`.
+        :param fields: For compound datasets, names of the numeric fields on which to compute stats,
+            comma-separated. Defaults to all numeric fields. Stats are then returned per field.
         """
-        data = self._get_finite_data(selection)
-
-        return get_array_stats(data)
+        if self._h5py_entity.dtype.names is not None or fields is not None:
+            return self._fields_stats(selection, mask, fields)
 
-    def _get_finite_data(self, selection: Selection) -> np.ndarray:
         data = np.asarray(self.data(selection))  # So it works with scalars
 
-        if not np.issubdtype(data.dtype, np.floating):
-            return data
+        return get_array_stats(data, self._get_valid_mask(data, selection, mask))
+
+    def data_stats_cost(
+        self,
+        selection: Selection | None = None,
+        fields: str | Sequence[str] | None = None,
+    ) -> ResponseCost:
+        """Estimated size of the encoded response of :meth:`data_stats` and cost of reading
+        the data, without reading it.
+
+        :param selection: NumPy-like indexing to define a selection as a slice
+        :param fields: For compound datasets, names of the numeric fields on which to compute stats
+        """
+        dtype = self._h5py_entity.dtype
+        stats_size = len(orjson_encode(dict.fromkeys(Stats.__annotations__, -np.pi)))
+        if dtype.names is not None or fields is not None:
+            names = (
+                [name for name in dtype.names or () if dtype[name].kind in "biuf"]
+                if fields is None
+                else parse_fields(fields, dtype)
+            )
+            size = 2 + sum(len(name) + 4 + stats_size for name in names)
+        else:
+            size = stats_size
+
+        if self._h5py_entity.shape is None:
+            chunks, stored_bytes = None, 0
+        else:
+            plan = get_read_plan(
+                self._h5py_entity,
+                normalize_selection(selection, self._h5py_entity.shape),
+            )
+            chunks, stored_bytes = plan["chunks"], plan["stored_bytes"]
+        return {
+            "content_length": size,
+            "exact": False,
+            "chunks": chunks,
+            "stored_bytes": stored_bytes,
+        }
+
+    def _fields_stats(
+        self,
+        selection: Selection | None,
+        mask: str | None,
+        fields: str | Sequence[str] | None,
+    ) -> dict[str, Stats]:
+        """Stats of fields of a compound dataset, from a single read of the fields"""
+        dtype = self._h5py_entity.dtype
+        if fields is None:
+            names = [
+                name
+                for name in dtype.names or ()
+                if dtype[name].kind in "biuf" and dtype[name].shape == ()
+            ]
+        else:
+            names = parse_fields(fields, dtype)
+            for name in names:
+                if dtype[name].kind not in "biuf" or dtype[name].shape != ():
+                    raise QueryArgumentError(f"Field {name} is not a numeric scalar")
+
+        if len(names) == 0:
+            return {}
+
+        if self._h5py_entity.shape is not None:
+            selection = normalize_selection(selection, self._h5py_entity.shape)
+        data = np.asarray(get_dataset_slice(self._h5py_entity.fields(names), selection))
+        stats = {}
+        for name in names:
+            column = data[name]
+            stats[name] = get_array_stats(
+                column, self._get_valid_mask(column, selection, mask)
+            )
+        return stats
+
+    def query(
+        self,
+        where: str,
+        fields: str | Sequence[str] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        count: bool = False,
+    ) -> np.ndarray | int:
+        """Rows of a table (one-dimensional compound dataset) matching a predicate on its fields.
+
+        The table is read in chunk-aligned blocks, reading only the fields that are needed.
+
+        :param where: Predicate on the fields, e.g. `(energy > 10) & (detector in (1, 2))`.
+            See :class:`h5grove.query.Predicate`.
+        :param fields: Names of the fields to return, comma-separated. Defaults to all fields.
+        :param limit: Maximum number of rows to return. Defaults to all matching rows.
+        :param offset: Number of matching rows to skip
+        :param count: True to return only the number of matching rows
+        :returns: Structured array of the matching rows, with their indices in an `index` field
+            followed by the requested fields, or the number of matching rows.
+        """
+        dtype = self._h5py_entity.dtype
+        if dtype.names is None or self._h5py_entity.ndim != 1:
+            raise QueryArgumentError(
+                f"{self.path} is not a table (one-dimensional compound dataset)"
+            )
+        predicate = Predicate(where, dtype)
+
+        if count:
+            return count_matching_rows(self._h5py_entity, predicate)
+
+        names = list(dtype.names) if fields is None else parse_fields(fields, dtype)
+        if INDEX_FIELD in names:
+            raise QueryArgumentError(
+                f"Field {INDEX_FIELD} is reserved for the indices of the rows"
+            )
+        if offset < 0 or (limit is not None and limit < 0):
+            raise QueryArgumentError("limit and offset must be positive")
+
+        return filter_rows(self._h5py_entity, predicate, names, limit, offset)
+
+    def chunk_index(
+        self,
+        limit: int | None = None,
+        offset: int = 0,
+        summary: bool = False,
+        hashes: bool = False,
+    ) -> np.ndarray | ChunkGrid:
+        """Location of the stored chunks of a chunked dataset, read from the HDF5 chunk index.
+
+        The index is cached per file version, so that pages can be requested one by one.
+
+        :param limit: Maximum number of chunks to return. Defaults to all chunks.
+        :param offset: Number of chunks to skip
+        :param summary: True to return only the chunk grid and the number of stored chunks
+        :param hashes: True to include the hashes of the stored bytes of the chunks.
+            See :func:`h5grove.chunks.get_chunk_hashes`.
+        :returns: Structured array of the stored chunks, in the order of the HDF5 chunk index,
+            (see :meth:`h5grove.chunks.ChunkIndex.to_array`) or the chunk grid.
+        """
+        dataset = self._h5py_entity
+        if dataset.chunks is None:
+            raise QueryArgumentError(f"{self.path} is not a chunked dataset")
+
+        index = get_chunk_index(dataset)
+        if summary:
+            return {
+                "shape": dataset.shape,
+                "chunk_shape": dataset.chunks,
+                "grid": [
+                    -(-length // chunk_length)
+                    for length, chunk_length in zip(dataset.shape, dataset.chunks)
+                ],
+                "count": len(index),
+                "stored_bytes": index.stored_bytes,
+            }
+
+        if offset < 0 or (limit is not None and limit < 0):
+            raise QueryArgumentError("limit and offset must be positive")
+        return index.to_array(
+            offset,
+            None if limit is None else offset + limit,
+            get_chunk_hashes(dataset) if hashes else None,
+        )
+
+    def changed_chunks(
+        self,
+        known_hashes: str | Sequence[str],
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> np.ndarray:
+        """Decoded data of the stored chunks of a chunked dataset whose hash is not known.
+
+        Clients mirroring a dataset send the hashes of the chunks they already have
+        (see :meth:`chunk_index`) to get only the chunks that were added or modified,
+        page by page.
+
+        :param known_hashes: Hashes of the known chunks, separated by commas or whitespace
+        :param limit: Maximum number of chunks to return. Defaults to all changed chunks.
+        :param offset: Number of changed chunks to skip
+        :returns: Structured array of the changed chunks.
+            See :func:`h5grove.chunks.get_changed_chunks`.
+        """
+        dataset = self._h5py_entity
+        if dataset.chunks is None:
+            raise QueryArgumentError(f"{self.path} is not a chunked dataset")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise QueryArgumentError("limit and offset must be positive")
+
+        hashes = (
+            re.split(r"[\s,]+", known_hashes)
+            if isinstance(known_hashes, str)
+            else known_hashes
+        )
+        return get_changed_chunks(
+            dataset,
+            {chunk_hash.strip().encode() for chunk_hash in hashes if chunk_hash},
+            limit,
+            offset,
+        )
+
+    @offloaded
+    def peaks(
+        self,
+        selection: Selection | None = None,
+        k: int = 10,
+        radius: int = 0,
+        mask: str | None = None,
+    ) -> Peaks:
+        """Greatest values of the data with their indices in the dataset, in descending order.
+
+        Non-finite and masked values are ignored.
 
-        mask = np.isfinite(data)
-        if np.all(mask):
-            return data
+        :param selection: NumPy-like indexing to define a selection as a slice
+        :param k: Number of values to find
+        :param radius: Non-maximum suppression radius: discard values within `radius` of a greater one
+        :param mask: Path of a mask dataset. See :meth:`data_stats`.
+        """
+        self._check_numeric()
+
+        return get_peaks(
+            self._h5py_entity,
+            normalize_selection(selection, self._h5py_entity.shape),
+            k,
+            radius,
+            None if mask is None else get_mask(self._h5py_entity.file, mask),
+        )
 
-        return data[mask]
+    @offloaded
+    def profile(
+        self,
+        start: str | Sequence[float],
+        end: str | Sequence[float],
+        width: int = 1,
+        method: str = "bilinear",
+        selection: Selection | None = None,
+    ) -> np.ndarray:
+        """Profile along a segment of the images stored in the last two dimensions of the dataset.
+
+        Only the chunks crossed by the segment are read.
+
+        :param start: (row, column) coordinates of the start of the segment, as a sequence or a comma-separated string
+        :param end: (row, column) coordinates of the end of the segment
+        :param width: Number of parallel segments over which the profile is averaged
+        :param method: Interpolation method: `nearest` or `bilinear` (default)
+        :param selection: NumPy-like indexing of the leading dimensions (e.g. frames of a stack).
+            The profile is computed for each selected image.
+        :returns: Profile sampled at one point per pixel length, of shape (*selected frames shape, number of samples)
+        """
+        self._check_numeric()
+        shape = self._h5py_entity.shape
+        if len(shape) < 2:
+            raise QueryArgumentError(
+                f"{self.path} is not an image or a stack of images"
+            )
+
+        start_point = parse_number_list(start)
+        end_point = parse_number_list(end)
+        if len(start_point) != 2 or len(end_point) != 2:
+            raise QueryArgumentError("start and end must be (row, column) coordinates")
+
+        return get_profile(
+            self._h5py_entity,
+            normalize_selection(selection, shape[:-2]),
+            (start_point[0], start_point[1]),
+            (end_point[0], end_point[1]),
+            width,
+            method,
+        )
+
+    @offloaded
+    def preview(
+        self,
+        selection: Selection | None = None,
+        size: int = 256,
+        colormap: str = "gray",
+        scale: str = "linear",
+        clip: str | Sequence[float] | None = None,
+        mask: str | None = None,
+    ) -> np.ndarray:
+        """Colormapped image of 2D data, binned by integer factors to fit in a given size.
+
+        :param selection: NumPy-like indexing selecting 2D data
+        :param size: Maximum number of pixels of the sides of the preview
+        :param colormap: Name of the colormap. See :data:`h5grove.preview.COLORMAPS`.
+        :param scale: `linear` (default) or `log`
+        :param clip: (low, high) percentiles of the values mapped to the ends of the colormap (e.g. `1,99`).
+            Defaults to the full range of the values.
+        :param mask: Path of a mask dataset whose masked pixels are ignored when binning.
+            Bins without unmasked pixels are transparent. See :meth:`data_stats`.
+        :returns: (height, width, 4) array of uint8 RGBA pixels
+        """
+        indices, factors, clip_range = self._get_preview_args(selection, size, clip)
+        return render_image(
+            get_binned_data(
+                self._h5py_entity,
+                indices,
+                factors,
+                mask=None if mask is None else get_mask(self._h5py_entity.file, mask),
+            ),
+            colormap,
+            scale,
+            clip_range,
+        )
+
+    def encoded_preview(
+        self,
+        selection: Selection | None = None,
+        size: int = 256,
+        colormap: str = "gray",
+        scale: str = "linear",
+        clip: str | Sequence[float] | None = None,
+        format_arg: str | None = "png",
+        mask: str | None = None,
+    ) -> Response:
+        """:meth:`preview` encoded with :func:`h5grove.encoders.encode`.
+
+        Encoded previews are cached on disk per dataset version, render parameters, mask version
+        and format (see :data:`h5grove.preview.THUMBNAIL_CACHE`). The cache is used in the
+        calling process, so that all the workers of a reader pool share it: only the
+        rendering of missing previews is offloaded.
+
+        :param format_arg: Encoding of the preview. Defaults to `png`.
+        """
+        dataset = self._h5py_entity
+        indices, _, clip_range = self._get_preview_args(selection, size, clip)
+        key = (
+            file_identity(dataset.file.filename),
+            dataset.name,
+            get_selection_key(indices),
+            size,
+            colormap,
+            scale,
+            clip_range,
+            None if mask is None else get_mask_key(dataset.file, mask),
+            format_arg,
+        )
+        cached = THUMBNAIL_CACHE.get(key)
+        if cached is not None:
+            headers, content = cached.split(b"\n", 1)
+            return Response(content, orjson.loads(headers))
+
+        response = encode(
+            self.preview(selection, size, colormap, scale, clip, mask), format_arg
+        )
+        THUMBNAIL_CACHE.set(
+            key, orjson.dumps(response.headers) + b"\n" + response.content
+        )
+        return response
+
+    def _get_preview_args(
+        self,
+        selection: Selection | None,
+        size: int,
+        clip: str | Sequence[float] | None,
+    ) -> tuple[tuple[slice | int, ...], tuple[int, ...], tuple[float, ...] | None]:
+        """Selected indices, binning factors and clip range of a preview"""
+        self._check_numeric()
+        indices = normalize_selection(selection, self._h5py_entity.shape)
+        shape = get_selection_shape(indices)
+        if len(shape) != 2:
+            raise QueryArgumentError(
+                f"Selected data must be 2D to be previewed, not {len(shape)}D"
+            )
+        clip_range = None if clip is None else parse_number_list(clip)
+        return indices, get_preview_factors(shape, size), clip_range
+
+    @offloaded
+    def radial_average(
+        self,
+        center: str | Sequence[float],
+        bins: int = 100,
+        sectors: int | None = None,
+        selection: Selection | None = None,
+        mask: str | None = None,
+    ) -> np.ndarray:
+        """Radial (and azimuthal) average of the images stored in the last two dimensions of the dataset, for each frame.
+
+        Bin maps are cached per geometry so that blocks of frames are reduced with a single bincount.
+        Non-finite and masked pixels are ignored.
+
+        :param center: (row, column) coordinates of the center, as a sequence or a comma-separated string
+        :param bins: Number of radial bins, evenly spaced from the center up to the farthest pixel
+        :param sectors: Number of azimuthal sectors. Default (None) averages over all angles.
+        :param selection: NumPy-like indexing of the leading dimensions (e.g. frames of a stack)
+        :param mask: Path of a mask dataset. See :meth:`data_stats`.
+        :returns: Array of shape (*selected frames shape, bins) or (*selected frames shape, sectors, bins)
+        """
+        self._check_numeric()
+        shape = self._h5py_entity.shape
+        if len(shape) < 2:
+            raise QueryArgumentError(
+                f"{self.path} is not an image or a stack of images"
+            )
+
+        center_point = parse_number_list(center)
+        if len(center_point) != 2:
+            raise QueryArgumentError("center must be (row, column) coordinates")
+
+        h5file = self._h5py_entity.file
+        return get_radial_average(
+            self._h5py_entity,
+            normalize_selection(selection, shape[:-2]),
+            (center_point[0], center_point[1]),
+            bins,
+            sectors,
+            None if mask is None else get_mask(h5file, mask),
+            None if mask is None else get_mask_key(h5file, mask),
+        )
+
+    @offloaded
+    def roi_series(
+        self,
+        rois: Sequence[str],
+        reduction: str = "sum",
+        selection: Selection | None = None,
+        mask: str | None = None,
+    ) -> np.ndarray:
+        """Sum or mean of regions of interest of the images stored in the last two dimensions of the dataset, for each frame.
+
+        Only the bounding boxes of the ROIs are read and results are cached per dataset version and ROI.
+        Non-finite and masked pixels are ignored.
+
+        :param rois: Rectangles as NumPy-like slices (e.g. `10:20,30:40`) or polygons as
+            semicolon-separated (row, column) vertices (e.g. `0,0;0,10;10,0`)
+        :param reduction: `sum` (default) or `mean`
+        :param selection: NumPy-like indexing of the leading dimensions (e.g. frames of a stack)
+        :param mask: Path of a mask dataset. See :meth:`data_stats`.
+        :returns: Array of shape (number of ROIs, *selected frames shape)
+        """
+        self._check_numeric()
+        shape = self._h5py_entity.shape
+        if len(shape) < 2:
+            raise QueryArgumentError(
+                f"{self.path} is not an image or a stack of images"
+            )
+
+        h5file = self._h5py_entity.file
+        return get_roi_series(
+            self._h5py_entity,
+            normalize_selection(selection, shape[:-2]),
+            rois,
+            reduction,
+            None if mask is None else get_mask(h5file, mask),
+            None if mask is None else get_mask_key(h5file, mask),
+        )
+
+    def _check_numeric(self):
+        if self._h5py_entity.dtype.kind not in "biuf":
+            raise QueryArgumentError(f"{self.path} is not a numeric dataset")
+
+    def _get_valid_mask(
+        self, data: np.ndarray, selection: Selection, mask: str | None
+    ) -> np.ndarray | None:
+        """Boolean array of finite and unmasked elements of data. None if all elements are valid."""
+        valid = None
+        if mask is not None:
+            valid = get_selection_mask(
+                get_mask(self._h5py_entity.file, mask),
+                self._h5py_entity.shape,
+                selection,
+            )
+
+        if np.issubdtype(data.dtype, np.floating):
+            finite = np.isfinite(data)
+            valid = finite if valid is None else finite & valid
+
+        if valid is None or np.all(valid):
+            return None
+
+        return valid
 
 
 class GroupContent(ResolvedEntityContent[h5py.Group]):
@@ -218,36 +929,40 @@ class GroupContent(ResolvedEntityContent[h5py.Group]):
         self._h5file = h5file
         """File in which the entity was resolved. This is needed to resolve child entity."""
 
-    def _get_child_metadata_content(self, depth=0):
+    def _get_child_metadata_content(self, depth=0, inline_values=None):
         return [
             create_content(
                 self._h5file, hdf_path_join(self._path, child_path)
-            ).metadata(depth)
+            ).metadata(depth, inline_values)
             for child_path in self._h5py_entity.keys()
         ]
 
-    def metadata(self, depth: int = 1) -> GroupMetadata:
+    def metadata(
+        self, depth: int = 1, inline_values: int | None = None
+    ) -> GroupMetadata:
         """Metadata of the group. Recursively includes child metadata if depth > 0.
 
         :parameter depth: The level of child metadata resolution.
+        :parameter inline_values: Size in bytes up to which the values of attributes and
+            datasets are included in the metadata of the group and of its children.
         """
         if depth <= 0:
-            return cast(GroupMetadata, super().metadata())
+            return cast(GroupMetadata, super().metadata(depth, inline_values))
 
         return sorted_dict(
-            ("children", self._get_child_metadata_content(depth - 1)),
-            *super().metadata().items(),
+            ("children", self._get_child_metadata_content(depth - 1, inline_values)),
+            *super().metadata(depth, inline_values).items(),
         )
 
 
 class DatatypeContent(ResolvedEntityContent[h5py.Datatype]):
     kind = "datatype"
 
-    def metadata(self, depth=None) -> DatatypeMetadata:
+    def metadata(self, depth=None, inline_values=None) -> DatatypeMetadata:
         """Datatype metadata"""
         return sorted_dict(
             ("type", get_type_metadata(self._h5py_entity.id)),
-            *super().metadata().items(),
+            *super().metadata(depth, inline_values).items(),
         )
 
 
@@ -255,6 +970,7 @@ def create_content(
     h5file: h5py.File,
     path: str | None,
     resolve_links: LinkResolution = LinkResolution.ONLY_VALID,
+    h5py_options: dict[str, Any] = {},
 ):
     """
     Factory function to get entity content from a HDF5 file.
@@ -263,6 +979,7 @@ def create_content(
     :param h5file: An open HDF5 file containing the entity
     :param path: Path to the entity in the file.
     :param resolve_links: Tells which external and soft links should be resolved. Defaults to resolving only valid links.
+    :param h5py_options: Options `h5file` was opened with, used to open it the same way in reader pool workers
     :raises h5grove.utils.PathError: If the path cannot be found in the file
     :raises h5grove.utils.LinkError: If a link cannot be resolved when resolve_links is set to LinkResolution.ALL.
     :raises TypeError: If encountering an unsupported h5py entity
@@ -279,7 +996,7 @@ def create_content(
         return SoftLinkContent(path, entity)
 
     if isinstance(entity, h5py.Dataset):
-        return DatasetContent(path, entity)
+        return DatasetContent(path, entity, h5py_options)
 
     if isinstance(entity, h5py.Group):
         return GroupContent(path, entity, h5file)
@@ -308,7 +1025,7 @@ def get_content_from_file(
 
     try:
         with open_file_with_error_fallback(filepath, create_error, h5py_options) as f:
-            yield create_content(f, path, resolve_links)
+            yield create_content(f, path, resolve_links, h5py_options)
     except NotFoundError as e:
         raise create_error(404, str(e))
     except QueryArgumentError as e:
@@ -350,3 +1067,19 @@ def get_list_of_paths(
         raise create_error(404, str(e))
     except QueryArgumentError as e:
         raise create_error(422, str(e))
+
+
+@contextlib.contextmanager
+def get_expression_from_file(
+    filepath: str | Path,
+    expression: str,
+    create_error: Callable[[int, str], Exception],
+    h5py_options: dict[str, Any] = {},
+):
+    try:
+        with open_file_with_error_fallback(filepath, create_error, h5py_options) as f:
+            yield ExpressionContent(f, expression)
+    except NotFoundError as e:
+        raise create_error(404, str(e))
+    except QueryArgumentError as e:
+        raise create_error(422, str(e))
@@ -0,0 +1,241 @@
+"""Parallel reading of chunked datasets, decoding stored chunks outside of the HDF5 library.
+
+h5py serializes all calls to the HDF5 library with a global lock, so that threads cannot
+decompress chunks in parallel through h5py. Here, stored chunks are read as they are with
+`read_direct_chunk` and decoded in a thread pool by codecs releasing the GIL.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import zlib
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import cast
+
+import h5py
+import numpy as np
+
+try:
+    import numcodecs
+except ImportError:
+    numcodecs = None
+
+from .chunks import get_selected_chunk_positions
+from .models import Selection
+from .utils import get_selection_shape, normalize_selection
+
+MIN_PARALLEL_CHUNKS = 2
+"""Minimum number of chunks touched by a selection to decode them in parallel"""
+
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+"""Number of threads decoding chunks"""
+
+
+def _unshuffle(array: np.ndarray, itemsize: int) -> np.ndarray:
+    """Reverts the HDF5 shuffle filter, which groups the bytes of same significance together"""
+    count = len(array) // itemsize
+    unshuffled = np.empty_like(array)
+    # Copying byte planes one by one is much faster than a transposition of the bytes
+    items = unshuffled[: count * itemsize].reshape(count, itemsize)
+    for i, plane in enumerate(array[: count * itemsize].reshape(itemsize, count)):
+        items[:, i] = plane
+    unshuffled[count * itemsize :] = array[count * itemsize :]
+    return unshuffled
+
+
+_Decoder = Callable[[np.ndarray, int], bytes | np.ndarray]
+
+
+def _get_decoders() -> dict[int, _Decoder]:
+    decoders: dict[int, _Decoder] = {
+        h5py.h5z.FILTER_DEFLATE: lambda buffer, _: zlib.decompress(buffer.data),
+        h5py.h5z.FILTER_SHUFFLE: _unshuffle,
+    }
+    if numcodecs is not None:
+        blosc = numcodecs.Blosc()
+        zstd = numcodecs.Zstd()
+        decoders[32001] = lambda buffer, _: blosc.decode(buffer)
+        decoders[32015] = lambda buffer, _: zstd.decode(buffer)
+    return decoders
+
+
+DECODERS = _get_decoders()
+"""Decoders of supported HDF5 filters by filter id: deflate and shuffle,
+and blosc and zstd when `numcodecs <https://numcodecs.readthedocs.io>`_ is installed.
+Decoders take the bytes to decode as an array and the item size of the dataset."""
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool decoding chunks"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS,
+            thread_name_prefix="h5grove-decoding",
+        )
+    return _executor
+
+
+def get_filter_ids(dataset: h5py.Dataset) -> list[int] | None:
+    """Ids of the filters of a dataset, in the order they are applied when writing,
+    if all of them are supported by :data:`DECODERS`. None otherwise.
+
+    :param dataset: Chunked dataset
+    """
+    create_plist = dataset.id.get_create_plist()
+    filter_ids = [
+        create_plist.get_filter(i)[0] for i in range(create_plist.get_nfilters())
+    ]
+    if any(filter_id not in DECODERS for filter_id in filter_ids):
+        return None
+    return filter_ids
+
+
+def is_decodable(dataset: h5py.Dataset) -> bool:
+    """Whether the chunks of a dataset can be decoded without the HDF5 library.
+
+    :param dataset: Dataset to check
+    """
+    return (
+        dataset.chunks is not None
+        and dataset.dtype.kind in "biufc"
+        and dataset.id.get_type().get_size() == dataset.dtype.itemsize
+        and not dataset.is_virtual
+        and get_filter_ids(dataset) is not None
+    )
+
+
+def decode_chunk(
+    raw_chunk: bytes,
+    filter_mask: int,
+    filter_ids: Sequence[int],
+    dtype: np.dtype,
+    chunk_shape: tuple[int, ...],
+) -> np.ndarray:
+    """Decode a stored chunk by reverting its filters.
+
+    :param raw_chunk: Stored bytes of the chunk
+    :param filter_mask: Mask of the filters that were skipped for the chunk
+    :param filter_ids: Ids of the filters of the dataset. See :func:`get_filter_ids`.
+    :param dtype: Data type of the dataset
+    :param chunk_shape: Shape of the chunks of the dataset
+    """
+    buffer = np.frombuffer(raw_chunk, dtype=np.uint8)
+    for i, filter_id in reversed(list(enumerate(filter_ids))):
+        if not filter_mask & (1 << i):
+            decoded = DECODERS[filter_id](buffer, dtype.itemsize)
+            buffer = np.frombuffer(decoded, dtype=np.uint8)
+    return buffer.view(dtype).reshape(chunk_shape)
+
+
+def _get_chunk_slices(
+    indices: tuple[slice, ...],
+    chunk_offset: tuple[int, ...],
+    chunk_shape: tuple[int, ...],
+) -> tuple[tuple[slice, ...], tuple[slice, ...]]:
+    """Slices of the selected part of a chunk, in the chunk and in the selected data"""
+    chunk_slices = []
+    data_slices = []
+    for member, start, length in zip(indices, chunk_offset, chunk_shape):
+        first = max(0, -(-(start - member.start) // member.step))
+        last = min(
+            len(range(member.start, member.stop, member.step)),
+            -(-(start + length - member.start) // member.step),
+        )
+        chunk_start = member.start + first * member.step - start
+        chunk_slices.append(
+            slice(
+                chunk_start,
+                chunk_start + (last - first - 1) * member.step + 1,
+                member.step,
+            )
+        )
+        data_slices.append(slice(first, last))
+    return tuple(chunk_slices), tuple(data_slices)
+
+
+def read_decoded(dataset: h5py.Dataset, selection: Selection) -> np.ndarray | None:
+    """Read a selection of a chunked dataset by decoding its chunks in parallel.
+
+    Stored chunks are read one after the other while the chunks already read are
+    decoded and copied to the selected data in the thread pool of :func:`get_executor`.
+
+    :param dataset: Dataset to read
+    :param selection: Selection as accepted by :func:`h5grove.utils.get_dataset_slice`
+    :returns: The selected data, or None if the chunks of the dataset cannot be decoded
+        (see :func:`is_decodable`) or if the selection touches too few chunks to
+        benefit from parallel decoding, in which case it must be read with h5py.
+    :raises QueryArgumentError: If the selection does not fit the shape of the dataset
+    """
+    if not is_decodable(dataset):
+        return None
+
+    chunk_shape = cast(tuple[int, ...], dataset.chunks)
+    indices = normalize_selection(selection, dataset.shape)
+    positions = get_selected_chunk_positions(chunk_shape, indices)
+    if (
+        math.prod(len(dim_positions) for dim_positions in positions)
+        < MIN_PARALLEL_CHUNKS
+    ):
+        return None
+
+    # Indices are handled as slices of length 1, removed at the end
+    slice_indices = tuple(
+        slice(member, member + 1, 1) if isinstance(member, int) else member
+        for member in indices
+    )
+    data = np.empty(
+        [
+            len(range(member.start, member.stop, member.step))
+            for member in slice_indices
+        ],
+        dtype=dataset.dtype,
+    )
+    filter_ids = cast(list[int], get_filter_ids(dataset))
+
+    def decode(
+        raw_chunk: bytes,
+        filter_mask: int,
+        chunk_slices: tuple[slice, ...],
+        data_slices: tuple[slice, ...],
+    ):
+        chunk = decode_chunk(
+            raw_chunk, filter_mask, filter_ids, dataset.dtype, chunk_shape
+        )
+        data[data_slices] = chunk[chunk_slices]
+
+    futures = []
+    for chunk_position in itertools.product(*positions):
+        chunk_offset = tuple(
+            int(position) * length
+            for position, length in zip(chunk_position, chunk_shape)
+        )
+        chunk_slices, data_slices = _get_chunk_slices(
+            slice_indices, chunk_offset, chunk_shape
+        )
+        if any(data_slice.start >= data_slice.stop for data_slice in data_slices):
+            # No selected element in this chunk
+            continue
+
+        # Only the chunks touched by the selection are looked up in the chunk index
+        if dataset.id.get_chunk_info_by_coord(chunk_offset).byte_offset is None:
+            # Chunks that were never written are read as the fill value
+            data[data_slices] = dataset.fillvalue
+            continue
+
+        filter_mask, raw_chunk = dataset.id.read_direct_chunk(chunk_offset)
+        futures.append(
+            get_executor().submit(
+                decode, raw_chunk, filter_mask, chunk_slices, data_slices
+            )
+        )
+
+    for future in futures:
+        future.result()
+
+    return data.reshape(get_selection_shape(indices))
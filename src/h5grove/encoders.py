@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import io
+import json
+import math
 import numbers
+import struct
+import zlib
 from collections.abc import Callable
 from typing import Any
 
@@ -10,7 +14,21 @@ import numpy as np
 import orjson
 import tifffile
 
-from .utils import QueryArgumentError, is_numeric_data
+from .models import ResponseCost
+from .preview import render_image
+from .ragged import RaggedArray
+from .utils import QuantizedArray, QueryArgumentError, is_numeric_data
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
 
 
 def bin_encode(array: np.ndarray) -> bytes:
@@ -21,13 +39,31 @@ def bin_encode(array: np.ndarray) -> bytes:
     return array.tobytes()
 
 
-def orjson_default(o: Any) -> list | float | str | None:
+def complex_as_float_view(array: np.ndarray) -> np.ndarray:
+    """View of a complex array as interleaved real and imaginary parts, with an extra last dimension of 2.
+
+    Arrays that are not native-endian complex64/complex128 are converted first.
+
+    :param array: Complex array
+    """
+    dtype = np.dtype(np.complex128 if array.dtype.itemsize > 16 else array.dtype)
+    array = np.ascontiguousarray(array, dtype=dtype.newbyteorder("="))
+    return array.view(array.real.dtype).reshape(*array.shape, 2)
+
+
+def orjson_default(o: Any) -> list | float | str | np.ndarray | None:
     """Converts Python objects to JSON-serializable objects.
 
     :raises TypeError: if the object is not supported."""
     if isinstance(o, np.number) and o.dtype.kind == "f" and o.itemsize > 8:
         # Force conversion of float >64bits to native float even if it means losing precision
         return float(o)
+    if isinstance(o, RaggedArray):
+        return o.to_list()
+    if isinstance(o, np.ndarray) and o.dtype.kind == "c":
+        return complex_as_float_view(o)
+    if isinstance(o, np.ndarray) and o.dtype.kind == "S":
+        return np.char.decode(o, "utf-8").tolist()
     if isinstance(o, numbers.Complex):
         return [o.real, o.imag]
     if isinstance(o, (np.generic, np.ndarray)):
@@ -41,6 +77,91 @@ def orjson_default(o: Any) -> list | float | str | None:
     raise TypeError
 
 
+COLUMN_ALIGNMENT = 8
+"""Alignment in bytes of column buffers, so that they can be viewed as JS typed arrays"""
+
+
+def columns_bin_encode(array: np.ndarray) -> tuple[bytes, list[tuple[str, str, int]]]:
+    """Encodes the fields of a structured array as contiguous column buffers.
+
+    Each column starts at an offset aligned on :data:`COLUMN_ALIGNMENT` bytes.
+
+    :param array: Structured array
+    :returns: The column buffers and their (field name, dtype, offset) layout
+    :raises QueryArgumentError: If a field has a variable-length type
+    """
+    buffers: list[bytes] = []
+    layout: list[tuple[str, str, int]] = []
+    position = 0
+    for name in array.dtype.names or ():
+        column = np.ascontiguousarray(array[name])
+        if column.dtype.hasobject:
+            raise QueryArgumentError(
+                f"Unsupported encoding bin for variable-length field {name}"
+            )
+
+        padding = -position % COLUMN_ALIGNMENT
+        buffers.append(bytes(padding))
+        position += padding
+        layout.append((name, column.dtype.str, position))
+        buffers.append(column.tobytes())
+        position += column.nbytes
+
+    return b"".join(buffers), layout
+
+
+def ragged_bin_encode(array: RaggedArray) -> bytes:
+    """Encodes variable-length rows as little-endian int64 offsets followed by the concatenated values.
+
+    There is one more offset than rows: the row i is `values[offsets[i]:offsets[i + 1]]`.
+
+    :param array: Rows to encode
+    """
+    return array.offsets.astype("<i8", copy=False).tobytes() + array.values.tobytes()
+
+
+def is_string_array(array: np.ndarray) -> bool:
+    """Whether array holds strings: bytes, str or object arrays of strings"""
+    if array.dtype.kind in "SU":
+        return True
+    if array.dtype.kind != "O" or array.size == 0:
+        return False
+    return isinstance(array.flat[0], (str, bytes))
+
+
+def string_bin_encode(array: np.ndarray) -> bytes:
+    """Encodes strings as little-endian int64 offsets followed by the concatenated UTF-8 strings.
+
+    There is one more offset than strings: the string i is `strings[offsets[i]:offsets[i + 1]]`.
+
+    :param array: Array of strings as returned by :func:`is_string_array`
+    """
+    values = np.ravel(array)
+    if values.dtype.kind in "SU":
+        encoded = (
+            values if values.dtype.kind == "S" else np.char.encode(values, "utf-8")
+        )
+        lengths = np.char.str_len(encoded).astype(np.int64)
+        # Fixed-width strings are padded with null bytes, dropped from the concatenation
+        padded = np.ascontiguousarray(encoded).view(np.uint8)
+        padded = padded.reshape(len(encoded), encoded.dtype.itemsize)
+        strings = padded[np.arange(padded.shape[1]) < lengths[:, None]].tobytes()
+    else:
+        # Object arrays are not converted to fixed-width strings, which would pad every string to the longest one
+        encoded_values = [
+            value if isinstance(value, bytes) else str(value).encode()
+            for value in values.tolist()
+        ]
+        lengths = np.fromiter(
+            map(len, encoded_values), dtype=np.int64, count=len(encoded_values)
+        )
+        strings = b"".join(encoded_values)
+
+    offsets = np.zeros(len(lengths) + 1, dtype="<i8")
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets.tobytes() + strings
+
+
 def orjson_encode(content: Any, default: Callable | None = None) -> bytes:
     """Encode in JSON using orjson.
 
@@ -53,6 +174,89 @@ def orjson_encode(content: Any, default: Callable | None = None) -> bytes:
     return orjson.dumps(content, default=default, option=orjson.OPT_SERIALIZE_NUMPY)
 
 
+MAX_JSON_DIGITS = 17
+"""Number of significant digits from which float64 values are always encoded exactly"""
+
+MAX_EXACT_POWER_OF_10 = 22
+"""Greatest power of 10 that is exactly representable in float64"""
+
+JSON_NAN_MODES = ("null", "string")
+"""Ways of encoding non-finite numbers in JSON: `null` or `"NaN"`, `"Infinity"` and `"-Infinity"`"""
+
+
+def round_significant(array: np.ndarray, digits: int) -> np.ndarray:
+    """Round floating-point values to a number of significant digits, so that their
+    shortest representation in JSON has at most that many digits.
+
+    Rounding is done by scaling by powers of 10. Values whose scaling would not be
+    exact (more than :data:`MAX_EXACT_POWER_OF_10` orders of magnitude) are kept as is.
+
+    :param array: Floating-point array
+    :param digits: Number of significant digits, between 1 and :data:`MAX_JSON_DIGITS`
+    :returns: float64 array
+    :raises QueryArgumentError: If digits is out of bounds
+    """
+    if not 0 < digits <= MAX_JSON_DIGITS:
+        raise QueryArgumentError(f"json_digits must be between 1 and {MAX_JSON_DIGITS}")
+
+    values = np.asarray(array, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exponents = digits - 1 - np.floor(np.log10(np.abs(values)))
+        # Also excludes zeros and non-finite values
+        exact = np.abs(exponents) <= MAX_EXACT_POWER_OF_10
+        scales = 10.0 ** np.where(exact, np.abs(exponents), 0)
+        rounded = np.where(
+            exponents > 0,
+            np.round(values * scales) / scales,
+            np.round(values / scales) * scales,
+        )
+    return np.where(exact, rounded, values)
+
+
+def prepare_json_numbers(
+    content: Any, digits: int | None = None, nan: str = "null"
+) -> Any:
+    """Round floating-point arrays and scalars and encode their non-finite values for JSON.
+
+    Other content is returned as is.
+
+    :param content: Content to encode in JSON
+    :param digits: Number of significant digits (see :func:`round_significant`). Default: no rounding.
+    :param nan: One of :data:`JSON_NAN_MODES`. orjson encodes non-finite numbers as `null`.
+    :raises QueryArgumentError: If an argument is invalid
+    """
+    if nan not in JSON_NAN_MODES:
+        raise QueryArgumentError(
+            f"{nan} is not a valid json_nan. Accepted values are: {', '.join(JSON_NAN_MODES)}"
+        )
+    if (
+        not isinstance(content, (np.ndarray, np.generic))
+        or content.dtype.kind not in "fc"
+        or (digits is None and nan == "null")
+    ):
+        return content
+
+    values = np.asarray(content)
+    if values.dtype.kind == "c":
+        values = complex_as_float_view(values)
+    if digits is not None:
+        values = round_significant(values, digits)
+
+    result = values
+    if nan != "null" and not np.all(np.isfinite(values)):
+        result = values.astype(object)
+        result[np.isnan(values)] = "NaN"
+        result[np.isposinf(values)] = "Infinity"
+        result[np.isneginf(values)] = "-Infinity"
+
+    if not isinstance(content, QuantizedArray):
+        return result
+    # Keep how to restore quantized values
+    quantized = result.view(QuantizedArray)
+    quantized.quantization = content.quantization
+    return quantized
+
+
 def csv_encode(data: np.ndarray) -> bytes:
     """Encodes a NumPy array in CSV.
 
@@ -83,6 +287,170 @@ def tiff_encode(data: np.ndarray) -> bytes:
         return buffer.getvalue()
 
 
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def png_encode(image: np.ndarray) -> bytes:
+    """Encodes an image in PNG.
+
+    :param: image: uint8 array of shape (height, width) for grayscale,
+        (height, width, 3) for RGB or (height, width, 4) for RGBA images
+    """
+    height, width = image.shape[:2]
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+
+    # Sub filter: difference with the previous pixel of the row
+    rows = np.ascontiguousarray(image, dtype=np.uint8).reshape(height, -1)
+    filtered = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 1
+    filtered[:, 1:] = rows
+    filtered[:, 1 + channels :] -= rows[:, :-channels]
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", header),
+            _png_chunk(b"IDAT", zlib.compress(filtered.tobytes(), 6)),
+            _png_chunk(b"IEND", b""),
+        )
+    )
+
+
+def webp_encode(image: np.ndarray) -> bytes:
+    """Encodes an image in lossless WebP. Requires Pillow.
+
+    :param: image: uint8 array as accepted by :func:`png_encode`
+    :raises QueryArgumentError: If Pillow is not installed
+    """
+    if Image is None:
+        raise QueryArgumentError("webp encoding requires Pillow to be installed")
+
+    with io.BytesIO() as buffer:
+        Image.fromarray(np.ascontiguousarray(image, dtype=np.uint8)).save(
+            buffer, format="WEBP", lossless=True
+        )
+        return buffer.getvalue()
+
+
+def _as_image(data: np.ndarray) -> np.ndarray:
+    """RGB(A) uint8 arrays are kept as is, other 2D arrays are rendered with a gray colormap"""
+    if data.dtype == np.uint8 and data.ndim == 3 and data.shape[2] in (3, 4):
+        return data
+    if data.ndim == 2:
+        return render_image(data)
+    raise QueryArgumentError(
+        "Image encodings require 2D data or (height, width, 3|4) uint8 arrays"
+    )
+
+
+ARROW_BATCH_SIZE = 16 * 1024**2
+"""Approximate size in bytes of the record batches of Arrow IPC streams"""
+
+
+def _arrow_values(values: np.ndarray):
+    """Arrow array of a 1D array of numbers or strings"""
+    if values.dtype.kind == "S":
+        return pyarrow.array(np.char.decode(values, "utf-8"), type=pyarrow.string())
+    if values.dtype.kind in "UO" and (values.size == 0 or is_string_array(values)):
+        return pyarrow.array(
+            [
+                value.decode() if isinstance(value, bytes) else value
+                for value in values.tolist()
+            ],
+            type=pyarrow.string(),
+        )
+    if values.dtype.kind in "biuf":
+        return pyarrow.array(values.astype(values.dtype.newbyteorder("="), copy=False))
+    raise QueryArgumentError(f"Unsupported encoding arrow for {values.dtype} data")
+
+
+def _arrow_rows(values: np.ndarray):
+    """Arrow array of the rows of an array along its first dimension.
+
+    Rows of nD arrays are encoded as fixed-size lists of their flattened elements.
+    """
+    flat_values = _arrow_values(values.reshape(-1))
+    if values.ndim <= 1:
+        return flat_values
+    return pyarrow.FixedSizeListArray.from_arrays(
+        flat_values, math.prod(values.shape[1:])
+    )
+
+
+def arrow_encode(content: np.ndarray | RaggedArray) -> bytes:
+    """Encodes data as an Apache Arrow IPC stream of record batches. Requires pyarrow.
+
+    - Compound data is flattened, with one column per field.
+    - Other data is encoded in a single `data` column, split in rows along its first dimension:
+      the rows of nD arrays are fixed-size lists and variable-length rows are large lists.
+    - Strings are encoded as UTF-8 string columns.
+
+    The shape of the data is stored as a JSON list in the `shape` metadata of the schema.
+    Batches hold about :data:`ARROW_BATCH_SIZE` bytes so that clients can process them one at a time.
+
+    The encoding is not streamed: `content` is already read as a whole and the IPC stream
+    is built in memory, as any other encoding, so that the size of the data to encode
+    must be bounded by the caller.
+
+    :param content: Array or ragged array to encode
+    :raises QueryArgumentError: If pyarrow is not installed or the dtype is not supported
+    """
+    if pyarrow is None:
+        raise QueryArgumentError("arrow encoding requires pyarrow to be installed")
+
+    get_columns: Callable[[int, int], dict[str, Any]]
+    if isinstance(content, RaggedArray):
+        ragged = content.flatten()
+        row_count = ragged.size
+        nbytes = ragged.offsets.nbytes + ragged.values.nbytes
+
+        def get_columns(start: int, stop: int) -> dict[str, Any]:
+            offsets = ragged.offsets[start : stop + 1]
+            values = ragged.values[offsets[0] : offsets[-1]]
+            return {
+                "data": pyarrow.LargeListArray.from_arrays(
+                    offsets - offsets[0], _arrow_values(values)
+                )
+            }
+
+    else:
+        array = np.asarray(content)
+        names = array.dtype.names
+        rows = array.reshape(-1) if names is not None or array.ndim == 0 else array
+        row_count = len(rows)
+        nbytes = rows.nbytes
+
+        def get_columns(start: int, stop: int) -> dict[str, Any]:
+            block = rows[start:stop]
+            if names is None:
+                return {"data": _arrow_rows(block)}
+            return {name: _arrow_rows(block[name]) for name in names}
+
+    batch_length = max(1, ARROW_BATCH_SIZE // max(1, nbytes // max(1, row_count)))
+    metadata = {"shape": json.dumps(content.shape)}
+
+    sink = pyarrow.BufferOutputStream()
+    writer = None
+    for start in range(0, max(1, row_count), batch_length):
+        batch = pyarrow.RecordBatch.from_pydict(
+            get_columns(start, min(start + batch_length, row_count))
+        )
+        if writer is None:
+            writer = pyarrow.ipc.new_stream(sink, batch.schema.with_metadata(metadata))
+        writer.write_batch(batch)
+    if writer is not None:
+        writer.close()
+    return sink.getvalue().to_pybytes()
+
+
 class Response:
     content: bytes
     """ Encoded `content` as bytes """
@@ -94,34 +462,293 @@ class Response:
         self.headers = {**headers, "Content-Length": str(len(content))}
 
 
-def encode(content: Any, encoding: str | None = "json") -> Response:
+def get_quantization_headers(array: QuantizedArray) -> dict[str, str]:
+    """Headers describing how to restore the values of a quantized array.
+
+    `X-H5grove-Scale` and `X-H5grove-Offset` give `value = quantized * scale + offset` and
+    `X-H5grove-Nan`, when present, the quantized value standing for NaN.
+    """
+    quantization = array.quantization
+    if quantization is None:
+        return {}
+
+    headers = {
+        "X-H5grove-Scale": repr(quantization["scale"]),
+        "X-H5grove-Offset": repr(quantization["offset"]),
+    }
+    if quantization["nan"] is not None:
+        headers["X-H5grove-Nan"] = str(quantization["nan"])
+    return headers
+
+
+def encode(
+    content: Any,
+    encoding: str | None = "json",
+    json_digits: int | None = None,
+    json_nan: str = "null",
+) -> Response:
     """Encode content in given encoding.
 
     Warning: Not all encodings supports all types of content.
+    Quantized arrays (see :func:`h5grove.utils.quantize`) are encoded as plain arrays
+    with :func:`get_quantization_headers`.
 
     :param content: Content to encode
     :param encoding:
         - `json` (default)
-        - `bin`: nD array/scalars in bytes
+        - `bin`: nD array/scalars in bytes, with their shape as a JSON list in the
+          `X-H5grove-Shape` header and their dtype (e.g. `<f4`) in the `X-H5grove-Dtype` header.
+          `h5py.Empty` is encoded as an empty content with a `null` shape.
+          Strings are encoded with :func:`string_bin_encode`
+          and variable-length rows with :func:`ragged_bin_encode`.
+          Fields of compound data are encoded as columns with :func:`columns_bin_encode`.
         - `csv`: nD arrays in downloadable csv files
         - `npy`: nD arrays in downloadable npy files
         - `tiff`: 2D arrays in downloadable TIFF files
+        - `png`: 2D arrays rendered with an autoscaled gray colormap, or RGB(A) uint8 images
+        - `webp`: Same as `png` in lossless WebP (requires Pillow)
+        - `arrow`: Apache Arrow IPC stream encoded with :func:`arrow_encode` (requires pyarrow)
+    :param json_digits: For `json` encoding, number of significant digits to which
+        floating-point data is rounded. Default: Full precision.
+    :param json_nan: For `json` encoding, `null` (default) or `string` to encode
+        non-finite numbers as `"NaN"`, `"Infinity"` and `"-Infinity"`.
+        See :func:`prepare_json_numbers`.
     :returns: A Response object containing content and headers
     :raises QueryArgumentError: If encoding is not among the ones above.
     """
+    if encoding in ("json", None):
+        content = prepare_json_numbers(content, json_digits, json_nan)
+
+    if isinstance(content, RaggedArray):
+        response = _encode_ragged(content, encoding)
+        values = content.values
+    else:
+        values = content
+        if isinstance(content, QuantizedArray):
+            content = content.view(np.ndarray)
+        response = _encode(content, encoding)
+
+    if isinstance(values, QuantizedArray):
+        response.headers.update(get_quantization_headers(values))
+
+    if encoding == "bin":
+        # Let clients decode binary responses without requesting metadata first
+        shape = (
+            None
+            if isinstance(content, h5py.Empty)
+            else list(
+                np.shape(content)
+                if not isinstance(content, RaggedArray)
+                else content.shape
+            )
+        )
+        response.headers["X-H5grove-Shape"] = json.dumps(shape, separators=(",", ":"))
+
+    return _expose_h5grove_headers(response)
+
+
+def _expose_h5grove_headers(response: Response) -> Response:
+    """Let browsers read h5grove headers in cross-origin requests"""
+    h5grove_headers = [
+        name for name in response.headers if name.startswith("X-H5grove")
+    ]
+    if h5grove_headers:
+        response.headers["Access-Control-Expose-Headers"] = ", ".join(h5grove_headers)
+    return response
+
+
+def _get_json_element_size(dtype: np.dtype) -> int:
+    """Estimated average size in bytes of an element of an array encoded in JSON, separator included"""
+    if dtype.kind == "b":
+        return 6
+    if dtype.kind in "iu":
+        return len(str(np.iinfo(dtype).max)) // 2 + 1
+    if dtype.kind == "f":
+        return 21 if dtype.itemsize >= 8 else 12
+    if dtype.kind == "c":
+        return 2 * _get_json_element_size(np.dtype(f"f{dtype.itemsize // 2}")) + 2
+    if dtype.names is not None:
+        return sum(
+            _get_json_element_size(dtype[name].base) * math.prod(dtype[name].shape)
+            for name in dtype.names
+        )
+    if dtype.kind == "S":
+        return dtype.itemsize + 3
+    return 16
+
+
+def get_encoded_size(
+    shape: tuple[int, ...], dtype: np.dtype, encoding: str | None = "json"
+) -> tuple[int, bool]:
+    """Size in bytes of the encoding of an array, without encoding it.
+
+    Sizes are exact for the `bin` and `npy` encodings of numeric and compound data
+    and estimated otherwise.
+
+    :param shape: Shape of the array
+    :param dtype: Data type of the array
+    :param encoding: See :func:`encode`
+    :returns: (size, whether the size is exact)
+    """
+    size = math.prod(shape)
+    is_numeric = dtype.kind in "biufc"
+
+    if encoding == "bin" and dtype.names is not None and not dtype.hasobject:
+        position = 0
+        for name in dtype.names:
+            position += -position % COLUMN_ALIGNMENT + size * dtype[name].itemsize
+        return position, True
+
+    if encoding == "bin" and is_numeric:
+        return size * dtype.itemsize, True
+
+    if encoding == "bin":
+        # Strings: offsets followed by the strings
+        string_size = dtype.itemsize if dtype.kind == "S" else 16
+        return (size + 1) * 8 + size * string_size, False
+
+    if encoding == "npy" and is_numeric:
+        header = {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": shape,
+        }
+        with io.BytesIO() as buffer:
+            try:
+                np.lib.format.write_array_header_1_0(buffer, header)
+            except ValueError:
+                np.lib.format.write_array_header_2_0(buffer, header)
+            return buffer.tell() + size * dtype.itemsize, True
+
+    if encoding in ("json", None):
+        return size * _get_json_element_size(dtype) + 2 * max(1, len(shape)), False
+
+    if encoding == "csv":
+        # Values formatted as %.18e with a separator
+        return size * 25, False
+
+    return size * dtype.itemsize, False
+
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "bin": "application/octet-stream",
+    "npy": "application/octet-stream",
+    "csv": "text/csv",
+    "tiff": "image/tiff",
+    "png": "image/png",
+    "webp": "image/webp",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+"""Content type of the responses of each encoding"""
+
+
+def encode_cost(cost: ResponseCost, encoding: str | None = "json") -> Response:
+    """Response to a HEAD request, describing the response to the GET request in its headers.
+
+    - `Content-Type`: Content type of the response to the GET request
+    - `Content-Length`: Size of the content of the response to the GET request
+    - `X-H5grove-Exact-Length`: `true` if `Content-Length` is exact, `false` if it is estimated
+    - `X-H5grove-Chunks`: Number of chunks read, for chunked datasets
+    - `X-H5grove-Stored-Bytes`: Number of bytes read from the file, compressed if the data is
+
+    :param cost: Cost of the GET request
+    :param encoding: Encoding of the response to the GET request. See :func:`encode`.
+    """
+    headers = {
+        "Content-Type": CONTENT_TYPES.get(
+            encoding or "json", "application/octet-stream"
+        ),
+        "X-H5grove-Exact-Length": "true" if cost["exact"] else "false",
+        "X-H5grove-Stored-Bytes": str(cost["stored_bytes"]),
+    }
+    if cost["chunks"] is not None:
+        headers["X-H5grove-Chunks"] = str(cost["chunks"])
+
+    response = Response(b"", headers=headers)
+    response.headers["Content-Length"] = str(cost["content_length"])
+    return _expose_h5grove_headers(response)
+
+
+def _encode_ragged(content: RaggedArray, encoding: str | None) -> Response:
+    if encoding in ("json", None):
+        return Response(
+            orjson_encode(content),
+            headers={"Content-Type": "application/json"},
+        )
+
+    if encoding == "bin":
+        return Response(
+            ragged_bin_encode(content),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-H5grove-Offsets": str(len(content.offsets)),
+                "X-H5grove-Dtype": content.values.dtype.str,
+            },
+        )
+
+    if encoding == "arrow":
+        return Response(
+            arrow_encode(content),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+        )
+
+    raise QueryArgumentError(
+        f"Unsupported encoding {encoding} for variable-length data"
+    )
+
+
+def _encode(content: Any, encoding: str | None) -> Response:
     if encoding in ("json", None):
         return Response(
             orjson_encode(content),
             headers={"Content-Type": "application/json"},
         )
 
+    if encoding == "bin" and isinstance(content, h5py.Empty):
+        # Datasets with a null dataspace have no data but a dtype
+        return Response(
+            b"",
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-H5grove-Dtype": content.dtype.str,
+            },
+        )
+
     content_array = np.asarray(content)
 
+    if encoding == "arrow":
+        return Response(
+            arrow_encode(content_array),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+        )
+
+    if encoding == "bin" and content_array.dtype.names is not None:
+        columns, layout = columns_bin_encode(content_array)
+        return Response(
+            columns,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-H5grove-Fields": json.dumps(layout, separators=(",", ":")),
+            },
+        )
+
+    if encoding == "bin" and is_string_array(content_array):
+        return Response(
+            string_bin_encode(content_array),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-H5grove-Offsets": str(content_array.size + 1),
+            },
+        )
+
     if encoding == "bin":
+        # Complex numbers are encoded with an interleaved (real, imaginary) layout
         return Response(
             bin_encode(content_array),
             headers={
                 "Content-Type": "application/octet-stream",
+                "X-H5grove-Dtype": content_array.dtype.str,
             },
         )
 
@@ -162,4 +789,16 @@ def encode(content: Any, encoding: str | None = "json") -> Response:
             },
         )
 
+    if encoding == "png":
+        return Response(
+            png_encode(_as_image(content_array)),
+            headers={"Content-Type": "image/png"},
+        )
+
+    if encoding == "webp":
+        return Response(
+            webp_encode(_as_image(content_array)),
+            headers={"Content-Type": "image/webp"},
+        )
+
     raise QueryArgumentError(f"Unsupported encoding {encoding}")
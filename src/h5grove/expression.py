@@ -0,0 +1,491 @@
+"""Lazy evaluation of array expressions combining datasets of a file.
+
+Expressions use a restricted NumPy-like syntax where datasets are referenced
+by their path as string literals, e.g. `('/entry/data' - '/entry/dark') / '/entry/I0'[:, None, None]`.
+"""
+
+from __future__ import annotations
+
+import ast
+import math
+from collections.abc import Callable, Iterator, Sequence
+from typing import Any
+
+import h5py
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+from .models import LinkResolution, Stats
+from .reductions import bin_blocks
+from .utils import (
+    QueryArgumentError,
+    StatsAccumulator,
+    convert,
+    get_aligned_blocks,
+    get_entity_from_file,
+    get_selection_shape,
+    normalize_selection,
+    parse_number_list,
+)
+
+MAX_EXPRESSION_LENGTH = 1024
+"""Maximum number of characters of an expression"""
+
+BLOCK_SIZE = 64 * 1024**2
+"""Approximate size in bytes of the blocks in which expressions are evaluated"""
+
+_BINARY_OPERATORS: dict[type, tuple[Callable, str | None]] = {
+    ast.Add: (np.add, "+"),
+    ast.Sub: (np.subtract, "-"),
+    ast.Mult: (np.multiply, "*"),
+    ast.Div: (np.true_divide, "/"),
+    ast.FloorDiv: (np.floor_divide, None),
+    ast.Mod: (np.mod, "%"),
+    ast.Pow: (np.power, "**"),
+    ast.BitAnd: (np.bitwise_and, "&"),
+    ast.BitOr: (np.bitwise_or, "|"),
+    ast.Lt: (np.less, "<"),
+    ast.LtE: (np.less_equal, "<="),
+    ast.Gt: (np.greater, ">"),
+    ast.GtE: (np.greater_equal, ">="),
+    ast.Eq: (np.equal, "=="),
+    ast.NotEq: (np.not_equal, "!="),
+}
+
+_UNARY_OPERATORS: dict[type, tuple[Callable, str]] = {
+    ast.USub: (np.negative, "-"),
+    ast.UAdd: (np.positive, "+"),
+    ast.Invert: (np.invert, "~"),
+}
+
+_FUNCTIONS: dict[str, tuple[Callable, bool]] = {
+    # name: (NumPy function, supported by numexpr)
+    "abs": (np.abs, True),
+    "sqrt": (np.sqrt, True),
+    "exp": (np.exp, True),
+    "log": (np.log, True),
+    "log10": (np.log10, True),
+    "sin": (np.sin, True),
+    "cos": (np.cos, True),
+    "tan": (np.tan, True),
+    "arcsin": (np.arcsin, True),
+    "arccos": (np.arccos, True),
+    "arctan": (np.arctan, True),
+    "arctan2": (np.arctan2, True),
+    "where": (np.where, True),
+    "minimum": (np.minimum, False),
+    "maximum": (np.maximum, False),
+}
+
+_NUMEXPR_DTYPES = {np.dtype(t) for t in ("?", "<i4", "<i8", "<f4", "<f8")}
+
+
+class _Node:
+    def evaluate(self, values: list[np.ndarray]) -> Any:
+        raise NotImplementedError
+
+    def numexpr_str(self) -> str | None:
+        """Expression in numexpr syntax. None if not supported by numexpr."""
+        raise NotImplementedError
+
+
+class _Constant(_Node):
+    def __init__(self, value: int | float):
+        self.value = value
+
+    def evaluate(self, values):
+        return self.value
+
+    def numexpr_str(self):
+        return repr(self.value)
+
+
+class _Operand(_Node):
+    """Reference to a (sliced) dataset"""
+
+    def __init__(
+        self, position: int, dataset: h5py.Dataset, items: list[slice | int | None]
+    ):
+        self.position = position
+        self.dataset = dataset
+        self.items = items
+        """One int or slice per dataset dimension, with None for inserted axes"""
+        self.shape = tuple(
+            1 if item is None else get_selection_shape((item,))[0]
+            for item in items
+            if not isinstance(item, int)
+        )
+
+    def evaluate(self, values):
+        return values[self.position]
+
+    def numexpr_str(self):
+        return f"v{self.position}"
+
+    def _first_axis_item(self) -> int | None:
+        for i, item in enumerate(self.items):
+            if not isinstance(item, int):
+                return i
+        return None
+
+    def is_split_along(self, shape: tuple[int, ...]) -> bool:
+        """Whether the operand must be read block by block along the first axis of shape"""
+        if len(self.shape) < len(shape) or self.shape[0] != shape[0]:
+            return False
+        index = self._first_axis_item()
+        return index is not None and isinstance(self.items[index], slice)
+
+    def chunk_rows(self) -> tuple[int, int] | None:
+        """(chunk size along the first axis, offset of the first row in that chunk)"""
+        index = self._first_axis_item()
+        if index is None or self.dataset.chunks is None:
+            return None
+        item = self.items[index]
+        if not isinstance(item, slice) or item.step != 1:
+            return None
+        dim = sum(1 for other in self.items[:index] if other is not None)
+        chunk_size = self.dataset.chunks[dim]
+        return chunk_size, item.start % chunk_size
+
+    def read(self, block: slice | None = None) -> np.ndarray:
+        """Read the operand, or only a block of its first axis"""
+        items = list(self.items)
+        if block is not None:
+            index = self._first_axis_item()
+            item = None if index is None else items[index]
+            if index is None or not isinstance(item, slice):
+                raise ValueError("Operand is not sliced along the first axis")
+            rows = range(item.start, item.stop, item.step)[block]
+            items[index] = slice(rows.start, rows.stop, rows.step)
+
+        h5py_index = tuple(item for item in items if item is not None)
+        data = np.asarray(self.dataset[h5py_index] if h5py_index else self.dataset[()])
+
+        if None not in items:
+            return data
+        return data[
+            tuple(
+                np.newaxis if item is None else slice(None)
+                for item in items
+                if not isinstance(item, int)
+            )
+        ]
+
+
+class _UnaryOp(_Node):
+    def __init__(self, func: Callable, symbol: str, operand: _Node):
+        self.func = func
+        self.symbol = symbol
+        self.operand = operand
+
+    def evaluate(self, values):
+        return self.func(self.operand.evaluate(values))
+
+    def numexpr_str(self):
+        operand = self.operand.numexpr_str()
+        return None if operand is None else f"({self.symbol}{operand})"
+
+
+class _BinOp(_Node):
+    def __init__(self, func: Callable, symbol: str | None, left: _Node, right: _Node):
+        self.func = func
+        self.symbol = symbol
+        self.left = left
+        self.right = right
+
+    def evaluate(self, values):
+        return self.func(self.left.evaluate(values), self.right.evaluate(values))
+
+    def numexpr_str(self):
+        left = self.left.numexpr_str()
+        right = self.right.numexpr_str()
+        if self.symbol is None or left is None or right is None:
+            return None
+        return f"({left} {self.symbol} {right})"
+
+
+class _Call(_Node):
+    def __init__(self, name: str, args: list[_Node]):
+        self.name = name
+        self.args = args
+
+    def evaluate(self, values):
+        func, _ = _FUNCTIONS[self.name]
+        return func(*(arg.evaluate(values) for arg in self.args))
+
+    def numexpr_str(self):
+        _, numexpr_support = _FUNCTIONS[self.name]
+        args = [arg.numexpr_str() for arg in self.args]
+        if not numexpr_support or None in args:
+            return None
+        return f"{self.name}({', '.join(args)})"  # type: ignore
+
+
+class ExpressionContent:
+    """Array expression over datasets of a file, evaluated lazily block by block.
+
+    :param h5file: File containing the datasets used in the expression
+    :param expression: Expression where datasets are referenced by their path as string literals.
+        Operands support basic slicing and `None` to insert axes for broadcasting.
+        Supported operators are arithmetic operators, comparisons, `&`, `|` and `~`, and
+        functions are limited to `abs`, `sqrt`, `exp`, `log`, `log10`, trigonometric functions,
+        `where`, `minimum` and `maximum`.
+    :param block_size: Approximate size in bytes of the evaluated blocks
+    :raises QueryArgumentError: If the expression is invalid
+    :raises h5grove.utils.NotFoundError: If a dataset of the expression cannot be found
+    """
+
+    def __init__(
+        self, h5file: h5py.File, expression: str, block_size: int = BLOCK_SIZE
+    ):
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise QueryArgumentError(
+                f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters"
+            )
+
+        self._h5file = h5file
+        self._block_size = block_size
+        self._operands: list[_Operand] = []
+
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise QueryArgumentError(f"Invalid expression: {e.msg}")
+
+        self._root = self._parse_node(tree.body)
+        if len(self._operands) == 0:
+            raise QueryArgumentError("Expression does not reference any dataset")
+
+        try:
+            self._shape = np.broadcast_shapes(*(op.shape for op in self._operands))
+        except ValueError:
+            raise QueryArgumentError(
+                f"Shapes {[op.shape for op in self._operands]} of expression operands cannot be broadcast together"
+            )
+
+        with np.errstate(all="ignore"):
+            self._dtype = np.asarray(
+                self._evaluate_root(
+                    [np.ones((), dtype=op.dataset.dtype) for op in self._operands]
+                )
+            ).dtype
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the result"""
+        return self._shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Data type of the result"""
+        return self._dtype
+
+    def _parse_node(self, node: ast.AST) -> _Node:
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                return self._add_operand(node.value, [])
+            if isinstance(node.value, (int, float)) and not isinstance(
+                node.value, bool
+            ):
+                return _Constant(node.value)
+
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Constant):
+            if isinstance(node.value.value, str):
+                items = (
+                    node.slice.elts
+                    if isinstance(node.slice, ast.Tuple)
+                    else [node.slice]
+                )
+                return self._add_operand(
+                    node.value.value, [self._parse_index_item(item) for item in items]
+                )
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            func, symbol = _BINARY_OPERATORS[type(node.op)]
+            return _BinOp(
+                func, symbol, self._parse_node(node.left), self._parse_node(node.right)
+            )
+
+        if (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and type(node.ops[0]) in _BINARY_OPERATORS
+        ):
+            func, symbol = _BINARY_OPERATORS[type(node.ops[0])]
+            return _BinOp(
+                func,
+                symbol,
+                self._parse_node(node.left),
+                self._parse_node(node.comparators[0]),
+            )
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            func, symbol = _UNARY_OPERATORS[type(node.op)]
+            return _UnaryOp(func, symbol, self._parse_node(node.operand))
+
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in _FUNCTIONS
+            and len(node.keywords) == 0
+        ):
+            return _Call(node.func.id, [self._parse_node(arg) for arg in node.args])
+
+        raise QueryArgumentError(f"Unsupported expression element: {ast.unparse(node)}")
+
+    def _parse_index_item(self, node: ast.AST) -> slice | int | None:
+        if isinstance(node, ast.Constant) and node.value is None:
+            return None
+        if isinstance(node, ast.Slice):
+            return slice(
+                *(
+                    None if bound is None else self._parse_int(bound)
+                    for bound in (node.lower, node.upper, node.step)
+                )
+            )
+        return self._parse_int(node)
+
+    def _parse_int(self, node: ast.AST) -> int:
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._parse_int(node.operand)
+        if (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, int)
+            and not isinstance(node.value, bool)
+        ):
+            return node.value
+        raise QueryArgumentError(f"Unsupported index: {ast.unparse(node)}")
+
+    def _add_operand(self, path: str, items: list[slice | int | None]) -> _Operand:
+        dataset = get_entity_from_file(self._h5file, path, LinkResolution.ALL)
+        if not isinstance(dataset, h5py.Dataset) or dataset.dtype.kind not in "biuf":
+            raise QueryArgumentError(f"{path} is not a numeric dataset")
+
+        dims_index = normalize_selection(
+            tuple(item for item in items if item is not None), dataset.shape
+        )
+        remaining_dims = iter(dims_index)
+        normalized: list[slice | int | None] = [
+            None if item is None else next(remaining_dims) for item in items
+        ]
+        normalized.extend(remaining_dims)
+
+        operand = _Operand(len(self._operands), dataset, normalized)
+        self._operands.append(operand)
+        return operand
+
+    def _get_blocks(self, split_operands: list[_Operand]) -> Iterator[slice]:
+        row_size = max(1, math.prod(self._shape[1:]) * max(8, self._dtype.itemsize))
+
+        # Align blocks on the chunks of the first operand that is chunked along the first axis
+        for operand in split_operands:
+            chunk_rows = operand.chunk_rows()
+            if chunk_rows is not None:
+                chunk_size, offset = chunk_rows
+                return get_aligned_blocks(
+                    self._shape[0], self._block_size // row_size, chunk_size, offset
+                )
+
+        return get_aligned_blocks(self._shape[0], self._block_size // row_size)
+
+    def _evaluate_root(self, values: list[np.ndarray]):
+        try:
+            return self._root.evaluate(values)
+        except QueryArgumentError:
+            raise
+        except (
+            ValueError,
+            TypeError,
+            ArithmeticError,
+        ) as e:  # e.g. integers to negative integer powers or out of bounds constants
+            raise QueryArgumentError(f"Cannot evaluate expression: {e}")
+
+    def _evaluate(self, values: list[np.ndarray], shape: tuple[int, ...]):
+        expression = self._root.numexpr_str()
+        with np.errstate(all="ignore"):
+            result = None
+            if (
+                numexpr is not None
+                and expression is not None
+                and all(value.dtype in _NUMEXPR_DTYPES for value in values)
+            ):
+                try:
+                    result = numexpr.evaluate(
+                        expression,
+                        local_dict={f"v{i}": value for i, value in enumerate(values)},
+                    )
+                except (KeyError, TypeError, ValueError):
+                    pass  # Fallback to NumPy evaluation
+
+            if result is None:
+                result = self._evaluate_root(values)
+
+        return np.broadcast_to(np.asarray(result, dtype=self._dtype), shape)
+
+    def iter_blocks(self) -> Iterator[tuple[slice | None, np.ndarray]]:
+        """Evaluate the expression block by block along its first axis.
+
+        Operands that are broadcast along the first axis are read only once.
+
+        :returns: Iterator of (slice of the first axis, evaluated block).
+            The slice is None for scalar results.
+        """
+        if len(self._shape) == 0:
+            yield None, self._evaluate([op.read() for op in self._operands], ())
+            return
+
+        split_operands = [op for op in self._operands if op.is_split_along(self._shape)]
+        whole_values = {
+            op.position: op.read() for op in self._operands if op not in split_operands
+        }
+
+        for block in self._get_blocks(split_operands):
+            values = [
+                op.read(block) if op in split_operands else whole_values[op.position]
+                for op in self._operands
+            ]
+            block_shape = (block.stop - block.start, *self._shape[1:])
+            yield block, self._evaluate(values, block_shape)
+
+    def data(
+        self,
+        flatten: bool = False,
+        dtype: str | None = "origin",
+        binning: str | Sequence[int] | None = None,
+        reduction: str = "mean",
+    ) -> np.ndarray:
+        """Result of the expression.
+
+        :param flatten: True to flatten the returned array
+        :param dtype: Data type conversion query parameter (see :meth:`h5grove.content.DatasetContent.data`)
+        :param binning: Integer binning factor of each dimension of the result (e.g. `2,2`).
+            The result is binned block by block as it is evaluated, so that it is never held
+            in memory as a whole. Elements that do not fill a whole bin are dropped.
+        :param reduction: Reduction of the elements of each bin: `mean` (default), `sum`, `max` or `min`
+        """
+        if binning is not None:
+            result = bin_blocks(
+                (values for _, values in self.iter_blocks()),
+                self._shape,
+                self._dtype,
+                parse_number_list(binning, int),
+                reduction,
+            )
+        else:
+            result = np.empty(self._shape, dtype=self._dtype)
+            for block, values in self.iter_blocks():
+                result[() if block is None else block] = values
+
+        result = convert(result, dtype)
+        return np.ravel(result) if flatten else result
+
+    def data_stats(self) -> Stats:
+        """Statistics on the result of the expression, computed block by block"""
+        accumulator = StatsAccumulator()
+        for _, values in self.iter_blocks():
+            accumulator.update(values)
+        return accumulator.result()
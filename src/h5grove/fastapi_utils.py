@@ -12,18 +12,32 @@ from .content import (
     DatasetContent,
     ResolvedEntityContent,
     get_content_from_file,
+    get_expression_from_file,
     get_list_of_paths,
 )
-from .encoders import encode
+from .encoders import encode, encode_cost
 
 __all__ = [
     "router",
     "settings",
     "get_root",
     "get_attr",
+    "get_chunks",
     "get_data",
+    "get_expr",
+    "get_expr_stats",
     "get_meta",
+    "get_peaks",
+    "get_preview",
+    "get_profile",
+    "get_query",
+    "get_radial",
+    "get_roi",
     "get_stats",
+    "post_data",
+    "head_data",
+    "head_meta",
+    "head_stats",
 ]
 
 
@@ -101,6 +115,31 @@ def get_attr(
         )
 
 
+@router.get("/chunks")
+def get_chunks(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    limit: int | None = None,
+    offset: int = 0,
+    summary: bool = False,
+    hashes: bool = False,
+    format: str = "json",
+):
+    """`/chunks` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        result = content.chunk_index(limit, offset, summary, hashes)
+        h5grove_response = encode(result, "json" if summary else format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+async def get_body(request: Request) -> str:
+    return (await request.body()).decode()
+
+
 @router.get("/data")
 def get_data(
     file: str = Depends(add_base_path),
@@ -109,13 +148,104 @@ def get_data(
     format: str = "json",
     flatten: bool = False,
     selection=None,
+    bin: str | None = None,
+    reduce: str = "mean",
+    range: str | None = None,
+    fields: str | None = None,
+    mask: str | None = None,
+    json_digits: int | None = None,
+    json_nan: str = "null",
+    explain: bool = False,
+    known_hashes: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
 ):
     """`/data` endpoint handler"""
     with get_content_from_file(file, path, create_error) as content:
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        data = content.data(selection, flatten, dtype)
-        h5grove_response = encode(data, format)
+        if explain:
+            plan = content.explain(selection, dtype, bin, reduce, fields, format, mask)
+            h5grove_response = encode(plan, "json")
+        elif known_hashes is not None:
+            changed = content.changed_chunks(known_hashes, limit, offset)
+            h5grove_response = encode(changed, format)
+        else:
+            data = content.data(
+                selection, flatten, dtype, bin, reduce, range, fields, mask
+            )
+            h5grove_response = encode(data, format, json_digits, json_nan)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.post("/data")
+def post_data(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    format: str = "json",
+    limit: int | None = None,
+    offset: int = 0,
+    known_hashes: str = Depends(get_body),
+):
+    """`/data` POST endpoint handler, with the known hashes in the request body"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        changed = content.changed_chunks(known_hashes, limit, offset)
+        h5grove_response = encode(changed, format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.head("/data")
+def head_data(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    dtype: str = "origin",
+    format: str = "json",
+    selection=None,
+    bin: str | None = None,
+    reduce: str = "mean",
+    fields: str | None = None,
+    mask: str | None = None,
+):
+    """`/data` HEAD endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        cost = content.data_cost(selection, dtype, bin, reduce, fields, format, mask)
+        h5grove_response = encode_cost(cost, format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/expr")
+def get_expr(
+    file: str = Depends(add_base_path),
+    expr: str = "",
+    dtype: str = "origin",
+    format: str = "json",
+    flatten: bool = False,
+    bin: str | None = None,
+    reduce: str = "mean",
+):
+    """`/expr` endpoint handler"""
+    with get_expression_from_file(file, expr, create_error) as content:
+        h5grove_response = encode(content.data(flatten, dtype, bin, reduce), format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/expr/stats")
+def get_expr_stats(file: str = Depends(add_base_path), expr: str = ""):
+    """`/expr/stats` endpoint handler"""
+    with get_expression_from_file(file, expr, create_error) as content:
+        h5grove_response = encode(content.data_stats(), "json")
         return Response(
             content=h5grove_response.content, headers=h5grove_response.headers
         )
@@ -126,23 +256,195 @@ def get_meta(
     file: str = Depends(add_base_path),
     path: str = "/",
     resolve_links: str = "only_valid",
+    inline_values: int | None = None,
 ):
     """`/meta` endpoint handler"""
 
     with get_content_from_file(file, path, create_error, resolve_links) as content:
-        h5grove_response = encode(content.metadata(), "json")
+        metadata = content.metadata(inline_values=inline_values)
+        h5grove_response = encode(metadata, "json")
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.head("/meta")
+def head_meta(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    resolve_links: str = "only_valid",
+    inline_values: int | None = None,
+):
+    """`/meta` HEAD endpoint handler"""
+    response = get_meta(file, path, resolve_links, inline_values)
+    return Response(content=b"", headers=response.headers)
+
+
+@router.get("/peaks")
+def get_peaks(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    selection=None,
+    k: int = 10,
+    radius: int = 0,
+    mask: str | None = None,
+):
+    """`/peaks` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        h5grove_response = encode(content.peaks(selection, k, radius, mask), "json")
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/preview")
+def get_preview(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    selection=None,
+    size: int = 256,
+    colormap: str = "gray",
+    scale: str = "linear",
+    clip: str | None = None,
+    format: str = "png",
+    mask: str | None = None,
+):
+    """`/preview` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        h5grove_response = content.encoded_preview(
+            selection, size, colormap, scale, clip, format, mask
+        )
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/profile")
+def get_profile(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    start: str = "",
+    end: str = "",
+    width: int = 1,
+    method: str = "bilinear",
+    selection=None,
+    format: str = "json",
+):
+    """`/profile` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.profile(start, end, width, method, selection)
+        h5grove_response = encode(data, format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/query")
+def get_query(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    where: str = "",
+    fields: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    count: bool = False,
+    format: str = "json",
+):
+    """`/query` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        result = content.query(where, fields, limit, offset, count)
+        h5grove_response = encode(result, "json" if count else format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/radial")
+def get_radial(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    center: str = "",
+    bins: int = 100,
+    sectors: int | None = None,
+    selection=None,
+    mask: str | None = None,
+    format: str = "json",
+):
+    """`/radial` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.radial_average(center, bins, sectors, selection, mask)
+        h5grove_response = encode(data, format)
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.get("/roi")
+def get_roi(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    roi: list[str] = Query(default=[]),
+    reduce: str = "sum",
+    selection=None,
+    mask: str | None = None,
+    format: str = "json",
+):
+    """`/roi` endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.roi_series(roi, reduce, selection, mask)
+        h5grove_response = encode(data, format)
         return Response(
             content=h5grove_response.content, headers=h5grove_response.headers
         )
 
 
 @router.get("/stats")
-def get_stats(file: str = Depends(add_base_path), path: str = "/", selection=None):
+def get_stats(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    selection=None,
+    mask: str | None = None,
+    fields: str | None = None,
+    explain: bool = False,
+):
     """`/stats` endpoint handler"""
     with get_content_from_file(file, path, create_error) as content:
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        h5grove_response = encode(content.data_stats(selection), "json")
+        if explain:
+            h5grove_response = encode(content.explain(selection), "json")
+        else:
+            stats = content.data_stats(selection, mask, fields)
+            h5grove_response = encode(stats, "json")
+        return Response(
+            content=h5grove_response.content, headers=h5grove_response.headers
+        )
+
+
+@router.head("/stats")
+def head_stats(
+    file: str = Depends(add_base_path),
+    path: str = "/",
+    selection=None,
+    fields: str | None = None,
+):
+    """`/stats` HEAD endpoint handler"""
+    with get_content_from_file(file, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        h5grove_response = encode_cost(content.data_stats_cost(selection, fields))
         return Response(
             content=h5grove_response.content, headers=h5grove_response.headers
         )
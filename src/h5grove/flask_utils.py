@@ -9,21 +9,33 @@ from typing import Any
 from flask import Blueprint, Request, Response, current_app, request
 from werkzeug.exceptions import HTTPException
 
+from . import encoders
 from .content import (
     DatasetContent,
     ResolvedEntityContent,
     get_content_from_file,
+    get_expression_from_file,
     get_list_of_paths,
 )
-from .encoders import encode
-from .utils import parse_bool_arg
+from .encoders import encode, encode_cost
+from .models import ResponseCost
+from .utils import parse_bool_arg, parse_int_arg
 
 __all__ = [
     "root_route",
     "attr_route",
+    "chunks_route",
     "data_route",
+    "expr_route",
+    "expr_stats_route",
     "meta_route",
     "paths_route",
+    "peaks_route",
+    "preview_route",
+    "profile_route",
+    "query_route",
+    "radial_route",
+    "roi_route",
     "stats_route",
     "URL_RULES",
     "BLUEPRINT",
@@ -31,15 +43,31 @@ __all__ = [
 
 
 def make_encoded_response(
-    content, format_arg: str | None = "json", status: int | None = None
+    content,
+    format_arg: str | None = "json",
+    status: int | None = None,
+    json_digits: int | None = None,
+    json_nan: str = "null",
 ) -> Response:
     """Prepare flask Response according to format"""
-    h5grove_response = encode(content, format_arg)
+    h5grove_response = encode(content, format_arg, json_digits, json_nan)
     response = Response(h5grove_response.content, status=status)
     response.headers.update(h5grove_response.headers)
     return response
 
 
+def make_h5grove_response(h5grove_response: encoders.Response) -> Response:
+    """Prepare flask Response from an already encoded response"""
+    response = Response(h5grove_response.content)
+    response.headers.update(h5grove_response.headers)
+    return response
+
+
+def make_cost_response(cost: ResponseCost, format_arg: str | None = "json") -> Response:
+    """Prepare flask Response to a HEAD request"""
+    return make_h5grove_response(encode_cost(cost, format_arg))
+
+
 def get_filename(a_request: Request) -> str:
     file_path = a_request.args.get("file")
     if file_path is None:
@@ -74,6 +102,24 @@ def attr_route():
         return make_encoded_response(content.attributes(attr_keys))
 
 
+def chunks_route():
+    """`/chunks` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    format_arg = request.args.get("format")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        limit_arg = request.args.get("limit")
+        limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+        offset = parse_int_arg(request.args.get("offset"), fallback=0)
+        summary = parse_bool_arg(request.args.get("summary"), fallback=False)
+        hashes = parse_bool_arg(request.args.get("hashes"), fallback=False)
+        result = content.chunk_index(limit, offset, summary, hashes)
+        return make_encoded_response(result, "json" if summary else format_arg)
+
+
 def data_route():
     """`/data` endpoint handler"""
     filename = get_filename(request)
@@ -82,12 +128,87 @@ def data_route():
     format_arg = request.args.get("format")
     dtype = request.args.get("dtype", None)
     flatten = parse_bool_arg(request.args.get("flatten"), fallback=False)
+    binning = request.args.get("bin")
+    reduction = request.args.get("reduce", "mean")
+    value_range = request.args.get("range")
+    fields = request.args.get("fields")
+    mask = request.args.get("mask")
+    json_nan = request.args.get("json_nan", "null")
+    explain = parse_bool_arg(request.args.get("explain"), fallback=False)
+    known_hashes = (
+        request.get_data(as_text=True)
+        if request.method == "POST"
+        else request.args.get("known_hashes")
+    )
 
     with get_content_from_file(filename, path, create_error) as content:
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        data = content.data(selection, flatten, dtype)
-        return make_encoded_response(data, format_arg)
+        if explain:
+            return make_encoded_response(
+                content.explain(
+                    selection,
+                    dtype,
+                    binning,
+                    reduction,
+                    fields,
+                    format_arg or "json",
+                    mask,
+                )
+            )
+        if known_hashes is not None:
+            limit_arg = request.args.get("limit")
+            limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+            offset = parse_int_arg(request.args.get("offset"), fallback=0)
+            return make_encoded_response(
+                content.changed_chunks(known_hashes, limit, offset), format_arg
+            )
+        if request.method == "HEAD":
+            return make_cost_response(
+                content.data_cost(
+                    selection, dtype, binning, reduction, fields, format_arg, mask
+                ),
+                format_arg,
+            )
+        digits_arg = request.args.get("json_digits")
+        json_digits = (
+            None if digits_arg is None else parse_int_arg(digits_arg, fallback=0)
+        )
+        data = content.data(
+            selection, flatten, dtype, binning, reduction, value_range, fields, mask
+        )
+        return make_encoded_response(
+            data, format_arg, json_digits=json_digits, json_nan=json_nan
+        )
+
+
+# Known hashes of large datasets do not fit in a URL: they can be sent as a POST body
+data_route.methods = ["GET", "POST"]  # type: ignore[attr-defined]
+
+
+def expr_route():
+    """`/expr` endpoint handler"""
+    filename = get_filename(request)
+    expression = request.args.get("expr", "")
+    format_arg = request.args.get("format")
+    dtype = request.args.get("dtype", None)
+    flatten = parse_bool_arg(request.args.get("flatten"), fallback=False)
+    binning = request.args.get("bin")
+    reduction = request.args.get("reduce", "mean")
+
+    with get_expression_from_file(filename, expression, create_error) as content:
+        return make_encoded_response(
+            content.data(flatten, dtype, binning, reduction), format_arg
+        )
+
+
+def expr_stats_route():
+    """`/expr/stats` endpoint handler"""
+    filename = get_filename(request)
+    expression = request.args.get("expr", "")
+
+    with get_expression_from_file(filename, expression, create_error) as content:
+        return make_encoded_response(content.data_stats())
 
 
 def meta_route():
@@ -97,7 +218,11 @@ def meta_route():
     resolve_links = request.args.get("resolve_links", None)
 
     with get_content_from_file(filename, path, create_error, resolve_links) as content:
-        return make_encoded_response(content.metadata())
+        inline_arg = request.args.get("inline_values")
+        inline_values = (
+            None if inline_arg is None else parse_int_arg(inline_arg, fallback=0)
+        )
+        return make_encoded_response(content.metadata(inline_values=inline_values))
 
 
 def paths_route():
@@ -109,24 +234,152 @@ def paths_route():
         return make_encoded_response(paths)
 
 
+def peaks_route():
+    """`/peaks` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    selection = request.args.get("selection")
+    mask = request.args.get("mask")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        k = parse_int_arg(request.args.get("k"), fallback=10)
+        radius = parse_int_arg(request.args.get("radius"), fallback=0)
+        return make_encoded_response(content.peaks(selection, k, radius, mask))
+
+
+def preview_route():
+    """`/preview` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    selection = request.args.get("selection")
+    colormap = request.args.get("colormap", "gray")
+    scale = request.args.get("scale", "linear")
+    clip = request.args.get("clip")
+    format_arg = request.args.get("format", "png")
+    mask = request.args.get("mask")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        size = parse_int_arg(request.args.get("size"), fallback=256)
+        return make_h5grove_response(
+            content.encoded_preview(
+                selection, size, colormap, scale, clip, format_arg, mask
+            )
+        )
+
+
+def profile_route():
+    """`/profile` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    start = request.args.get("start", "")
+    end = request.args.get("end", "")
+    method = request.args.get("method", "bilinear")
+    selection = request.args.get("selection")
+    format_arg = request.args.get("format")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        width = parse_int_arg(request.args.get("width"), fallback=1)
+        data = content.profile(start, end, width, method, selection)
+        return make_encoded_response(data, format_arg)
+
+
+def query_route():
+    """`/query` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    where = request.args.get("where", "")
+    fields = request.args.get("fields")
+    format_arg = request.args.get("format")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        limit_arg = request.args.get("limit")
+        limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+        offset = parse_int_arg(request.args.get("offset"), fallback=0)
+        count = parse_bool_arg(request.args.get("count"), fallback=False)
+        result = content.query(where, fields, limit, offset, count)
+        return make_encoded_response(result, "json" if count else format_arg)
+
+
+def radial_route():
+    """`/radial` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    center = request.args.get("center", "")
+    selection = request.args.get("selection")
+    mask = request.args.get("mask")
+    format_arg = request.args.get("format")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        bins = parse_int_arg(request.args.get("bins"), fallback=100)
+        sectors_arg = request.args.get("sectors")
+        sectors = (
+            None if sectors_arg is None else parse_int_arg(sectors_arg, fallback=1)
+        )
+        data = content.radial_average(center, bins, sectors, selection, mask)
+        return make_encoded_response(data, format_arg)
+
+
+def roi_route():
+    """`/roi` endpoint handler"""
+    filename = get_filename(request)
+    path = request.args.get("path")
+    rois = request.args.getlist("roi")
+    reduction = request.args.get("reduce", "sum")
+    selection = request.args.get("selection")
+    mask = request.args.get("mask")
+    format_arg = request.args.get("format")
+
+    with get_content_from_file(filename, path, create_error) as content:
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.roi_series(rois, reduction, selection, mask)
+        return make_encoded_response(data, format_arg)
+
+
 def stats_route():
     """`/stats` endpoint handler"""
     filename = get_filename(request)
     path = request.args.get("path")
     selection = request.args.get("selection")
+    mask = request.args.get("mask")
+    fields = request.args.get("fields")
+    explain = parse_bool_arg(request.args.get("explain"), fallback=False)
 
     with get_content_from_file(filename, path, create_error) as content:
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        return make_encoded_response(content.data_stats(selection))
+        if explain:
+            return make_encoded_response(content.explain(selection))
+        if request.method == "HEAD":
+            return make_cost_response(content.data_stats_cost(selection, fields))
+        return make_encoded_response(content.data_stats(selection, mask, fields))
 
 
 URL_RULES = {
     "/": root_route,
     "/attr": attr_route,
+    "/chunks": chunks_route,
     "/data": data_route,
+    "/expr": expr_route,
+    "/expr/stats": expr_stats_route,
     "/meta": meta_route,
     "/paths": paths_route,
+    "/peaks": peaks_route,
+    "/preview": preview_route,
+    "/profile": profile_route,
+    "/query": query_route,
+    "/radial": radial_route,
+    "/roi": roi_route,
     "/stats": stats_route,
 }
 """Mapping of Flask URL endpoints to handlers"""
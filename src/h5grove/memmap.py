@@ -0,0 +1,95 @@
+"""Reads of contiguous uncompressed datasets through memory maps of their file.
+
+Such datasets are stored as one block of bytes in the file, which can be read directly
+from the page cache instead of going through the HDF5 library and the global h5py lock.
+"""
+
+from __future__ import annotations
+
+import os
+
+import h5py
+import numpy as np
+
+from .models import Selection
+from .utils import normalize_selection
+
+
+def get_memmap_offset(dataset: h5py.Dataset) -> int | None:
+    """Position in its file of the data of a dataset that can be memory-mapped, None otherwise.
+
+    Datasets can be memory-mapped if they are numeric, stored contiguously without filters
+    nor external storage in a file opened with the default driver, and fully allocated.
+
+    :param dataset: Dataset to check
+    """
+    if (
+        dataset.shape is None
+        or dataset.size == 0
+        or dataset.dtype.kind not in "biufc"
+        or dataset.file.driver != "sec2"
+        or dataset.is_virtual
+    ):
+        return None
+
+    dsid = dataset.id
+    create_plist = dsid.get_create_plist()
+    if (
+        create_plist.get_layout() != h5py.h5d.CONTIGUOUS
+        or create_plist.get_nfilters() > 0
+        or create_plist.get_external_count() > 0
+        or dsid.get_type().get_size() != dataset.dtype.itemsize
+    ):
+        return None
+
+    nbytes = dataset.size * dataset.dtype.itemsize
+    offset = dsid.get_offset()
+    # The offset of non-allocated datasets is not reliable in files with a user block
+    if offset is None or dsid.get_storage_size() != nbytes:
+        return None
+    # Mapping bytes past the end of the file would crash the process when read
+    if offset + nbytes > os.path.getsize(dataset.file.filename):
+        return None
+    return offset
+
+
+def get_memmap(dataset: h5py.Dataset) -> np.ndarray | None:
+    """Read-only array mapping the data of a dataset in memory, None if it cannot be mapped.
+
+    See :func:`get_memmap_offset`. Reading the array after its file was truncated crashes
+    the process: it must not be kept longer than needed.
+
+    :param dataset: Dataset to map
+    """
+    offset = get_memmap_offset(dataset)
+    if offset is None:
+        return None
+
+    try:
+        mapped = np.memmap(
+            dataset.file.filename,
+            dtype=dataset.dtype,
+            mode="r",
+            offset=offset,
+            shape=dataset.shape,
+        )
+    except (OSError, ValueError):
+        return None
+    return np.asarray(mapped)
+
+
+def read_memmap_slice(dataset: h5py.Dataset, selection: Selection) -> np.ndarray | None:
+    """Selected data of a dataset, copied from a memory map of its file.
+
+    The selected data is copied so that it does not depend on the file once returned.
+
+    :param dataset: Dataset to read
+    :param selection: Selection as accepted by :func:`h5grove.utils.get_dataset_slice`
+    :returns: The selected data, or None if the dataset cannot be memory-mapped,
+        in which case it must be read with h5py.
+    :raises QueryArgumentError: If the selection does not fit the shape of the dataset
+    """
+    mapped = get_memmap(dataset)
+    if mapped is None:
+        return None
+    return mapped[normalize_selection(selection, mapped.shape)].copy()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import TypedDict
+from typing import Any, TypedDict
 
 import h5py
 from typing_extensions import NotRequired
@@ -65,6 +65,7 @@ class AttributeMetadata(TypedDict):
     name: str
     shape: tuple
     type: TypeMetadata
+    value: NotRequired[Any]
 
 
 class ResolvedEntityMetadata(EntityMetadata):
@@ -80,12 +81,58 @@ class DatasetMetadata(ResolvedEntityMetadata):
     filters: tuple
     shape: tuple
     type: TypeMetadata
+    value: NotRequired[Any]
 
 
 class DatatypeMetadata(ResolvedEntityMetadata):
     type: TypeMetadata
 
 
+class Peaks(TypedDict):
+    values: list[int | float]
+    indices: list[list[int]]
+
+
+class ResponseCost(TypedDict):
+    content_length: int
+    exact: bool
+    chunks: int | None
+    stored_bytes: int
+
+
+class ChunkGrid(TypedDict):
+    shape: tuple
+    chunk_shape: tuple
+    grid: list[int]
+    count: int
+    stored_bytes: int
+
+
+class ReadPlan(TypedDict):
+    selection: list[int | list[int]]
+    shape: list[int]
+    dtype: str
+    chunk_shape: tuple | None
+    filters: list | None
+    chunks: int | None
+    full_chunks: int | None
+    partial_chunks: int | None
+    stored_chunks: int | None
+    stored_bytes: int
+    decoded_bytes: int
+    selected_bytes: int
+    read_amplification: float | None
+    content_length: NotRequired[int]
+    exact_length: NotRequired[bool]
+
+
+class Quantization(TypedDict):
+    dtype: str
+    scale: float
+    offset: float
+    nan: int | None
+
+
 class Stats(TypedDict):
     strict_positive_min: int | float | None
     positive_min: int | float | None
@@ -0,0 +1,158 @@
+"""Rendering of datasets as small colormapped images"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+from .cache import DiskCache
+from .utils import QueryArgumentError
+
+_COLORMAP_COLORS = {
+    "gray": ("#000000", "#ffffff"),
+    "viridis": (
+        "#440154",
+        "#472d7b",
+        "#3b528b",
+        "#2c728e",
+        "#21918c",
+        "#28ae80",
+        "#5ec962",
+        "#addc30",
+        "#fde725",
+    ),
+    "inferno": (
+        "#000004",
+        "#1f0c48",
+        "#550f6d",
+        "#88226a",
+        "#ba3655",
+        "#e35933",
+        "#f98e09",
+        "#f9cb35",
+        "#fcffa4",
+    ),
+    "magma": (
+        "#000004",
+        "#1c1044",
+        "#4f127b",
+        "#812581",
+        "#b5367a",
+        "#e55064",
+        "#fb8861",
+        "#fec287",
+        "#fcfdbf",
+    ),
+}
+
+COLORMAPS = tuple(_COLORMAP_COLORS)
+"""Names of the available colormaps"""
+
+SCALES = ("linear", "log")
+"""Names of the available scales"""
+
+MAX_PREVIEW_SIZE = 2048
+"""Maximum size in pixels of the largest side of a preview"""
+
+THUMBNAIL_CACHE = DiskCache(
+    os.environ.get("H5GROVE_THUMBNAIL_DIR"), max_bytes=256 * 1024**2
+)
+"""On-disk cache of encoded previews, keyed by dataset version, render parameters and format.
+
+Its directory is set by the `H5GROVE_THUMBNAIL_DIR` environment variable,
+and defaults to a private temporary directory removed when the process exits."""
+
+
+def get_colormap(name: str) -> np.ndarray:
+    """Look-up table of a colormap.
+
+    :param name: One of :data:`COLORMAPS`
+    :returns: (256, 3) array of uint8 RGB colors
+    :raises QueryArgumentError: If the colormap does not exist
+    """
+    if name not in _COLORMAP_COLORS:
+        raise QueryArgumentError(
+            f"{name} is not a valid colormap. Accepted values are: {', '.join(COLORMAPS)}"
+        )
+
+    colors = np.array(
+        [
+            [int(color[i : i + 2], 16) for i in (1, 3, 5)]
+            for color in _COLORMAP_COLORS[name]
+        ]
+    )
+    anchors = np.linspace(0, 1, len(colors))
+    positions = np.linspace(0, 1, 256)
+    return (
+        np.stack(
+            [np.interp(positions, anchors, colors[:, channel]) for channel in range(3)],
+            axis=-1,
+        )
+        .round()
+        .astype(np.uint8)
+    )
+
+
+def get_preview_factors(shape: Sequence[int], size: int) -> tuple[int, ...]:
+    """Smallest integer binning factors so that binned dimensions do not exceed size.
+
+    :param shape: Shape of the data to preview
+    :param size: Maximum number of pixels along each dimension
+    :raises QueryArgumentError: If size is out of bounds
+    """
+    if not 0 < size <= MAX_PREVIEW_SIZE:
+        raise QueryArgumentError(f"size must be between 1 and {MAX_PREVIEW_SIZE}")
+    return tuple(max(1, math.ceil(length / size)) for length in shape)
+
+
+def render_image(
+    data: np.ndarray,
+    colormap: str = "gray",
+    scale: str = "linear",
+    clip: Sequence[float] | None = None,
+) -> np.ndarray:
+    """Apply a colormap to 2D data, auto-scaling it on its range of valid values.
+
+    Non-finite values (and non-positive values in log scale) are rendered transparent.
+
+    :param data: 2D numeric array
+    :param colormap: One of :data:`COLORMAPS`
+    :param scale: `linear` or `log`
+    :param clip: (low, high) percentiles of the valid values mapped to the ends of the colormap.
+        Defaults to the full range of the values.
+    :returns: (height, width, 4) array of uint8 RGBA pixels
+    :raises QueryArgumentError: For invalid arguments
+    """
+    if scale not in SCALES:
+        raise QueryArgumentError(
+            f"{scale} is not a valid scale. Accepted values are: {', '.join(SCALES)}"
+        )
+    if clip is None:
+        clip = (0, 100)
+    if len(clip) != 2 or not 0 <= clip[0] < clip[1] <= 100:
+        raise QueryArgumentError(
+            "clip must be two increasing percentiles between 0 and 100"
+        )
+    lut = get_colormap(colormap)
+
+    values = np.asarray(data, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if scale == "log":
+            values = np.log10(values)
+        valid = np.isfinite(values)
+
+    rgba = np.zeros((*values.shape, 4), dtype=np.uint8)
+    if not np.any(valid):
+        return rgba
+
+    vmin, vmax = np.percentile(values[valid], clip)
+    if vmax > vmin:
+        normalized = np.clip((values[valid] - vmin) / (vmax - vmin), 0, 1)
+    else:
+        normalized = np.zeros(np.count_nonzero(valid))
+    rgba[valid, :3] = lut[np.round(normalized * 255).astype(np.intp)]
+    rgba[valid, 3] = 255
+    return rgba
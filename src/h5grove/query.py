@@ -0,0 +1,307 @@
+"""Filtering of the rows of tables (one-dimensional compound datasets) with predicates on their fields.
+
+Predicates use a restricted Python syntax where fields are referenced by their name,
+e.g. `(energy > 10) & (detector == 3)` or `10 <= energy < 20 and not flagged`.
+"""
+
+from __future__ import annotations
+
+import ast
+import operator
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import h5py
+import numpy as np
+
+from .reductions import iter_selection_blocks
+from .utils import QueryArgumentError
+
+MAX_PREDICATE_LENGTH = 1024
+"""Maximum number of characters of a predicate"""
+
+INDEX_FIELD = "index"
+"""Name of the field holding the indices of the matching rows"""
+
+_COMPARISONS: dict[type, Callable] = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_COMBINATIONS: dict[type, np.ufunc] = {
+    ast.And: np.logical_and,
+    ast.Or: np.logical_or,
+    ast.BitAnd: np.logical_and,
+    ast.BitOr: np.logical_or,
+}
+
+_Evaluator = Callable[[np.ndarray], Any]
+
+
+class Predicate:
+    """Boolean expression over the fields of the rows of a table.
+
+    Supported elements are field names, number, boolean and string literals, comparisons
+    (including chained ranges such as `0 <= x < 10`), `in`/`not in` a tuple of literals,
+    `and`, `or`, `not`, `&`, `|` and `~`.
+
+    :param predicate: Expression to parse
+    :param dtype: Compound dtype of the rows
+    :raises QueryArgumentError: If the predicate is invalid
+    """
+
+    def __init__(self, predicate: str, dtype: np.dtype):
+        if len(predicate) > MAX_PREDICATE_LENGTH:
+            raise QueryArgumentError(
+                f"Predicate is longer than {MAX_PREDICATE_LENGTH} characters"
+            )
+
+        self._dtype = dtype
+        self.fields: list[str] = []
+        """Names of the fields referenced by the predicate"""
+
+        try:
+            tree = ast.parse(predicate.strip(), mode="eval")
+        except SyntaxError as e:
+            raise QueryArgumentError(f"Invalid predicate: {e.msg}")
+
+        self._evaluate = self._parse_condition(tree.body)
+        if len(self.fields) == 0:
+            raise QueryArgumentError("Predicate does not reference any field")
+
+    def evaluate(self, rows: np.ndarray) -> np.ndarray:
+        """Boolean mask of the rows matching the predicate.
+
+        :param rows: Structured array containing at least the fields of the predicate
+        """
+        with np.errstate(invalid="ignore"):
+            return np.broadcast_to(self._evaluate(rows), rows.shape)
+
+    def _parse_condition(self, node: ast.AST) -> _Evaluator:
+        if isinstance(node, ast.BoolOp):
+            func = _COMBINATIONS[type(node.op)]
+            conditions = [self._parse_condition(value) for value in node.values]
+            return lambda rows: func.reduce([cond(rows) for cond in conditions])
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _COMBINATIONS:
+            func = _COMBINATIONS[type(node.op)]
+            left = self._parse_condition(node.left)
+            right = self._parse_condition(node.right)
+            return lambda rows: func(left(rows), right(rows))
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            operand = self._parse_condition(node.operand)
+            return lambda rows: np.logical_not(operand(rows))
+
+        if isinstance(node, ast.Compare):
+            return self._parse_comparison(node)
+
+        if isinstance(node, ast.Name):
+            name = self._add_field(node.id)
+            if self._dtype[name].kind != "b":
+                raise QueryArgumentError(f"Field {name} is not a boolean")
+            return lambda rows: rows[name]
+
+        raise QueryArgumentError(f"Unsupported predicate element: {ast.unparse(node)}")
+
+    def _parse_comparison(self, node: ast.Compare) -> _Evaluator:
+        conditions: list[_Evaluator] = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            conditions.append(self._parse_single_comparison(left, op, right))
+            left = right
+
+        if len(conditions) == 1:
+            return conditions[0]
+        return lambda rows: np.logical_and.reduce([cond(rows) for cond in conditions])
+
+    def _parse_single_comparison(
+        self, left: ast.AST, op: ast.cmpop, right: ast.AST
+    ) -> _Evaluator:
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(left, ast.Name) or not isinstance(
+                right, (ast.Tuple, ast.List, ast.Set)
+            ):
+                raise QueryArgumentError(
+                    f"Unsupported membership test: {ast.unparse(left)} in {ast.unparse(right)}"
+                )
+            name = self._add_field(left.id)
+            values = [self._parse_literal(elt, name) for elt in right.elts]
+            invert = isinstance(op, ast.NotIn)
+            return lambda rows: np.isin(rows[name], values, invert=invert)
+
+        if type(op) not in _COMPARISONS:
+            raise QueryArgumentError(f"Unsupported comparison: {type(op).__name__}")
+        func = _COMPARISONS[type(op)]
+
+        field_name = next(
+            (node.id for node in (left, right) if isinstance(node, ast.Name)), None
+        )
+        if field_name is None:
+            raise QueryArgumentError(
+                f"Comparison does not reference any field: {ast.unparse(left)} {ast.unparse(right)}"
+            )
+        left_operand = self._parse_operand(left, field_name)
+        right_operand = self._parse_operand(right, field_name)
+        if (
+            isinstance(left, ast.Name)
+            and isinstance(right, ast.Name)
+            and (h5py.check_string_dtype(self._dtype[left.id]) is None)
+            != (h5py.check_string_dtype(self._dtype[right.id]) is None)
+        ):
+            raise QueryArgumentError(
+                f"Cannot compare field {left.id} with field {right.id}"
+            )
+        return lambda rows: func(left_operand(rows), right_operand(rows))
+
+    def _parse_operand(self, node: ast.AST, field_name: str) -> _Evaluator:
+        if isinstance(node, ast.Name):
+            name = self._add_field(node.id)
+            return lambda rows: rows[name]
+
+        value = self._parse_literal(node, field_name)
+        return lambda rows: value
+
+    def _parse_literal(
+        self, node: ast.AST, field_name: str
+    ) -> int | float | str | bytes:
+        """Literal compared to a field, encoded as bytes for byte string fields"""
+        self._add_field(field_name)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self._parse_literal(node.operand, field_name)
+            if isinstance(value, (str, bytes)):
+                raise QueryArgumentError(f"Invalid literal: {ast.unparse(node)}")
+            return -value
+
+        if not isinstance(node, ast.Constant) or not isinstance(
+            node.value, (int, float, str)
+        ):
+            raise QueryArgumentError(f"Unsupported literal: {ast.unparse(node)}")
+
+        value = node.value
+        is_string_field = h5py.check_string_dtype(self._dtype[field_name]) is not None
+        if isinstance(value, str) != is_string_field:
+            raise QueryArgumentError(
+                f"Cannot compare field {field_name} with {ast.unparse(node)}"
+            )
+        if isinstance(value, str) and self._dtype[field_name].kind in "SO":
+            return value.encode()
+        return value
+
+    def _add_field(self, name: str) -> str:
+        if self._dtype.names is None or name not in self._dtype.names:
+            raise QueryArgumentError(f"Unknown field: {name}")
+
+        field_dtype = self._dtype[name]
+        if field_dtype.shape != () or (
+            field_dtype.kind not in "biuf"
+            and h5py.check_string_dtype(field_dtype) is None
+        ):
+            raise QueryArgumentError(
+                f"Field {name} is not a number, boolean or string scalar"
+            )
+
+        if name not in self.fields:
+            self.fields.append(name)
+        return name
+
+
+def iter_matching_rows(
+    dataset: h5py.Dataset,
+    predicate: Predicate,
+    fields: list[str],
+    block_size: int | None = None,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Read a table block by block and yield the rows matching a predicate.
+
+    Only the fields of the predicate and the requested fields are read.
+
+    :param dataset: One-dimensional compound dataset
+    :param predicate: Predicate on the fields of the dataset
+    :param fields: Names of the fields of the matching rows to return
+    :param block_size: Approximate size in bytes of the blocks of rows. See :func:`h5grove.reductions.iter_selection_blocks`.
+    :returns: Iterator of (indices of the matching rows, matching rows) of each block
+        containing matches
+    """
+    names = predicate.fields + [name for name in fields if name not in predicate.fields]
+    reader = dataset.fields(names)
+    for start, block_indices in iter_selection_blocks(
+        dataset, (slice(0, dataset.shape[0], 1),), block_size
+    ):
+        rows = np.asarray(reader[block_indices])
+        matches = np.flatnonzero(predicate.evaluate(rows))
+        if len(matches) > 0:
+            yield matches + start, rows[matches]
+
+
+def count_matching_rows(
+    dataset: h5py.Dataset, predicate: Predicate, block_size: int | None = None
+) -> int:
+    """Number of rows of a table matching a predicate, read block by block.
+
+    :param dataset: One-dimensional compound dataset
+    :param predicate: Predicate on the fields of the dataset
+    :param block_size: Approximate size in bytes of the blocks of rows
+    """
+    reader = dataset.fields(predicate.fields)
+    return sum(
+        int(np.count_nonzero(predicate.evaluate(np.asarray(reader[block_indices]))))
+        for _, block_indices in iter_selection_blocks(
+            dataset, (slice(0, dataset.shape[0], 1),), block_size
+        )
+    )
+
+
+def filter_rows(
+    dataset: h5py.Dataset,
+    predicate: Predicate,
+    fields: list[str],
+    limit: int | None = None,
+    offset: int = 0,
+    block_size: int | None = None,
+) -> np.ndarray:
+    """Rows of a table matching a predicate, with their indices.
+
+    Reading stops as soon as `offset + limit` matching rows have been found.
+
+    :param dataset: One-dimensional compound dataset
+    :param predicate: Predicate on the fields of the dataset
+    :param fields: Names of the fields of the matching rows to return
+    :param limit: Maximum number of rows to return. Defaults to all matching rows.
+    :param offset: Number of matching rows to skip
+    :param block_size: Approximate size in bytes of the blocks of rows
+    :returns: Structured array with the row indices in an `index` field followed by the requested fields
+    """
+    result_dtype = np.dtype(
+        [(INDEX_FIELD, "<i8")] + [(name, dataset.dtype[name]) for name in fields]
+    )
+    results = [np.empty(0, dtype=result_dtype)]
+    if limit == 0:
+        return results[0]
+
+    remaining = limit
+    for indices, rows in iter_matching_rows(dataset, predicate, fields, block_size):
+        skipped = min(offset, len(indices))
+        offset -= skipped
+        indices = indices[skipped:]
+        rows = rows[skipped:]
+        if remaining is not None:
+            indices = indices[:remaining]
+            rows = rows[:remaining]
+            remaining -= len(indices)
+
+        if len(indices) > 0:
+            result = np.empty(len(indices), dtype=result_dtype)
+            result[INDEX_FIELD] = indices
+            for name in fields:
+                result[name] = rows[name]
+            results.append(result)
+
+        if remaining == 0:
+            break
+
+    return np.concatenate(results)
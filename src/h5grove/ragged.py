@@ -0,0 +1,93 @@
+"""Variable-length (ragged) numeric datasets as contiguous buffers of values with offsets"""
+
+from __future__ import annotations
+
+import math
+
+import h5py
+import numpy as np
+
+from .reductions import iter_selection_blocks
+from .utils import get_selection_shape
+
+
+class RaggedArray:
+    """Array of variable-length rows stored as in Arrow's ListArray:
+    the row i of the flattened array is `values[offsets[i]:offsets[i + 1]]`.
+
+    :param shape: Shape of the array of rows
+    :param offsets: int64 array of `size + 1` offsets in values
+    :param values: Concatenated rows
+    """
+
+    def __init__(self, shape: tuple[int, ...], offsets: np.ndarray, values: np.ndarray):
+        self.shape = shape
+        self.offsets = offsets
+        self.values = values
+
+    @property
+    def size(self) -> int:
+        return math.prod(self.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def flatten(self) -> RaggedArray:
+        return RaggedArray((self.size,), self.offsets, self.values)
+
+    def with_values(self, values: np.ndarray) -> RaggedArray:
+        """Same rows with other values, e.g. converted to another dtype"""
+        return RaggedArray(self.shape, self.offsets, values)
+
+    def to_list(self) -> list | np.ndarray:
+        """Nested lists of rows, each row being an array"""
+        rows = np.split(self.values, self.offsets[1:-1])
+        if len(self.shape) == 0:
+            return rows[0]
+
+        array = np.empty(len(rows), dtype=object)
+        array[:] = rows
+        return array.reshape(self.shape).tolist()
+
+
+def is_ragged_dtype(dtype: np.dtype) -> bool:
+    """Whether dtype is a variable-length sequence of numbers"""
+    base = h5py.check_vlen_dtype(dtype)
+    return isinstance(base, np.dtype) and base.kind in "biufc"
+
+
+def read_ragged(
+    dataset: h5py.Dataset,
+    indices: tuple[slice | int, ...],
+    block_size: int | None = None,
+) -> RaggedArray:
+    """Read a selection of a variable-length numeric dataset block by block.
+
+    Rows are concatenated into one contiguous buffer as blocks are read, so that the
+    object arrays returned by h5py are never held for the whole selection.
+
+    :param dataset: Dataset of variable-length sequences of numbers
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    :param block_size: Approximate size in bytes of the blocks of rows. See :func:`h5grove.reductions.iter_selection_blocks`.
+    """
+    base_dtype = h5py.check_vlen_dtype(dataset.dtype)
+    shape = get_selection_shape(indices)
+    if len(shape) == 0:
+        row = np.asarray(dataset[indices], dtype=base_dtype)
+        return RaggedArray(shape, np.array([0, row.size], dtype=np.int64), row)
+
+    offsets = np.zeros(math.prod(shape) + 1, dtype=np.int64)
+    value_blocks = [np.empty(0, dtype=base_dtype)]
+    position = 0
+    for _, block_indices in iter_selection_blocks(dataset, indices, block_size):
+        rows = np.ravel(dataset[block_indices])
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        block_offsets = offsets[position + 1 : position + 1 + len(rows)]
+        np.cumsum(lengths, out=block_offsets)
+        block_offsets += offsets[position]
+        if len(rows) > 0:
+            value_blocks.append(np.concatenate(rows))
+        position += len(rows)
+
+    return RaggedArray(shape, offsets, np.concatenate(value_blocks))
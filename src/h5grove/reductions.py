@@ -0,0 +1,934 @@
+"""Reductions computed on the server by streaming through chunk-aligned blocks of datasets"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+from collections.abc import Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import cast
+
+import h5py
+import numpy as np
+
+from .cache import LRUCache, file_identity
+from .models import Peaks
+from .utils import (
+    QueryArgumentError,
+    get_aligned_blocks,
+    get_selection_key,
+    get_selection_mask,
+    get_selection_shape,
+    normalize_selection,
+    parse_number_list,
+)
+
+BLOCK_SIZE = 16 * 1024**2
+"""Approximate size in bytes of the blocks in which datasets are read"""
+
+MAX_PEAKS = 10000
+"""Maximum number of peaks that can be requested at once"""
+
+MAX_PEAK_RADIUS = 100
+"""Maximum non-maximum suppression radius of peaks"""
+
+MAX_PEAK_CANDIDATES = 1 << 20
+"""Maximum number of greatest values among which peaks are searched"""
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by reductions to process blocks in parallel"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1),
+            thread_name_prefix="h5grove-reduction",
+        )
+    return _executor
+
+
+def iter_selection_blocks(
+    dataset: h5py.Dataset,
+    indices: tuple[slice | int, ...],
+    block_size: int | None = None,
+    multiple: int = 1,
+) -> Iterator[tuple[int, tuple[slice | int, ...]]]:
+    """Split a selection in chunk-aligned blocks along its first sliced dimension.
+
+    :param dataset: Dataset the selection applies to
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    :param block_size: Approximate size in bytes of a block. Defaults to :data:`BLOCK_SIZE`.
+    :param multiple: Number of elements along the first sliced dimension that every block
+        but the last one is a multiple of. Blocks stay chunk-aligned only if the selection
+        starts on a chunk boundary.
+    :returns: Iterator of (offset of the block along the first axis of the selected data, block indices)
+    """
+    shape = get_selection_shape(indices)
+    if len(shape) == 0:
+        yield 0, indices
+        return
+
+    axis = next(i for i, member in enumerate(indices) if isinstance(member, slice))
+    member = cast(slice, indices[axis])
+
+    if block_size is None:
+        block_size = BLOCK_SIZE
+    row_size = max(1, math.prod(shape[1:]) * dataset.dtype.itemsize)
+    chunk_size = (
+        dataset.chunks[axis]
+        if dataset.chunks is not None and member.step == 1
+        else None
+    )
+    offset = member.start % chunk_size if chunk_size else 0
+    if multiple > 1:
+        chunk_size = (
+            math.lcm(chunk_size, multiple) if chunk_size and offset == 0 else multiple
+        )
+        offset = 0
+
+    for block in get_aligned_blocks(
+        shape[0], block_size // row_size, chunk_size, offset
+    ):
+        rows = range(member.start, member.stop, member.step)[block]
+        yield (
+            block.start,
+            (
+                *indices[:axis],
+                slice(rows.start, rows.stop, rows.step),
+                *indices[axis + 1 :],
+            ),
+        )
+
+
+def get_dataset_indices(
+    indices: tuple[slice | int, ...], positions: np.ndarray
+) -> np.ndarray:
+    """Convert positions in selected data to indices in the dataset.
+
+    :param indices: Normalized selection
+    :param positions: (N, ndim of the selected data) array of positions in the selected data
+    :returns: (N, ndim of the dataset) array of indices in the dataset
+    """
+    dataset_indices = np.empty((len(positions), len(indices)), dtype=np.int64)
+    axis = 0
+    for dim, member in enumerate(indices):
+        if isinstance(member, slice):
+            dataset_indices[:, dim] = member.start + positions[:, axis] * member.step
+            axis += 1
+        else:
+            dataset_indices[:, dim] = member
+    return dataset_indices
+
+
+def _sort_descending(values: np.ndarray) -> np.ndarray:
+    """Indices sorting values in descending order, keeping the order of equal values"""
+    return len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]
+
+
+def _suppress_non_maxima(
+    values: np.ndarray, coordinates: np.ndarray, k: int, radius: int
+) -> np.ndarray:
+    """Greedily select up to k elements, discarding those within radius of a greater one.
+
+    Candidates are grouped in a grid of cells of `radius` elements, so that only the
+    candidates of the cells neighbouring a selected one are compared with it.
+
+    :param values: Candidate values sorted in descending order
+    :param coordinates: (N, ndim) coordinates of the candidates
+    :returns: Positions of the selected candidates
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Cells are padded on each side so that neighbours of a cell never wrap around
+    cells = coordinates // radius
+    cells += 1 - cells.min(axis=0)
+    grid_shape = tuple((cells.max(axis=0) + 2).tolist())
+    cell_ids = np.ravel_multi_index(tuple(cells.T), grid_shape)
+    by_cell = np.argsort(cell_ids, kind="stable")
+    sorted_ids = cell_ids[by_cell]
+    strides = np.cumprod((1, *grid_shape[:0:-1]))[::-1]
+    neighbour_shifts = (
+        np.array(list(itertools.product((-1, 0, 1), repeat=len(grid_shape)))) @ strides
+    )
+
+    suppressed = np.zeros(len(values), dtype=bool)
+    selected: list[int] = []
+    i = 0
+    while len(selected) < k:
+        # Greatest candidate not suppressed yet, searched by windows
+        while i < len(values):
+            window = suppressed[i : i + 4096]
+            first = int(np.argmin(window))
+            if not window[first]:
+                i += first
+                break
+            i += len(window)
+        if i >= len(values):
+            break
+        selected.append(i)
+        neighbours = cell_ids[i] + neighbour_shifts
+        starts = np.searchsorted(sorted_ids, neighbours, side="left").tolist()
+        stops = np.searchsorted(sorted_ids, neighbours, side="right").tolist()
+        members = np.concatenate(
+            [by_cell[start:stop] for start, stop in zip(starts, stops)]
+        )
+        members = members[~suppressed[members]]
+        distances = np.abs(coordinates[members] - coordinates[i]).max(axis=1)
+        suppressed[members[distances <= radius]] = True
+    return np.asarray(selected, dtype=np.int64)
+
+
+def _get_candidate_count(k: int, radius: int, ndim: int) -> int:
+    """Number of greatest values among which greedy non-maximum suppression finds k peaks.
+
+    Each selected peak discards at most (2 * radius + 1) ** ndim - 1 other values.
+    The count is capped to :data:`MAX_PEAK_CANDIDATES`.
+    """
+    return min(k * (2 * radius + 1) ** ndim, MAX_PEAK_CANDIDATES)
+
+
+def _get_block_peaks(
+    dataset: h5py.Dataset,
+    indices: tuple[slice | int, ...],
+    count: int,
+    mask: np.ndarray | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Greatest values of a block in descending order, with their indices in the dataset.
+
+    Equal values are sorted by index, so that candidates do not depend on how blocks are split.
+    """
+    data = np.asarray(dataset[indices])
+
+    valid = None
+    if mask is not None:
+        valid = np.broadcast_to(
+            get_selection_mask(mask, dataset.shape, indices), data.shape
+        )
+    if np.issubdtype(data.dtype, np.floating):
+        finite = np.isfinite(data)
+        valid = finite if valid is None else finite & valid
+
+    flat_positions = np.arange(data.size) if valid is None else np.flatnonzero(valid)
+    values = data.ravel()[flat_positions]
+
+    if len(values) > count:
+        # Keep all values equal to the smallest kept one to break ties by index
+        threshold = np.partition(values, len(values) - count)[len(values) - count]
+        kept = values >= threshold
+        values, flat_positions = values[kept], flat_positions[kept]
+
+    order = _sort_descending(values)[:count]
+    values, flat_positions = values[order], flat_positions[order]
+
+    positions = (
+        np.stack(np.unravel_index(flat_positions, data.shape), axis=-1)
+        if data.ndim > 0
+        else np.empty((len(values), 0), dtype=np.int64)
+    )
+    return values, get_dataset_indices(indices, positions)
+
+
+def get_peaks(
+    dataset: h5py.Dataset,
+    indices: tuple[slice | int, ...],
+    k: int,
+    radius: int = 0,
+    mask: np.ndarray | None = None,
+) -> Peaks:
+    """Find the k greatest values of a dataset selection with their indices.
+
+    Blocks are processed in parallel, each keeping only the values that can be selected
+    (see :func:`_get_candidate_count`). Candidates are then merged and non-maximum suppression
+    is applied once on them, so that peaks do not depend on how the selection is split in blocks.
+    As candidates are capped to :data:`MAX_PEAK_CANDIDATES`, fewer than k peaks can be found
+    for large k and radius.
+
+    :param dataset: Numeric dataset
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    :param k: Number of peaks to find
+    :param radius: If greater than 0, discard values closer (Chebyshev distance in dataset indices)
+        than or at `radius` from a greater selected value (non-maximum suppression)
+    :param mask: Optional boolean array of valid elements broadcast over the last dimensions of the dataset
+    :raises QueryArgumentError: If k or radius are invalid
+    """
+    if not 0 < k <= MAX_PEAKS:
+        raise QueryArgumentError(f"k must be between 1 and {MAX_PEAKS}")
+    if not 0 <= radius <= MAX_PEAK_RADIUS:
+        raise QueryArgumentError(f"radius must be between 0 and {MAX_PEAK_RADIUS}")
+
+    count = _get_candidate_count(k, radius, dataset.ndim)
+    futures = [
+        get_executor().submit(_get_block_peaks, dataset, block_indices, count, mask)
+        for _, block_indices in iter_selection_blocks(dataset, indices)
+    ]
+    block_peaks = [future.result() for future in futures]
+    if len(block_peaks) == 0:
+        return {"values": [], "indices": []}
+
+    # Blocks follow each other in index order, so equal values stay sorted by index
+    values = np.concatenate([block_values for block_values, _ in block_peaks])
+    coordinates = np.concatenate([coords for _, coords in block_peaks])
+    order = _sort_descending(values)[:count]
+    values, coordinates = values[order], coordinates[order]
+
+    selected = (
+        np.arange(min(k, len(values)))
+        if radius == 0 or dataset.ndim == 0
+        else _suppress_non_maxima(values, coordinates, k, radius)
+    )
+    return {
+        "values": values[selected].tolist(),
+        "indices": coordinates[selected].tolist(),
+    }
+
+
+def read_pixels(
+    dataset: h5py.Dataset,
+    frame_indices: tuple[slice | int, ...],
+    rows: np.ndarray,
+    cols: np.ndarray,
+) -> np.ndarray:
+    """Read pixels of the images stored in the last two dimensions of a dataset.
+
+    Only the chunks containing the requested pixels are read: pixels are grouped
+    by chunk and the bounding box of each group is read.
+
+    :param dataset: Dataset with at least two dimensions
+    :param frame_indices: Normalized selection of the leading dimensions (all but the last two)
+    :param rows: Row indices of the pixels
+    :param cols: Column indices of the pixels, with the same shape as rows
+    :returns: Array of shape (*selected frames shape, *rows.shape)
+    """
+    height, width = dataset.shape[-2:]
+    tile_height, tile_width = (
+        dataset.chunks[-2:] if dataset.chunks is not None else (256, 256)
+    )
+    frames_shape = get_selection_shape(frame_indices)
+
+    pixel_ids, inverse = np.unique(
+        np.ravel_multi_index((rows.ravel(), cols.ravel()), (height, width)),
+        return_inverse=True,
+    )
+    pixel_rows, pixel_cols = np.unravel_index(pixel_ids, (height, width))
+    tile_ids = (pixel_rows // tile_height) * (
+        -(-width // tile_width)
+    ) + pixel_cols // tile_width
+
+    values = np.empty((*frames_shape, len(pixel_ids)), dtype=dataset.dtype)
+    order = np.argsort(tile_ids, kind="stable")
+    boundaries = np.flatnonzero(np.diff(tile_ids[order])) + 1
+    for tile_pixels in np.split(order, boundaries):
+        if len(tile_pixels) == 0:
+            continue
+        tile_rows, tile_cols = pixel_rows[tile_pixels], pixel_cols[tile_pixels]
+        row_min, col_min = tile_rows.min(), tile_cols.min()
+        box_indices = (
+            *frame_indices,
+            slice(int(row_min), int(tile_rows.max()) + 1),
+            slice(int(col_min), int(tile_cols.max()) + 1),
+        )
+        box = dataset[box_indices]
+        values[..., tile_pixels] = box[..., tile_rows - row_min, tile_cols - col_min]
+
+    return values[..., inverse].reshape(frames_shape + rows.shape)
+
+
+PROFILE_METHODS = ("nearest", "bilinear")
+
+MAX_PROFILE_POINTS = 1 << 20
+"""Maximum number of points sampled for a profile: number of samples times width"""
+
+
+def get_profile(
+    dataset: h5py.Dataset,
+    frame_indices: tuple[slice | int, ...],
+    start: tuple[float, float],
+    end: tuple[float, float],
+    width: int = 1,
+    method: str = "bilinear",
+) -> np.ndarray:
+    """Interpolated profile along a segment of the images stored in the last two dimensions of a dataset.
+
+    The segment is sampled at one point per pixel length (both ends included).
+    Samples falling outside of the image are NaN.
+
+    :param dataset: Numeric dataset with at least two dimensions
+    :param frame_indices: Normalized selection of the leading dimensions (all but the last two)
+    :param start: (row, column) coordinates of the start of the segment
+    :param end: (row, column) coordinates of the end of the segment
+    :param width: Number of parallel segments, one pixel apart, over which the profile is averaged
+    :param method: Interpolation method: `nearest` or `bilinear`
+    :returns: Array of shape (*selected frames shape, number of samples)
+    :raises QueryArgumentError: For invalid arguments, non-finite coordinates
+        or more points than :data:`MAX_PROFILE_POINTS`
+    """
+    if method not in PROFILE_METHODS:
+        raise QueryArgumentError(
+            f"{method} is not a valid method. Accepted values are: {', '.join(PROFILE_METHODS)}"
+        )
+    if not 1 <= width <= 1000:
+        raise QueryArgumentError("width must be between 1 and 1000")
+
+    height, image_width = dataset.shape[-2:]
+    start_point = np.asarray(start, dtype=np.float64)
+    end_point = np.asarray(end, dtype=np.float64)
+    if not (np.all(np.isfinite(start_point)) and np.all(np.isfinite(end_point))):
+        raise QueryArgumentError("start and end coordinates must be finite")
+    direction = end_point - start_point
+    length = float(np.hypot(*direction))
+    n_samples = max(2, int(np.ceil(length)) + 1)
+    if n_samples * width > MAX_PROFILE_POINTS:
+        raise QueryArgumentError(
+            f"Profile of {n_samples} samples and width {width} exceeds the limit of {MAX_PROFILE_POINTS} points"
+        )
+
+    # Sample points of shape (width, n_samples, 2)
+    normal = (
+        np.array([-direction[1], direction[0]]) / length if length > 0 else np.zeros(2)
+    )
+    offsets = np.arange(width) - (width - 1) / 2
+    points = (
+        start_point
+        + np.linspace(0, 1, n_samples)[np.newaxis, :, np.newaxis] * direction
+        + offsets[:, np.newaxis, np.newaxis] * normal
+    )
+    inside = np.all(
+        (points >= -0.5) & (points <= np.array([height, image_width]) - 0.5),
+        axis=-1,
+    )
+
+    if method == "nearest":
+        corners = np.rint(points)[np.newaxis]
+        weights = np.ones((1, *points.shape[:2]))
+    else:
+        base = np.floor(points)
+        fraction = points - base
+        corners = np.stack(
+            [base + offset for offset in ((0, 0), (0, 1), (1, 0), (1, 1))]
+        )
+        row_weights = np.stack([1 - fraction[..., 0], fraction[..., 0]])
+        col_weights = np.stack([1 - fraction[..., 1], fraction[..., 1]])
+        weights = np.stack(
+            [row_weights[i] * col_weights[j] for i in (0, 1) for j in (0, 1)]
+        )
+
+    rows = np.clip(corners[..., 0], 0, height - 1).astype(np.intp)
+    cols = np.clip(corners[..., 1], 0, image_width - 1).astype(np.intp)
+    values = read_pixels(dataset, frame_indices, rows, cols)
+
+    dtype = np.result_type(dataset.dtype, np.float32)
+    samples = np.sum(values * weights.astype(dtype), axis=-3)
+    samples[..., ~inside] = np.nan
+    return np.mean(samples, axis=-2)
+
+
+ROI_CACHE: LRUCache[tuple[np.ndarray, np.ndarray]] = LRUCache(maxsize=256)
+"""Per-frame sums and counts of valid pixels of ROIs, keyed by dataset version, frames, ROI and mask"""
+
+ROI_REDUCTIONS = ("sum", "mean")
+
+
+def parse_roi(
+    roi: str, image_shape: tuple[int, int]
+) -> tuple[tuple[slice, slice], np.ndarray | None]:
+    """Parses a region of interest of an image.
+
+    Examples:
+        '10:20,30:40' => Rectangle of rows 10 to 19 and columns 30 to 39
+        '0,0;0,10;10,0' => Triangle of (row, column) vertices (0, 0), (0, 10) and (10, 0)
+
+    :param roi: Rectangle as a NumPy-like slice or polygon as semicolon-separated vertices.
+        Pixels whose center is inside the polygon belong to the ROI.
+    :param image_shape: Shape of the image
+    :returns: Bounding box of the ROI and boolean array of the pixels of the box inside the ROI (None for rectangles)
+    :raises QueryArgumentError: If the ROI is invalid
+    """
+    height, width = image_shape
+
+    if ";" not in roi:
+        rows, cols = (
+            member if isinstance(member, slice) else slice(member, member + 1, 1)
+            for member in normalize_selection(roi, image_shape)
+        )
+        return (rows, cols), None
+
+    vertices = np.asarray([parse_number_list(vertex) for vertex in roi.split(";")])
+    if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+        raise QueryArgumentError(f"{roi} is not a valid polygon")
+
+    row_min, col_min = np.maximum(np.ceil(vertices.min(axis=0)), 0).astype(int)
+    row_max, col_max = np.floor(vertices.max(axis=0)).astype(int)
+    rows = slice(int(row_min), max(int(row_min), min(height, int(row_max) + 1)), 1)
+    cols = slice(int(col_min), max(int(col_min), min(width, int(col_max) + 1)), 1)
+
+    # Even-odd rule on pixel centers
+    pixel_rows, pixel_cols = np.mgrid[rows, cols]
+    inside = np.zeros(pixel_rows.shape, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for (row1, col1), (row2, col2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            crossing = (row1 > pixel_rows) != (row2 > pixel_rows)
+            intersection = (col2 - col1) * (pixel_rows - row1) / (row2 - row1) + col1
+            inside ^= crossing & (pixel_cols < intersection)
+
+    return (rows, cols), inside
+
+
+def _get_roi_sums(
+    dataset: h5py.Dataset,
+    frame_indices: tuple[slice | int, ...],
+    box: tuple[slice, slice],
+    weights: np.ndarray | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sums and counts of valid pixels of a ROI for each frame, streaming over frames"""
+    frames_shape = get_selection_shape(frame_indices)
+    sum_dtype = np.float64 if dataset.dtype.kind == "f" else np.int64
+    sums = np.zeros(frames_shape, dtype=sum_dtype)
+    counts = np.zeros(frames_shape, dtype=np.int64)
+
+    for offset, block_indices in iter_selection_blocks(dataset, (*frame_indices, *box)):
+        data = np.asarray(dataset[block_indices])
+        valid = weights
+        if dataset.dtype.kind == "f":
+            finite = np.isfinite(data)
+            valid = finite if valid is None else finite & valid
+
+        # Blocks are split along frames, or along rows for a single frame
+        target = slice(offset, offset + data.shape[0]) if len(frames_shape) > 0 else ()
+        if valid is None:
+            sums[target] += np.sum(data, axis=(-2, -1), dtype=sum_dtype)
+            counts[target] += data.shape[-2] * data.shape[-1]
+        else:
+            valid = np.broadcast_to(valid, data.shape)
+            sums[target] += np.sum(data, axis=(-2, -1), where=valid, dtype=sum_dtype)
+            counts[target] += np.count_nonzero(valid, axis=(-2, -1))
+
+    return sums, counts
+
+
+def get_roi_series(
+    dataset: h5py.Dataset,
+    frame_indices: tuple[slice | int, ...],
+    rois: Sequence[str],
+    reduction: str = "sum",
+    mask: np.ndarray | None = None,
+    mask_key: Hashable | None = None,
+) -> np.ndarray:
+    """Sum or mean of regions of interest for each frame of a stack of images.
+
+    Only the bounding boxes of the ROIs are read, block of frames by block of frames.
+    Per-frame sums are cached per dataset version, frame selection, ROI and mask.
+
+    :param dataset: Numeric dataset with at least two dimensions
+    :param frame_indices: Normalized selection of the leading dimensions (all but the last two)
+    :param rois: ROIs as described in :func:`parse_roi`
+    :param reduction: `sum` or `mean` of the valid pixels of the ROI
+    :param mask: Optional boolean array of valid pixels of the images
+    :param mask_key: Key identifying the mask (see :func:`h5grove.utils.get_mask_key`).
+        Results are not cached when a mask is given without key.
+    :returns: Array of shape (number of ROIs, *selected frames shape)
+    :raises QueryArgumentError: For invalid arguments
+    """
+    if reduction not in ROI_REDUCTIONS:
+        raise QueryArgumentError(
+            f"{reduction} is not a valid reduction. Accepted values are: {', '.join(ROI_REDUCTIONS)}"
+        )
+    if len(rois) == 0:
+        raise QueryArgumentError("At least one ROI is required")
+
+    image_shape = dataset.shape[-2:]
+    if mask is not None and mask.shape != image_shape:
+        raise QueryArgumentError(
+            f"Mask of shape {mask.shape} does not match images of shape {image_shape}"
+        )
+
+    dataset_key = (
+        file_identity(dataset.file.filename),
+        dataset.name,
+        get_selection_key(frame_indices),
+    )
+    results = []
+    for roi in rois:
+        box, weights = parse_roi(roi, image_shape)
+        if mask is not None:
+            box_mask = mask[box]
+            weights = box_mask if weights is None else weights & box_mask
+
+        def compute_sums():
+            return _get_roi_sums(dataset, frame_indices, box, weights)
+
+        if mask is not None and mask_key is None:
+            sums, counts = compute_sums()
+        else:
+            sums, counts = ROI_CACHE.get_or_compute(
+                (*dataset_key, roi, mask_key), compute_sums
+            )
+
+        if reduction == "sum":
+            results.append(sums)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                results.append(sums / counts)
+
+    return np.stack(results)
+
+
+RADIAL_CACHE: LRUCache[tuple[np.ndarray, np.ndarray]] = LRUCache(maxsize=8)
+"""Bin index maps and pixel counts of radial averages, keyed by geometry and mask"""
+
+MAX_RADIAL_BINS = 100000
+"""Maximum number of bins (radial bins times azimuthal sectors) of radial averages"""
+
+
+def get_radial_bins(
+    image_shape: tuple[int, int],
+    center: tuple[float, float],
+    bins: int,
+    sectors: int = 1,
+    mask: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Bin index of each pixel of an image for radial (and azimuthal) averaging.
+
+    Radial bins evenly split distances from the center up to the farthest pixel center.
+    Azimuthal sectors evenly split angles, starting along increasing columns and turning
+    towards increasing rows.
+
+    :param image_shape: Shape of the images
+    :param center: (row, column) coordinates of the center
+    :param bins: Number of radial bins
+    :param sectors: Number of azimuthal sectors
+    :param mask: Optional boolean array of valid pixels of the images
+    :returns: Array of bin indices (`sector * bins + radial bin`) of shape image_shape,
+        where masked pixels have index `sectors * bins`,
+        and number of valid pixels of each bin (including the masked pixels bin)
+    """
+    rows, cols = np.ogrid[: image_shape[0], : image_shape[1]]
+    delta_rows = rows - center[0]
+    delta_cols = cols - center[1]
+    radius = np.hypot(delta_rows, delta_cols)
+    max_radius = radius.max() if radius.size > 0 else 0
+    if max_radius > 0:
+        radius *= bins / max_radius
+    bin_map = np.minimum(radius.astype(np.intp), bins - 1)
+
+    if sectors > 1:
+        angle = np.arctan2(delta_rows, delta_cols) % (2 * np.pi)
+        sector = np.minimum(
+            (angle * (sectors / (2 * np.pi))).astype(np.intp), sectors - 1
+        )
+        bin_map += sector * bins
+
+    if mask is not None:
+        bin_map[~mask] = sectors * bins
+
+    bin_map.flags.writeable = False
+    return bin_map, np.bincount(bin_map.ravel(), minlength=sectors * bins + 1)
+
+
+def _get_radial_block_sums(
+    dataset: h5py.Dataset,
+    block_indices: tuple[slice | int, ...],
+    bin_map: np.ndarray,
+    n_bins: int,
+    has_frames: bool,
+    offset: int,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Sums and number of non-finite pixels of each bin for the frames of a block, with one bincount per block"""
+    data = np.asarray(dataset[block_indices])
+    if has_frames:
+        data = data.reshape(-1, *bin_map.shape)
+    else:  # Block of rows of a single frame
+        bin_map = bin_map[offset : offset + data.shape[0]]
+        data = data[np.newaxis]
+
+    n_frames = data.shape[0]
+    frame_bins = np.arange(n_frames, dtype=np.intp).reshape(-1, 1, 1) * (n_bins + 1)
+    indices = (frame_bins + bin_map).ravel()
+    values = data.ravel()
+    length = n_frames * (n_bins + 1)
+
+    non_finite = None
+    if dataset.dtype.kind == "f":
+        finite = np.isfinite(values)
+        if not np.all(finite):
+            non_finite = np.bincount(indices[~finite], minlength=length)
+            values = np.where(finite, values, 0)
+
+    sums = np.bincount(indices, weights=values, minlength=length)
+    return (
+        sums.reshape(n_frames, -1),
+        None if non_finite is None else non_finite.reshape(n_frames, -1),
+    )
+
+
+def get_radial_average(
+    dataset: h5py.Dataset,
+    frame_indices: tuple[slice | int, ...],
+    center: tuple[float, float],
+    bins: int,
+    sectors: int | None = None,
+    mask: np.ndarray | None = None,
+    mask_key: Hashable | None = None,
+) -> np.ndarray:
+    """Radial (and azimuthal) average of each frame of a stack of images.
+
+    Bin index maps are computed once per geometry and cached so that each block of frames
+    is reduced with a single bincount. Non-finite and masked pixels are ignored.
+
+    :param dataset: Numeric dataset with at least two dimensions
+    :param frame_indices: Normalized selection of the leading dimensions (all but the last two)
+    :param center: (row, column) coordinates of the center
+    :param bins: Number of radial bins
+    :param sectors: Number of azimuthal sectors. If None, pixels are averaged over all angles.
+    :param mask: Optional boolean array of valid pixels of the images
+    :param mask_key: Key identifying the mask (see :func:`h5grove.utils.get_mask_key`).
+        Bin maps are not cached when a mask is given without key.
+    :returns: Array of shape (*selected frames shape, bins) or (*selected frames shape, sectors, bins)
+    :raises QueryArgumentError: For invalid arguments
+    """
+    n_sectors = 1 if sectors is None else sectors
+    if bins < 1 or n_sectors < 1:
+        raise QueryArgumentError("bins and sectors must be strictly positive")
+    if bins * n_sectors > MAX_RADIAL_BINS:
+        raise QueryArgumentError(
+            f"Number of bins times sectors must not exceed {MAX_RADIAL_BINS}"
+        )
+    if not all(math.isfinite(coordinate) for coordinate in center):
+        raise QueryArgumentError("center must have finite coordinates")
+
+    image_shape = cast(tuple[int, int], dataset.shape[-2:])
+    if mask is not None and mask.shape != image_shape:
+        raise QueryArgumentError(
+            f"Mask of shape {mask.shape} does not match images of shape {image_shape}"
+        )
+
+    def compute_bins():
+        return get_radial_bins(image_shape, center, bins, n_sectors, mask)
+
+    if mask is not None and mask_key is None:
+        bin_map, counts = compute_bins()
+    else:
+        bin_map, counts = RADIAL_CACHE.get_or_compute(
+            (image_shape, center, bins, n_sectors, mask_key), compute_bins
+        )
+
+    n_bins = bins * n_sectors
+    frames_shape = get_selection_shape(frame_indices)
+    frame_size = math.prod(frames_shape[1:])
+    sums = np.zeros((math.prod(frames_shape), n_bins + 1))
+    valid_counts = np.broadcast_to(counts, sums.shape).copy()
+
+    image_indices = tuple(slice(0, length, 1) for length in image_shape)
+    futures = [
+        (
+            offset * frame_size if len(frames_shape) > 0 else 0,
+            get_executor().submit(
+                _get_radial_block_sums,
+                dataset,
+                block_indices,
+                bin_map,
+                n_bins,
+                len(frames_shape) > 0,
+                offset,
+            ),
+        )
+        for offset, block_indices in iter_selection_blocks(
+            dataset, (*frame_indices, *image_indices)
+        )
+    ]
+    for first, future in futures:
+        block_sums, block_non_finite = future.result()
+        target = slice(first, first + len(block_sums))
+        sums[target] += block_sums
+        if block_non_finite is not None:
+            valid_counts[target] -= block_non_finite
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = sums[:, :n_bins] / valid_counts[:, :n_bins]
+
+    if sectors is None:
+        return average.reshape(*frames_shape, bins)
+    return average.reshape(*frames_shape, sectors, bins)
+
+
+BIN_REDUCTIONS = ("mean", "sum", "max", "min")
+
+
+def _reduce_bins(data: np.ndarray, factors: Sequence[int], reduction: str):
+    """Reduce bins of an array whose dimensions are multiples of the binning factors"""
+    binned_shape: list[int] = []
+    for length, factor in zip(data.shape, factors):
+        binned_shape.extend((length // factor, factor))
+    bins = data.reshape(binned_shape)
+    axes = tuple(range(1, bins.ndim, 2))
+
+    if reduction == "mean":
+        return np.mean(bins, axis=axes)
+    if reduction == "sum":
+        return np.sum(bins, axis=axes)
+    if reduction == "max":
+        return np.max(bins, axis=axes)
+    return np.min(bins, axis=axes)
+
+
+def _reduce_masked_bins(
+    data: np.ndarray, valid: np.ndarray, factors: Sequence[int], reduction: str
+):
+    """Reduce the valid elements of bins in floating point, bins without valid elements being NaN"""
+    dtype = np.promote_types(data.dtype, np.float32)
+    valid = np.broadcast_to(valid, data.shape)
+    fill = {"max": -np.inf, "min": np.inf}.get(reduction, 0)
+    values = np.where(valid, data, np.array(fill, dtype=dtype))
+    counts = _reduce_bins(valid, factors, "sum")
+
+    if reduction == "mean":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (_reduce_bins(values, factors, "sum") / counts).astype(dtype)
+    reduced = _reduce_bins(values, factors, reduction)
+    reduced[counts == 0] = np.nan
+    return reduced
+
+
+def _check_reduction(reduction: str):
+    if reduction not in BIN_REDUCTIONS:
+        raise QueryArgumentError(
+            f"{reduction} is not a valid reduction. Accepted values are: {', '.join(BIN_REDUCTIONS)}"
+        )
+
+
+def get_binned_shape(shape: Sequence[int], factors: Sequence[int]) -> tuple[int, ...]:
+    """Shape of data binned by integer factors, trailing elements that do not fill a bin being dropped.
+
+    :raises QueryArgumentError: For invalid factors
+    """
+    if len(factors) != len(shape):
+        raise QueryArgumentError(
+            f"{len(factors)} binning factors given for {len(shape)}D data"
+        )
+    if any(factor < 1 for factor in factors):
+        raise QueryArgumentError("Binning factors must be strictly positive")
+    return tuple(length // factor for length, factor in zip(shape, factors))
+
+
+def get_binned_dtype(
+    dtype: np.dtype, reduction: str = "mean", masked: bool = False
+) -> np.dtype:
+    """Data type of the result of :func:`get_binned_data` for a dataset dtype
+
+    :param masked: Whether the data is binned with a mask
+    :raises QueryArgumentError: For invalid reduction
+    """
+    _check_reduction(reduction)
+    if masked:
+        return np.promote_types(dtype, np.float32)
+    return _reduce_bins(np.zeros((1,), dtype=dtype), (1,), reduction).dtype
+
+
+def bin_blocks(
+    blocks: Iterable[np.ndarray],
+    shape: Sequence[int],
+    dtype: np.dtype,
+    factors: Sequence[int],
+    reduction: str = "mean",
+) -> np.ndarray:
+    """Bin data given as consecutive blocks along its first axis by integer factors.
+
+    Elements at the end of a dimension that do not fill a whole bin are dropped.
+    Blocks can have any length: rows that do not fill a bin are binned with the next block.
+
+    :param blocks: Consecutive blocks of the data along its first axis
+    :param shape: Shape of the data
+    :param dtype: Data type of the data
+    :param factors: Binning factor of each dimension of the data
+    :param reduction: Reduction of the elements of each bin: `mean`, `sum`, `max` or `min`
+    :raises QueryArgumentError: For invalid arguments
+    """
+    if len(shape) == 0:
+        raise QueryArgumentError("Scalar data cannot be binned")
+    binned_shape = get_binned_shape(shape, factors)
+    result = np.empty(binned_shape, dtype=get_binned_dtype(dtype, reduction))
+    if 0 in binned_shape:
+        return result
+
+    trimmed = (
+        slice(None),
+        *(
+            slice(0, length * factor)
+            for length, factor in zip(binned_shape[1:], factors[1:])
+        ),
+    )
+    first = 0
+    pending: np.ndarray | None = None
+    for block in blocks:
+        block = block[trimmed]
+        if pending is not None and len(pending) > 0:
+            block = np.concatenate((pending, block))
+        length = len(block) // factors[0] * factors[0]
+        pending = block[length:]
+        if length == 0:
+            continue
+        binned_block = _reduce_bins(block[:length], factors, reduction)
+        result[first : first + len(binned_block)] = binned_block
+        first += len(binned_block)
+
+    return result
+
+
+def get_binned_data(
+    dataset: h5py.Dataset,
+    indices: tuple[slice | int, ...],
+    factors: Sequence[int],
+    reduction: str = "mean",
+    mask: np.ndarray | None = None,
+) -> np.ndarray:
+    """Bin a dataset selection by integer factors, block by block.
+
+    Elements at the end of a dimension that do not fill a whole bin are dropped.
+    Memory is bounded by the block size and the size of the binned result.
+
+    :param dataset: Numeric dataset
+    :param indices: Selection normalized with :func:`h5grove.utils.normalize_selection`
+    :param factors: Binning factor of each dimension of the selected data
+    :param reduction: Reduction of the elements of each bin: `mean`, `sum`, `max` or `min`
+    :param mask: Boolean array of valid elements (see :func:`h5grove.utils.get_mask`).
+        Masked elements are ignored, bins are reduced in floating point and
+        bins without valid elements are NaN.
+    :raises QueryArgumentError: For invalid arguments
+    """
+    _check_reduction(reduction)
+    binned_shape = get_binned_shape(get_selection_shape(indices), factors)
+    if 0 in binned_shape:
+        return np.empty(binned_shape, dtype=dataset.dtype)
+
+    trimmed_indices: list[slice | int] = []
+    sliced_dims = zip(binned_shape, factors)
+    for member in indices:
+        if isinstance(member, slice):
+            binned_length, factor = next(sliced_dims)
+            stop = member.start + binned_length * factor * member.step
+            member = slice(member.start, stop, member.step)
+        trimmed_indices.append(member)
+
+    result = None
+    for offset, block_indices in iter_selection_blocks(
+        dataset, tuple(trimmed_indices), multiple=factors[0]
+    ):
+        block = np.asarray(dataset[block_indices])
+        if mask is None:
+            binned_block = _reduce_bins(block, factors, reduction)
+        else:
+            binned_block = _reduce_masked_bins(
+                block,
+                get_selection_mask(mask, dataset.shape, block_indices),
+                factors,
+                reduction,
+            )
+        if result is None:
+            result = np.empty(binned_shape, dtype=binned_block.dtype)
+        first = offset // factors[0]
+        result[first : first + len(binned_block)] = binned_block
+
+    return cast(np.ndarray, result)
@@ -12,17 +12,28 @@ from .content import (
     EntityContent,
     ResolvedEntityContent,
     get_content_from_file,
+    get_expression_from_file,
     get_list_of_paths,
 )
-from .encoders import Response, encode
-from .utils import parse_bool_arg
+from .encoders import Response, encode, encode_cost
+from .expression import ExpressionContent
+from .utils import parse_bool_arg, parse_int_arg
 
 __all__ = [
     "RootHandler",
     "BaseHandler",
     "AttributeHandler",
+    "ChunksHandler",
     "DataHandler",
+    "ExpressionHandler",
+    "ExpressionStatisticsHandler",
     "MetadataHandler",
+    "PeaksHandler",
+    "PreviewHandler",
+    "ProfileHandler",
+    "QueryHandler",
+    "RadialHandler",
+    "RoiHandler",
     "StatisticsHandler",
     "get_handlers",
 ]
@@ -58,6 +69,10 @@ class BaseHandler(RequestHandler):
         self.write(response.content)
         self.finish()
 
+    def head(self):
+        # Tornado does not send the content of responses to HEAD requests
+        self.get()
+
     def get_response(
         self, full_file_path: str, path: str | None, resolve_links: str | None
     ) -> Response:
@@ -89,13 +104,20 @@ class ContentHandler(BaseHandler):
         with get_content_from_file(
             full_file_path, path, create_error, resolve_links
         ) as content:
-            response = self.get_content_response(content)
+            if self.request.method == "HEAD":
+                response = self.get_content_head_response(content)
+            else:
+                response = self.get_content_response(content)
 
         return response
 
     def get_content_response(self, content: EntityContent) -> Response:
         raise NotImplementedError
 
+    def get_content_head_response(self, content: EntityContent) -> Response:
+        """Response to HEAD requests. Defaults to the response to GET requests."""
+        return self.get_content_response(content)
+
 
 class AttributeHandler(ContentHandler):
     """`/attr` endpoint handler"""
@@ -109,9 +131,32 @@ class AttributeHandler(ContentHandler):
         return encode(content.attributes(attr_keys if len(attr_keys) > 0 else None))
 
 
+class ChunksHandler(ContentHandler):
+    """`/chunks` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        limit_arg = self.get_query_argument("limit", None)
+        limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+        offset = parse_int_arg(self.get_query_argument("offset", None), fallback=0)
+        summary = parse_bool_arg(
+            self.get_query_argument("summary", None), fallback=False
+        )
+        hashes = parse_bool_arg(self.get_query_argument("hashes", None), fallback=False)
+        format_arg = self.get_query_argument("format", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        result = content.chunk_index(limit, offset, summary, hashes)
+        return encode(result, "json" if summary else format_arg)
+
+
 class DataHandler(ContentHandler):
     """`/data` endpoint handler"""
 
+    def post(self):
+        # Known hashes of large datasets do not fit in a URL: they are sent as a POST body
+        self.get()
+
     def get_content_response(self, content: EntityContent) -> Response:
         dtype = self.get_query_argument("dtype", None)
         format_arg = self.get_query_argument("format", None)
@@ -119,18 +164,213 @@ class DataHandler(ContentHandler):
         flatten = parse_bool_arg(
             self.get_query_argument("flatten", None), fallback=False
         )
+        binning = self.get_query_argument("bin", None)
+        reduction = self.get_query_argument("reduce", "mean")
+        value_range = self.get_query_argument("range", None)
+        fields = self.get_query_argument("fields", None)
+        mask = self.get_query_argument("mask", None)
+        digits_arg = self.get_query_argument("json_digits", None)
+        json_digits = (
+            None if digits_arg is None else parse_int_arg(digits_arg, fallback=0)
+        )
+        json_nan = self.get_query_argument("json_nan", "null")
+        explain = parse_bool_arg(
+            self.get_query_argument("explain", None), fallback=False
+        )
+        known_hashes = (
+            self.request.body.decode()
+            if self.request.method == "POST"
+            else self.get_query_argument("known_hashes", None)
+        )
 
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        data = content.data(selection, flatten, dtype)
-        return encode(data, format_arg)
+        if explain:
+            return encode(
+                content.explain(
+                    selection,
+                    dtype,
+                    binning,
+                    reduction,
+                    fields,
+                    format_arg or "json",
+                    mask,
+                )
+            )
+        if known_hashes is not None:
+            limit_arg = self.get_query_argument("limit", None)
+            limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+            offset = parse_int_arg(self.get_query_argument("offset", None), fallback=0)
+            return encode(
+                content.changed_chunks(known_hashes, limit, offset), format_arg
+            )
+        data = content.data(
+            selection, flatten, dtype, binning, reduction, value_range, fields, mask
+        )
+        return encode(data, format_arg, json_digits, json_nan)
+
+    def get_content_head_response(self, content: EntityContent) -> Response:
+        dtype = self.get_query_argument("dtype", None)
+        format_arg = self.get_query_argument("format", None)
+        selection = self.get_query_argument("selection", None)
+        binning = self.get_query_argument("bin", None)
+        reduction = self.get_query_argument("reduce", "mean")
+        fields = self.get_query_argument("fields", None)
+        mask = self.get_query_argument("mask", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        return encode_cost(
+            content.data_cost(
+                selection, dtype, binning, reduction, fields, format_arg, mask
+            ),
+            format_arg,
+        )
+
+
+class ExpressionHandler(BaseHandler):
+    """`/expr` endpoint handler"""
+
+    def get_response(
+        self, full_file_path: str, path: str | None, resolve_links: str | None
+    ) -> Response:
+        expression = self.get_query_argument("expr", "", strip=False)
+        with get_expression_from_file(
+            full_file_path, expression, create_error
+        ) as content:
+            return self.get_expression_response(content)
+
+    def get_expression_response(self, content: ExpressionContent) -> Response:
+        dtype = self.get_query_argument("dtype", None)
+        format_arg = self.get_query_argument("format", None)
+        flatten = parse_bool_arg(
+            self.get_query_argument("flatten", None), fallback=False
+        )
+        binning = self.get_query_argument("bin", None)
+        reduction = self.get_query_argument("reduce", "mean")
+        return encode(content.data(flatten, dtype, binning, reduction), format_arg)
+
+
+class ExpressionStatisticsHandler(ExpressionHandler):
+    """`/expr/stats` endpoint handler"""
+
+    def get_expression_response(self, content: ExpressionContent) -> Response:
+        return encode(content.data_stats())
 
 
 class MetadataHandler(ContentHandler):
     """`/meta` endpoint handler"""
 
     def get_content_response(self, content: EntityContent) -> Response:
-        return encode(content.metadata())
+        inline_arg = self.get_query_argument("inline_values", None)
+        inline_values = (
+            None if inline_arg is None else parse_int_arg(inline_arg, fallback=0)
+        )
+        return encode(content.metadata(inline_values=inline_values))
+
+
+class PeaksHandler(ContentHandler):
+    """`/peaks` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        selection = self.get_query_argument("selection", None)
+        k = parse_int_arg(self.get_query_argument("k", None), fallback=10)
+        radius = parse_int_arg(self.get_query_argument("radius", None), fallback=0)
+        mask = self.get_query_argument("mask", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        return encode(content.peaks(selection, k, radius, mask))
+
+
+class PreviewHandler(ContentHandler):
+    """`/preview` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        selection = self.get_query_argument("selection", None)
+        size = parse_int_arg(self.get_query_argument("size", None), fallback=256)
+        colormap = self.get_query_argument("colormap", "gray")
+        scale = self.get_query_argument("scale", "linear")
+        clip = self.get_query_argument("clip", None)
+        format_arg = self.get_query_argument("format", "png")
+        mask = self.get_query_argument("mask", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        return content.encoded_preview(
+            selection, size, colormap, scale, clip, format_arg, mask
+        )
+
+
+class ProfileHandler(ContentHandler):
+    """`/profile` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        start = self.get_query_argument("start", "")
+        end = self.get_query_argument("end", "")
+        width = parse_int_arg(self.get_query_argument("width", None), fallback=1)
+        method = self.get_query_argument("method", "bilinear")
+        selection = self.get_query_argument("selection", None)
+        format_arg = self.get_query_argument("format", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.profile(start, end, width, method, selection)
+        return encode(data, format_arg)
+
+
+class QueryHandler(ContentHandler):
+    """`/query` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        where = self.get_query_argument("where", "")
+        fields = self.get_query_argument("fields", None)
+        limit_arg = self.get_query_argument("limit", None)
+        limit = None if limit_arg is None else parse_int_arg(limit_arg, fallback=0)
+        offset = parse_int_arg(self.get_query_argument("offset", None), fallback=0)
+        count = parse_bool_arg(self.get_query_argument("count", None), fallback=False)
+        format_arg = self.get_query_argument("format", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        result = content.query(where, fields, limit, offset, count)
+        return encode(result, "json" if count else format_arg)
+
+
+class RadialHandler(ContentHandler):
+    """`/radial` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        center = self.get_query_argument("center", "")
+        bins = parse_int_arg(self.get_query_argument("bins", None), fallback=100)
+        sectors_arg = self.get_query_argument("sectors", None)
+        sectors = (
+            None if sectors_arg is None else parse_int_arg(sectors_arg, fallback=1)
+        )
+        selection = self.get_query_argument("selection", None)
+        mask = self.get_query_argument("mask", None)
+        format_arg = self.get_query_argument("format", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.radial_average(center, bins, sectors, selection, mask)
+        return encode(data, format_arg)
+
+
+class RoiHandler(ContentHandler):
+    """`/roi` endpoint handler"""
+
+    def get_content_response(self, content: EntityContent) -> Response:
+        rois = self.get_query_arguments("roi", strip=False)
+        reduction = self.get_query_argument("reduce", "sum")
+        selection = self.get_query_argument("selection", None)
+        mask = self.get_query_argument("mask", None)
+        format_arg = self.get_query_argument("format", None)
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        data = content.roi_series(rois, reduction, selection, mask)
+        return encode(data, format_arg)
 
 
 class StatisticsHandler(ContentHandler):
@@ -138,10 +378,25 @@ class StatisticsHandler(ContentHandler):
 
     def get_content_response(self, content: EntityContent) -> Response:
         selection = self.get_query_argument("selection", None)
+        mask = self.get_query_argument("mask", None)
+        fields = self.get_query_argument("fields", None)
+        explain = parse_bool_arg(
+            self.get_query_argument("explain", None), fallback=False
+        )
+
+        if not isinstance(content, DatasetContent):
+            raise TypeError(f"{content.path} is not a dataset")
+        if explain:
+            return encode(content.explain(selection))
+        return encode(content.data_stats(selection, mask, fields))
+
+    def get_content_head_response(self, content: EntityContent) -> Response:
+        selection = self.get_query_argument("selection", None)
+        fields = self.get_query_argument("fields", None)
 
         if not isinstance(content, DatasetContent):
             raise TypeError(f"{content.path} is not a dataset")
-        return encode(content.data_stats(selection))
+        return encode_cost(content.data_stats_cost(selection, fields))
 
 
 class PathsHandler(BaseHandler):
@@ -156,7 +411,7 @@ class PathsHandler(BaseHandler):
 
 # TODO: Setting the return type raises mypy errors
 def get_handlers(base_dir: str | None, allow_origin: str | None = None):
-    """Build h5grove handlers (`/`, `/attr`, `/data`, `/meta` and `/stats`).
+    """Build h5grove handlers (`/`, `/attr`, `/chunks`, `/data`, `/expr`, `/expr/stats`, `/meta`, `/paths`, `/peaks`, `/preview`, `/profile`, `/query`, `/radial`, `/roi` and `/stats`).
 
     :param base_dir: Base directory from which the HDF5 files will be served
     :param allow_origin: Allowed origins for CORS
@@ -166,8 +421,17 @@ def get_handlers(base_dir: str | None, allow_origin: str | None = None):
     return [
         (r"/", RootHandler, init_args),
         (r"/attr", AttributeHandler, init_args),
+        (r"/chunks", ChunksHandler, init_args),
         (r"/data", DataHandler, init_args),
+        (r"/expr", ExpressionHandler, init_args),
+        (r"/expr/stats", ExpressionStatisticsHandler, init_args),
         (r"/meta", MetadataHandler, init_args),
         (r"/paths", PathsHandler, init_args),
+        (r"/peaks", PeaksHandler, init_args),
+        (r"/preview", PreviewHandler, init_args),
+        (r"/profile", ProfileHandler, init_args),
+        (r"/query", QueryHandler, init_args),
+        (r"/radial", RadialHandler, init_args),
+        (r"/roi", RoiHandler, init_args),
         (r"/stats", StatisticsHandler, init_args),
     ]
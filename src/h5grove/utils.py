@@ -1,19 +1,22 @@
 from __future__ import annotations
 
-from collections.abc import Callable, Iterator
+import os
+from collections.abc import Callable, Iterator, Sequence
 from contextlib import contextmanager
 from os.path import basename
 from pathlib import Path
-from typing import Any, TypeVar
+from typing import Any, TypeVar, cast
 
 import h5py
 import numpy as np
 from h5py.version import version_tuple as h5py_version
 
+from .cache import LRUCache, file_identity
 from .models import (
     AttributeMetadata,
     H5pyEntity,
     LinkResolution,
+    Quantization,
     Selection,
     Stats,
     StrDtype,
@@ -53,15 +56,45 @@ get_attr_id = (
 
 
 def attr_metadata(
-    entity_attrs: h5py.AttributeManager, attr_name: str
+    entity_attrs: h5py.AttributeManager,
+    attr_name: str,
+    inline_values: int | None = None,
 ) -> AttributeMetadata:
+    """Metadata of an attribute.
+
+    :param inline_values: Size in bytes up to which the value of the attribute is included.
+        Default: Values are never included.
+    """
     attrId = get_attr_id(entity_attrs, attr_name)
 
-    return {
+    metadata: AttributeMetadata = {
         "name": attr_name,
         "shape": attrId.shape,
         "type": get_type_metadata(attrId.get_type()),
     }
+    if inline_values is not None and attrId.get_storage_size() <= inline_values:
+        # The storage size of variable-length types only counts pointers to the values
+        value = entity_attrs[attr_name]
+        if get_value_size(value) <= inline_values:
+            metadata["value"] = value
+    return metadata
+
+
+def get_value_size(value: Any) -> int:
+    """Size in bytes of a value read with h5py, including the content of variable-length
+    strings and sequences.
+
+    :param value: Value of a dataset or an attribute
+    """
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, np.void) and value.dtype.names is not None:
+        return sum(get_value_size(value[name]) for name in value.dtype.names)
+    if isinstance(value, np.ndarray) and value.dtype.hasobject:
+        return sum(get_value_size(element) for element in value.flat)
+    return getattr(value, "nbytes", 0)
 
 
 def get_entity_from_file(
@@ -137,6 +170,29 @@ def parse_slice_member(slice_member: str) -> slice | int:
     raise TypeError(f"{slice_member} is not a valid slice")
 
 
+def parse_number_list(
+    numbers: str | Sequence[int | float], cast: Callable[[str], Any] = float
+) -> tuple[Any, ...]:
+    """
+    Parses a string containing comma-separated numbers.
+
+    Examples:
+        '5' => (5.0,)
+        '1.5, 2' => (1.5, 2.0)
+
+    :param numbers: String containing the numbers. Sequences of numbers are returned as tuple.
+    :param cast: Function converting each member to a number
+    :raises QueryArgumentError: If a member is not a valid number
+    """
+    if not isinstance(numbers, str):
+        return tuple(numbers)
+
+    try:
+        return tuple(cast(member) for member in numbers.split(","))
+    except ValueError:
+        raise QueryArgumentError(f"{numbers} is not a valid list of numbers")
+
+
 def sorted_dict(*args: tuple[str, Any]):
     return dict(sorted(args, key=lambda entry: entry[0]))
 
@@ -226,6 +282,10 @@ def _sanitize_dtype(dtype: np.dtype) -> np.dtype:
     if dtype.kind == "f" and dtype.itemsize > 8:
         return np.dtype("<f8")
 
+    # Convert complex256 to complex128, encoded as interleaved float64
+    if dtype.kind == "c" and dtype.itemsize > 16:
+        return np.dtype("<c16")
+
     # Convert native and big-endian byte-orders to little-endian
     if dtype.byteorder == "=" or dtype.byteorder == ">":
         return dtype.newbyteorder("<")
@@ -236,13 +296,19 @@ def _sanitize_dtype(dtype: np.dtype) -> np.dtype:
 T = TypeVar("T", np.ndarray, np.number, np.bool_)
 
 
-def convert(data: T, dtype: str | None = "origin") -> T:
+def convert(
+    data: T,
+    dtype: str | None = "origin",
+    value_range: str | Sequence[float] | None = None,
+) -> T:
     """Convert array or numpy scalar to given dtype query param
 
     :param data: nD array or scalar to convert
     :param dtype: Data type conversion query parameter
         - `origin` (default): No conversion
         - `safe`: Convert to type with matching JS TypedArray (https://developer.mozilla.org/fr/docs/Web/JavaScript/Reference/Global_Objects/TypedArray)
+        - `uint8`, `uint16`, `float16`: Lossy quantization. See :func:`quantize`.
+    :param value_range: Range of values mapped to quantized integers. See :func:`quantize`.
 
     :raises QueryArgumentError: When using `dtype=safe` to convert non-numeric data
     :raises QueryArgumentError: For unsupported `dtype` argument
@@ -255,9 +321,124 @@ def convert(data: T, dtype: str | None = "origin") -> T:
             raise QueryArgumentError(f"Unsupported dtype {dtype} for non-numeric data")
         return data.astype(_sanitize_dtype(data.dtype), order="C", copy=False)
 
+    if dtype in QUANTIZED_DTYPES:
+        if not is_numeric_data(data) or data.dtype.kind == "c":
+            raise QueryArgumentError(
+                f"Unsupported dtype {dtype} for non-numeric or complex data"
+            )
+        return cast(T, quantize(np.asarray(data), dtype, value_range))
+
     raise QueryArgumentError(f"Unsupported dtype {dtype}")
 
 
+def get_converted_dtype(dtype: np.dtype, dtype_arg: str | None = "origin") -> np.dtype:
+    """Data type of the result of :func:`convert` for data of a given dtype, without converting data"""
+    if dtype_arg in ("origin", None):
+        return dtype
+    return convert(np.zeros((1,), dtype=dtype), dtype_arg).dtype
+
+
+QUANTIZED_DTYPES = ("uint8", "uint16", "float16")
+"""Data types of lossy quantized conversions"""
+
+QUANTIZATION_BLOCK_LENGTH = 1024**2
+"""Number of elements quantized at once"""
+
+
+class QuantizedArray(np.ndarray):
+    """Array of quantized values, with `quantization` describing how to restore them:
+    `value = quantized * scale + offset`, quantized values equal to `nan` being NaN.
+    """
+
+    quantization: Quantization | None = None
+
+    def __array_finalize__(self, obj):
+        self.quantization = getattr(obj, "quantization", None)
+
+    def __reduce__(self):
+        # Pickled arrays only keep their data: add quantization to their state
+        reconstruct, args, state = super().__reduce__()
+        return reconstruct, args, (state, self.quantization)
+
+    def __setstate__(self, state):
+        array_state, self.quantization = state
+        super().__setstate__(array_state)
+
+
+def _get_finite_range(data: np.ndarray) -> tuple[float, float]:
+    """Minimum and maximum of the finite values of data, block by block. (0, 0) if there are none."""
+    vmin, vmax = np.inf, -np.inf
+    flat_data = np.ravel(data)
+    for start in range(0, flat_data.size, QUANTIZATION_BLOCK_LENGTH):
+        block = flat_data[start : start + QUANTIZATION_BLOCK_LENGTH]
+        if block.dtype.kind == "f":
+            block = block[np.isfinite(block)]
+        if block.size > 0:
+            vmin = min(vmin, float(np.min(block)))
+            vmax = max(vmax, float(np.max(block)))
+    return (vmin, vmax) if vmin <= vmax else (0.0, 0.0)
+
+
+def quantize(
+    data: np.ndarray,
+    dtype: str,
+    value_range: str | Sequence[float] | None = None,
+) -> QuantizedArray:
+    """Lossy conversion of numeric data to fewer bytes per element.
+
+    For `uint8` and `uint16`, `value_range` is linearly mapped to `[0, max - 1]`, values
+    outside of it being clipped and NaN being mapped to the `max` sentinel.
+    `float16` is a plain cast (scale of 1 and offset of 0).
+    The conversion is done in blocks to bound the size of temporary arrays.
+
+    :param data: Numeric array
+    :param dtype: `uint8`, `uint16` or `float16`
+    :param value_range: `min,max` range of the values to quantize, or `auto` (default) for
+        the range of the finite values of data
+    :raises QueryArgumentError: For invalid value range
+    """
+    if dtype == "float16":
+        result = data.astype(np.float16).view(QuantizedArray)
+        result.quantization = {"dtype": dtype, "scale": 1.0, "offset": 0.0, "nan": None}
+        return result
+
+    if value_range is None or value_range == "auto":
+        vmin, vmax = _get_finite_range(data)
+    else:
+        bounds = parse_number_list(value_range)
+        if len(bounds) != 2 or not np.all(np.isfinite(bounds)) or bounds[0] > bounds[1]:
+            raise QueryArgumentError(
+                f"{value_range} is not a valid range. Expected auto or min,max"
+            )
+        vmin, vmax = float(bounds[0]), float(bounds[1])
+
+    sentinel = int(np.iinfo(dtype).max)
+    levels = sentinel - 1
+    scale = (vmax - vmin) / levels if vmax > vmin else 1.0
+
+    result = np.empty(data.shape, dtype=dtype).view(QuantizedArray)
+    flat_data = np.ravel(data)
+    flat_result = result.reshape(-1)
+    buffer = np.empty(min(flat_data.size, QUANTIZATION_BLOCK_LENGTH))
+    for start in range(0, flat_data.size, QUANTIZATION_BLOCK_LENGTH):
+        block = flat_data[start : start + QUANTIZATION_BLOCK_LENGTH]
+        values = buffer[: block.size]
+        np.subtract(block, vmin, out=values)
+        np.divide(values, scale, out=values)
+        np.rint(values, out=values)
+        np.clip(values, 0, levels, out=values)
+        values[np.isnan(values)] = sentinel
+        flat_result[start : start + block.size] = values
+
+    result.quantization = {
+        "dtype": dtype,
+        "scale": scale,
+        "offset": vmin,
+        "nan": sentinel,
+    }
+    return result
+
+
 def is_numeric_data(data: np.ndarray | np.number | np.bool_ | bytes) -> bool:
     if not isinstance(data, (np.ndarray, np.number, np.bool_)):
         return False
@@ -265,16 +446,29 @@ def is_numeric_data(data: np.ndarray | np.number | np.bool_ | bytes) -> bool:
     return np.issubdtype(data.dtype, np.number) or np.issubdtype(data.dtype, np.bool_)
 
 
-def get_array_stats(data: np.ndarray) -> Stats:
+def _get_empty_stats() -> Stats:
+    return {
+        "strict_positive_min": None,
+        "positive_min": None,
+        "min": None,
+        "max": None,
+        "mean": None,
+        "std": None,
+    }
+
+
+def get_array_stats(data: np.ndarray, where: np.ndarray | None = None) -> Stats:
+    """Compute statistics of an array.
+
+    :param data: Array on which to compute the statistics
+    :param where: Optional boolean array broadcastable to `data` selecting the elements to take into account.
+        The selected elements are not copied.
+    """
+    if where is not None:
+        return _get_masked_array_stats(data, where)
+
     if data.size == 0:
-        return {
-            "strict_positive_min": None,
-            "positive_min": None,
-            "min": None,
-            "max": None,
-            "mean": None,
-            "std": None,
-        }
+        return _get_empty_stats()
 
     cast = float if np.issubdtype(data.dtype, np.floating) else int
     strict_positive_data = data[data > 0]
@@ -295,6 +489,111 @@ def get_array_stats(data: np.ndarray) -> Stats:
     }
 
 
+def _get_masked_array_stats(data: np.ndarray, where: np.ndarray) -> Stats:
+    where = np.broadcast_to(where, data.shape)
+    if not np.any(where):
+        return _get_empty_stats()
+
+    if data.dtype.kind == "b":
+        data = data.view(np.uint8)
+
+    cast = float if np.issubdtype(data.dtype, np.floating) else int
+    return {
+        **_get_masked_extrema(data, where),  # type: ignore
+        "mean": cast(np.mean(data, where=where)),
+        "std": cast(np.std(data, where=where)),
+    }
+
+
+def _get_masked_extrema(
+    data: np.ndarray, where: np.ndarray
+) -> dict[str, int | float | None]:
+    is_float = np.issubdtype(data.dtype, np.floating)
+    cast = float if is_float else int
+    lowest, highest = (
+        (-np.inf, np.inf)
+        if is_float
+        else (np.iinfo(data.dtype).min, np.iinfo(data.dtype).max)
+    )
+
+    def masked_min(condition: np.ndarray) -> int | float | None:
+        if not np.any(condition):
+            return None
+        return cast(np.min(data, where=condition, initial=highest))
+
+    return {
+        "strict_positive_min": masked_min(where & (data > 0)),
+        "positive_min": masked_min(where & (data >= 0)),
+        "min": masked_min(where),
+        "max": cast(np.max(data, where=where, initial=lowest))
+        if np.any(where)
+        else None,
+    }
+
+
+class StatsAccumulator:
+    """Computes the statistics of :func:`get_array_stats` over successive blocks of data.
+
+    Non-finite values are ignored. Means and variances of blocks are merged pairwise
+    so that memory usage is bounded by the size of a block.
+    """
+
+    def __init__(self) -> None:
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._extrema: dict[str, int | float | None] = {}
+        self._cast: type[int] | type[float] = int
+
+    def update(self, data: np.ndarray, where: np.ndarray | None = None) -> None:
+        """Add a block of data.
+
+        :param data: Block of data
+        :param where: Optional boolean array broadcastable to `data` selecting the elements to take into account
+        """
+        data = np.asarray(data)
+        if data.dtype.kind == "b":
+            data = data.view(np.uint8)
+        if np.issubdtype(data.dtype, np.floating):
+            self._cast = float
+            finite = np.isfinite(data)
+            where = finite if where is None else finite & where
+
+        where = np.broadcast_to(True if where is None else where, data.shape)
+        count = int(np.count_nonzero(where))
+        if count == 0:
+            return
+
+        mean = float(np.mean(data, where=where, dtype=np.float64))
+        m2 = float(np.var(data, where=where, dtype=np.float64)) * count
+        total = self._count + count
+        delta = mean - self._mean
+        self._m2 += m2 + delta**2 * self._count * count / total
+        self._mean += delta * count / total
+        self._count = total
+
+        for key, value in _get_masked_extrema(data, where).items():
+            previous = self._extrema.get(key)
+            if value is None or previous is None:
+                self._extrema[key] = previous if value is None else value
+            else:
+                self._extrema[key] = (
+                    max(previous, value) if key == "max" else min(previous, value)
+                )
+
+    def result(self) -> Stats:
+        """Statistics of all the data added so far"""
+        if self._count == 0:
+            return _get_empty_stats()
+
+        return {
+            **_get_empty_stats(),
+            **self._extrema,  # type: ignore
+            "mean": self._cast(self._mean),
+            "std": self._cast(np.sqrt(self._m2 / self._count)),
+        }
+
+
 def hdf_path_join(prefix: str | None, suffix: str):
     if prefix is None or prefix == "/":
         return f"/{suffix}"
@@ -309,6 +608,16 @@ def parse_bool_arg(query_arg: str | None, fallback: bool) -> bool:
     return query_arg.lower() != "false"
 
 
+def parse_int_arg(query_arg: str | None, fallback: int) -> int:
+    if query_arg is None:
+        return fallback
+
+    try:
+        return int(query_arg)
+    except ValueError:
+        raise QueryArgumentError(f"{query_arg} is not a valid integer")
+
+
 def parse_link_resolution_arg(
     raw_query_arg: str | None, fallback: LinkResolution
 ) -> LinkResolution:
@@ -332,6 +641,36 @@ def parse_link_resolution_arg(
     )
 
 
+def parse_fields(fields: str | Sequence[str], dtype: np.dtype) -> list[str]:
+    """Parses comma-separated names of fields of a compound dtype.
+
+    :param fields: Names of the fields as a comma-separated string or a sequence
+    :param dtype: Compound dtype the fields belong to
+    :raises QueryArgumentError: If the dtype is not compound or a field does not exist
+    """
+    if dtype.names is None:
+        raise QueryArgumentError("fields can only be selected in compound datasets")
+
+    names = fields.split(",") if isinstance(fields, str) else list(fields)
+    unknown_names = [name for name in names if name not in dtype.names]
+    if unknown_names:
+        raise QueryArgumentError(f"Unknown fields: {', '.join(unknown_names)}")
+    if len(set(names)) != len(names):
+        raise QueryArgumentError(f"Duplicate fields in {', '.join(names)}")
+    return names
+
+
+def get_string_encoding(dtype: np.dtype) -> str | None:
+    """Encoding with which to decode strings of a dtype. None if it is not a string dtype.
+
+    UTF-8 is used for both the UTF-8 and ASCII character sets declared in HDF5, since
+    datasets declared as ASCII often contain UTF-8 bytes.
+    """
+    if h5py.check_string_dtype(dtype) is None:
+        return None
+    return "utf-8"
+
+
 def get_dataset_slice(dataset: h5py.Dataset, selection: Selection):
     if selection is None:
         return dataset[()]
@@ -347,6 +686,182 @@ def get_dataset_slice(dataset: h5py.Dataset, selection: Selection):
     return dataset[selection]
 
 
+def normalize_selection(
+    selection: Selection, shape: tuple[int, ...]
+) -> tuple[slice | int, ...]:
+    """Converts a selection to one non-negative index or bounded slice per dimension.
+
+    Examples for a shape of (10, 20):
+        None => (slice(0, 10, 1), slice(0, 20, 1))
+        '-1,::2' => (9, slice(0, 20, 2))
+
+    :param selection: Selection as accepted by :func:`get_dataset_slice`
+    :param shape: Shape of the array the selection applies to
+    :raises QueryArgumentError: If the selection does not fit the shape
+    """
+    if selection is None:
+        members: tuple[slice | int, ...] = ()
+    elif isinstance(selection, str):
+        members = parse_slice(selection)
+    elif isinstance(selection, tuple):
+        members = selection
+    else:
+        members = (selection,)
+
+    if len(members) > len(shape):
+        raise QueryArgumentError(
+            f"{selection} has too many members to slice a {len(shape)}D dataset"
+        )
+
+    members = (*members, *(slice(None),) * (len(shape) - len(members)))
+    normalized: list[slice | int] = []
+    for member, length in zip(members, shape):
+        if isinstance(member, slice):
+            start, stop, step = member.indices(length)
+            if step <= 0:
+                raise QueryArgumentError(
+                    f"{selection} has a non-positive step, which is not supported"
+                )
+            normalized.append(slice(start, max(start, stop), step))
+        else:
+            if not -length <= member < length:
+                raise QueryArgumentError(
+                    f"Index {member} is out of range for a dimension of length {length}"
+                )
+            normalized.append(member % length)
+
+    return tuple(normalized)
+
+
+def get_selection_shape(indices: tuple[slice | int, ...]) -> tuple[int, ...]:
+    """Shape of the array resulting from a selection normalized with :func:`normalize_selection`"""
+    return tuple(
+        len(range(member.start, member.stop, member.step))
+        for member in indices
+        if isinstance(member, slice)
+    )
+
+
+def get_aligned_blocks(
+    length: int, block_length: int, chunk_size: int | None = None, offset: int = 0
+) -> Iterator[slice]:
+    """Split `range(length)` in consecutive blocks of about `block_length` elements.
+
+    When `chunk_size` is given, blocks are made of whole chunks, `offset` being the position
+    of the first element in its chunk, so that each chunk is read by a single block.
+
+    :param length: Number of elements to split
+    :param block_length: Maximum number of elements in a block when not aligned on chunks
+    :param chunk_size: Size of the chunks on which to align blocks
+    :param offset: Position of the first element in its chunk
+    """
+    block_length = max(1, block_length)
+    if chunk_size is not None:
+        block_length = max(chunk_size, block_length // chunk_size * chunk_size)
+    else:
+        offset = 0
+
+    start = 0
+    stop = min(length, block_length - offset)
+    while start < length:
+        yield slice(start, stop)
+        start, stop = stop, min(length, stop + block_length)
+
+
+def get_selection_key(indices: tuple[slice | int, ...]) -> tuple:
+    """Hashable version of a selection normalized with :func:`normalize_selection`, to use in cache keys"""
+    return tuple(
+        (member.start, member.stop, member.step)
+        if isinstance(member, slice)
+        else member
+        for member in indices
+    )
+
+
+MASK_CACHE: LRUCache[np.ndarray] = LRUCache(maxsize=16)
+"""Masks loaded by :func:`get_mask`, keyed by mask file version and path"""
+
+
+def get_mask(h5file: h5py.File, mask_arg: str) -> np.ndarray:
+    """Get a read-only boolean array which is True for valid (i.e. unmasked) pixels.
+
+    Non-zero values of the mask dataset flag pixels to ignore (NeXus `pixel_mask` convention).
+    Masks are cached so that they are read once for all the frames they apply to.
+
+    :param h5file: File containing the masked dataset
+    :param mask_arg: Path of the mask dataset in `h5file`
+        or `<file>::<path>` for a mask stored in another file, relative to the directory of `h5file`.
+    :raises NotFoundError: If the mask file or dataset cannot be found
+    :raises QueryArgumentError: If the mask is not a numeric dataset
+        or its file is not in the directory of `h5file`
+    """
+    key = get_mask_key(h5file, mask_arg)
+    (mask_filepath, _, _), mask_path = key
+
+    def load_mask() -> np.ndarray:
+        if mask_filepath == os.path.realpath(h5file.filename):
+            return _read_mask(h5file, mask_path)
+        with h5py.File(mask_filepath, "r") as mask_file:
+            return _read_mask(mask_file, mask_path)
+
+    return MASK_CACHE.get_or_compute(key, load_mask)
+
+
+def get_mask_key(h5file: h5py.File, mask_arg: str) -> tuple[tuple[str, int, int], str]:
+    """Key identifying a version of a mask: (identity of the mask file, path of the mask).
+
+    See :func:`get_mask` for arguments.
+
+    :raises QueryArgumentError: If the mask file is not in the directory of `h5file`
+        (or one of its subdirectories)
+    """
+    if "::" in mask_arg:
+        mask_filename, mask_path = mask_arg.split("::", 1)
+        directory = os.path.realpath(os.path.dirname(h5file.filename))
+        mask_filepath = os.path.realpath(os.path.join(directory, mask_filename))
+        if os.path.commonpath((directory, mask_filepath)) != directory:
+            raise QueryArgumentError(
+                f"Mask file of {mask_arg} is outside of the directory of the file"
+            )
+    else:
+        mask_filepath, mask_path = h5file.filename, mask_arg
+
+    try:
+        return file_identity(mask_filepath), mask_path
+    except OSError:
+        raise NotFoundError(f"Mask file of {mask_arg} not found")
+
+
+def _read_mask(h5file: h5py.File, path: str) -> np.ndarray:
+    entity = get_entity_from_file(h5file, path, LinkResolution.ALL)
+    if not isinstance(entity, h5py.Dataset) or entity.dtype.kind not in "biuf":
+        raise QueryArgumentError(f"Mask {path} is not a numeric dataset")
+
+    valid = np.asarray(entity[()]) == 0
+    valid.setflags(write=False)
+    return valid
+
+
+def get_selection_mask(
+    mask: np.ndarray, shape: tuple[int, ...], selection: Selection
+) -> np.ndarray:
+    """Apply a selection of a dataset to a mask broadcast over its last dimensions.
+
+    :param mask: Mask whose shape matches the last dimensions of the dataset
+    :param shape: Shape of the dataset
+    :param selection: Selection of the dataset
+    :returns: The part of the mask broadcastable to the selected data
+    :raises QueryArgumentError: If the mask cannot be broadcast over the dataset
+    """
+    if mask.ndim > len(shape) or mask.shape != shape[len(shape) - mask.ndim :]:
+        raise QueryArgumentError(
+            f"Mask of shape {mask.shape} cannot be broadcast over dataset of shape {shape}"
+        )
+
+    indices = normalize_selection(selection, shape)
+    return mask[indices[len(indices) - mask.ndim :]]
+
+
 def get_filters(
     dataset: h5py.Dataset,
 ) -> list[dict[str, int | str]] | None:
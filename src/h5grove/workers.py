@@ -0,0 +1,257 @@
+"""Pool of worker processes reading datasets, to use several cores despite the h5py lock.
+
+h5py serializes all calls to the HDF5 library with a global lock, so that threaded servers
+use about one core to read data. When a :class:`ReaderPool` is set with :func:`set_reader_pool`,
+the methods of :class:`h5grove.content.DatasetContent` reading data run in worker processes
+instead, each keeping its own open files, opened with the same h5py options as in the calling
+process. Requests on a file are always routed to the same worker so that its open files and
+caches are reused.
+"""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, TypeVar
+
+import h5py
+import numpy as np
+
+from .cache import file_identity
+from .utils import QuantizedArray
+
+SHARED_MEMORY_MIN_BYTES = 1 << 16
+"""Size in bytes from which arrays are returned by workers through shared memory rather than pickled"""
+
+
+class ReaderPool:
+    """Worker processes reading datasets, with file-affinity routing.
+
+    :param processes: Number of worker processes. Defaults to the number of CPUs.
+    :param max_open_files: Maximum number of files kept open by each worker
+    """
+
+    def __init__(self, processes: int | None = None, max_open_files: int = 16):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_open_files = max_open_files
+        # Forking a threaded server holding the h5py lock could deadlock the workers
+        context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(max_open_files,),
+            )
+            for _ in range(self.processes)
+        ]
+
+    def get_worker_index(self, filepath: str | os.PathLike) -> int:
+        """Index of the worker reading a file.
+
+        :param filepath: Path of the file
+        """
+        realpath = os.path.realpath(filepath)
+        return zlib.crc32(realpath.encode()) % self.processes
+
+    def run(
+        self,
+        filepath: str,
+        dataset_path: str,
+        method: str,
+        args: Sequence[Any] = (),
+        kwargs: Mapping[str, Any] = {},
+        content_path: str | None = None,
+        h5py_options: Mapping[str, Any] = {},
+    ) -> Any:
+        """Call a method of the content of a dataset in the worker reading its file.
+
+        Exceptions raised in the worker are raised again.
+
+        :param filepath: Path of the file containing the dataset
+        :param dataset_path: Path of the dataset in the file
+        :param method: Name of the :class:`h5grove.content.DatasetContent` method
+        :param args: Positional arguments of the method
+        :param kwargs: Keyword arguments of the method
+        :param content_path: Path of the content used in error messages. Defaults to dataset_path.
+        :param h5py_options: Options passed to `h5py.File` to open the file in the worker
+        """
+        executor = self._executors[self.get_worker_index(filepath)]
+        result = executor.submit(
+            _run_in_worker,
+            filepath,
+            dict(h5py_options),
+            dataset_path,
+            content_path or dataset_path,
+            method,
+            tuple(args),
+            dict(kwargs),
+        ).result()
+        if isinstance(result, _SharedArray):
+            return result.load()
+        return result
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self) -> ReaderPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_reader_pool: ReaderPool | None = None
+
+
+def get_reader_pool() -> ReaderPool | None:
+    """The reader pool in use, None if data is read in the calling process"""
+    return _reader_pool
+
+
+def set_reader_pool(pool: ReaderPool | None) -> None:
+    """Set the reader pool in which data is read, or None to read data in the calling process.
+
+    The previous pool is not closed.
+
+    :param pool: Pool of worker processes
+    """
+    global _reader_pool
+    _reader_pool = pool
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def offloaded(method: F) -> F:
+    """Decorator of :class:`h5grove.content.DatasetContent` methods to run them in the
+    reader pool when one is set.
+
+    Datasets of files that workers cannot open the same way (i.e. not opened with the
+    default driver) are read in the calling process.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        dataset = self._h5py_entity
+        if _reader_pool is None or dataset.file.driver != "sec2":
+            return method(self, *args, **kwargs)
+        return _reader_pool.run(
+            dataset.file.filename,
+            dataset.name,
+            method.__name__,
+            args,
+            kwargs,
+            self.path,
+            self._h5py_options,
+        )
+
+    return wrapper  # type: ignore[return-value]
+
+
+class _SharedArray:
+    """Array copied by a worker to shared memory, pickled as the name of the memory block.
+
+    The memory block is handed over to the process loading the array, which unlinks it.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.quantization = getattr(array, "quantization", None)
+        shared_memory = SharedMemory(create=True, size=array.nbytes)
+        try:
+            np.ndarray(array.shape, array.dtype, buffer=shared_memory.buf)[...] = array
+        finally:
+            shared_memory.close()
+        # The worker does not own the block anymore: its resource tracker must not
+        # report it as leaked nor unlink it when the worker exits
+        resource_tracker.unregister(shared_memory._name, "shared_memory")  # type: ignore[attr-defined]
+        self.name = shared_memory.name
+
+    def load(self) -> np.ndarray:
+        """Copy the array out of shared memory, which is then unlinked"""
+        shared_memory = SharedMemory(name=self.name)
+        try:
+            shared = np.ndarray(self.shape, self.dtype, buffer=shared_memory.buf)
+            array = shared.copy()
+            del shared
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
+
+        if self.quantization is None:
+            return array
+        quantized = array.view(QuantizedArray)
+        quantized.quantization = self.quantization
+        return quantized
+
+
+_open_files: OrderedDict[tuple[tuple[str, int, int], str], h5py.File] = OrderedDict()
+_max_open_files = 16
+
+
+def _init_worker(max_open_files: int) -> None:
+    global _max_open_files
+    _max_open_files = max_open_files
+
+
+def _get_file(filepath: str, h5py_options: dict[str, Any]) -> h5py.File:
+    """File opened by the worker with given options, reopened when it changes on disk"""
+    identity = file_identity(filepath)
+    key = identity, repr(sorted(h5py_options.items()))
+    h5file = _open_files.get(key)
+    if h5file is None:
+        for stale_key in [
+            other
+            for other in _open_files
+            if other[0][0] == identity[0] and other[0] != identity
+        ]:
+            _open_files.pop(stale_key).close()
+        try:
+            # Files kept open must not prevent other processes from writing them
+            h5file = h5py.File(filepath, "r", **{"locking": False, **h5py_options})
+        except TypeError:  # h5py < 3.5
+            if "locking" in h5py_options:
+                raise
+            h5file = h5py.File(filepath, "r", **h5py_options)
+        _open_files[key] = h5file
+    _open_files.move_to_end(key)
+    while len(_open_files) > _max_open_files:
+        _, evicted = _open_files.popitem(last=False)
+        evicted.close()
+    return h5file
+
+
+def _run_in_worker(
+    filepath: str,
+    h5py_options: dict[str, Any],
+    dataset_path: str,
+    content_path: str,
+    method: str,
+    args: tuple,
+    kwargs: dict[str, Any],
+) -> Any:
+    # Imported here as content depends on this module
+    from .content import DatasetContent
+
+    dataset = _get_file(filepath, h5py_options)[dataset_path]
+    result = getattr(DatasetContent(content_path, dataset, h5py_options), method)(
+        *args, **kwargs
+    )
+    if (
+        isinstance(result, np.ndarray)
+        and not result.dtype.hasobject
+        and result.nbytes >= SHARED_MEMORY_MIN_BYTES
+    ):
+        return _SharedArray(result)
+    return result
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 import os
 import stat
 from collections.abc import Generator
@@ -140,6 +141,524 @@ class BaseTestEndpoints:
 
         assert retrieved_data - data[100, 0] < 1e-8
 
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    @pytest.mark.parametrize("dtype", ("uint8", "uint16"))
+    def test_data_with_quantization(self, server, format_arg, dtype):
+        """Test /data endpoint with quantized dtype"""
+        tested_h5entity_path = "/entry/image"
+        data = np.random.random((64, 32)) * 100 - 50
+        data[3, 4] = np.nan
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        def get_quantized(value_range):
+            response = server.get(
+                f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'format': format_arg, 'dtype': dtype, 'range': value_range})}"
+            )
+            quantized = decode_array_response(response, format_arg, dtype, data.shape)
+            scale = float(response.find_header_value("X-H5grove-Scale"))
+            offset = float(response.find_header_value("X-H5grove-Offset"))
+            nan = int(response.find_header_value("X-H5grove-Nan"))
+            assert nan == np.iinfo(dtype).max
+            assert quantized[3, 4] == nan
+            restored = np.where(quantized == nan, np.nan, quantized * scale + offset)
+            return quantized, restored
+
+        quantized, restored = get_quantized("auto")
+        assert np.min(quantized) == 0
+        assert np.max(quantized[np.isfinite(data)]) == np.iinfo(dtype).max - 1
+        assert np.allclose(
+            restored,
+            data,
+            atol=np.ptp(data[np.isfinite(data)]) / np.iinfo(dtype).max,
+            equal_nan=True,
+        )
+
+        # Values out of range are clipped
+        quantized, restored = get_quantized("-10,10")
+        clipped = np.clip(data, -10, 10)
+        assert np.allclose(
+            restored, clipped, atol=20 / np.iinfo(dtype).max, equal_nan=True
+        )
+
+    def test_data_with_float16(self, server):
+        """Test /data endpoint with float16 dtype"""
+        tested_h5entity_path = "/entry/image"
+        data = np.random.random((8, 4))
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'format': 'bin', 'dtype': 'float16'})}"
+        )
+        retrieved_data = decode_array_response(response, "bin", "<f2", data.shape)
+        assert np.array_equal(retrieved_data, data.astype(np.float16))
+
+    def test_422_on_invalid_quantization(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["image"] = np.zeros((4, 3))
+            h5file["strings"] = np.array([b"a", b"b"])
+
+        for query in (
+            "path=/image&dtype=uint8&range=1",
+            "path=/image&dtype=uint8&range=2,1",
+            "path=/image&dtype=uint8&range=0,inf",
+            "path=/image&dtype=int8",
+            "path=/strings&dtype=uint16",
+        ):
+            server.assert_error_code(f"/data?file={filename}&{query}", 422)
+
+    @pytest.mark.parametrize("reduction", ("mean", "sum", "max", "min"))
+    def test_data_with_binning(self, server, reduction):
+        """Test /data endpoint with binning"""
+        tested_h5entity_path = "/entry/stack"
+        data = np.arange(5 * 11 * 8, dtype="<u2").reshape(5, 11, 8)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=data, chunks=(1, 3, 8))
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'selection': '1:,1:', 'bin': '2,3,2', 'reduce': reduction, 'format': 'npy'})}"
+        )
+        retrieved_data = decode_response(response, "npy")
+
+        # Trailing elements that do not fill a bin are dropped
+        bins = data[1:5, 1:10].reshape(2, 2, 3, 3, 4, 2)
+        expected = getattr(np, reduction)(bins, axis=(1, 3, 5))
+        assert retrieved_data.shape == (2, 3, 4)
+        assert np.array_equal(retrieved_data, expected)
+
+    @pytest.mark.parametrize("reduction", ("mean", "sum", "max", "min"))
+    def test_data_with_binning_and_mask(self, server, reduction):
+        tested_h5entity_path = "/entry/stack"
+        data = np.arange(3 * 4 * 6, dtype="<u2").reshape(3, 4, 6)
+        mask = np.zeros((4, 6), dtype="<u1")
+        mask[0, 0] = 1
+        mask[2:, :2] = 1  # Masks a whole bin
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=data, chunks=(1, 2, 6))
+            h5file["/entry/mask"] = mask
+
+        url = f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'selection': '1:', 'bin': '1,2,2', 'reduce': reduction, 'mask': '/entry/mask', 'format': 'npy'})}"
+        retrieved_data = decode_response(server.get(url), "npy")
+
+        masked = np.where(mask == 0, data[1:], np.nan).reshape(2, 1, 2, 2, 3, 2)
+        masked[:, :, 1, :, 0, :] = 0  # Fully masked bin
+        expected = getattr(np, f"nan{reduction}")(masked, axis=(1, 3, 5))
+        expected[:, 1, 0] = np.nan
+        assert retrieved_data.dtype == np.float32
+        assert np.allclose(retrieved_data, expected, equal_nan=True)
+
+        response = server.head(url)
+        assert response.find_header_value("content-length") == str(
+            len(server.get(url).content)
+        )
+
+        # mask only applies to binned data
+        server.assert_error_code(
+            f"/data?file={filename}&path={tested_h5entity_path}&mask=/entry/mask",
+            422,
+        )
+
+    def test_422_on_invalid_binning(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["image"] = np.zeros((4, 3))
+            h5file["strings"] = np.array([b"a", b"b"])
+
+        for query in (
+            "path=/image&bin=2",
+            "path=/image&bin=2,0",
+            "path=/image&bin=2,a",
+            "path=/image&bin=2,2&reduce=median",
+            "path=/strings&bin=2",
+        ):
+            server.assert_error_code(f"/data?file={filename}&{query}", 422)
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin", "npy"))
+    @pytest.mark.parametrize("dtype", ("<c8", ">c16"))
+    def test_data_on_complex(self, server, format_arg, dtype):
+        """Test /data endpoint on complex dataset"""
+        tested_h5entity_path = "/entry/complex"
+        data = (np.random.random((4, 3)) + 1j * np.random.random((4, 3))).astype(dtype)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'format': format_arg, 'dtype': 'safe'})}"
+        )
+
+        safe_dtype = np.dtype(dtype).newbyteorder("<")
+        if format_arg == "json":
+            # Nested [real, imaginary] pairs
+            parts = np.asarray(decode_response(response, format_arg))
+            assert parts.shape == (4, 3, 2)
+            retrieved_data = parts.astype(data.real.dtype).view(data.dtype)[..., 0]
+            assert np.array_equal(retrieved_data, data)
+            return
+
+        if format_arg == "bin":
+            assert response.find_header_value("X-H5grove-Dtype") == safe_dtype.str
+        retrieved_data = decode_array_response(
+            response, format_arg, safe_dtype.str, data.shape
+        )
+        assert retrieved_data.dtype == safe_dtype
+        assert np.array_equal(retrieved_data, data)
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    @pytest.mark.parametrize("fixed_length", (True, False))
+    def test_data_on_strings(self, server, format_arg, fixed_length):
+        """Test /data endpoint on string dataset"""
+        tested_h5entity_path = "/entry/strings"
+        data = np.array([["a", "é"], ["", "abc"], ["日本", "z"]], dtype=object)
+        if fixed_length:
+            dtype = np.dtype("S6")
+            stored = np.char.encode(data.astype(str), "utf-8")
+        else:
+            dtype = h5py.string_dtype()
+            stored = data
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=stored, dtype=dtype)
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'selection': '1:', 'format': format_arg})}"
+        )
+
+        if format_arg == "json":
+            assert decode_response(response) == data[1:].tolist()
+            return
+
+        assert response.find_header_value("X-H5grove-Offsets") == "5"
+        assert response.find_header_value("X-H5grove-Shape") == "[2,2]"
+        offsets = np.frombuffer(response.content[: 5 * 8], dtype="<i8")
+        strings = response.content[5 * 8 :]
+        assert offsets.tolist() == [0, 0, 3, 9, 10]
+        assert [
+            strings[start:end].decode() for start, end in zip(offsets, offsets[1:])
+        ] == ["", "abc", "日本", "z"]
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    def test_data_on_ragged(self, server, format_arg):
+        """Test /data endpoint on variable-length numeric dataset"""
+        tested_h5entity_path = "/entry/hits"
+        rows = [
+            np.arange(length, dtype="<i4") * length for length in (3, 0, 1, 4, 2, 5)
+        ]
+        data = np.empty((3, 2), dtype=object)
+        data.ravel()[:] = rows
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(
+                tested_h5entity_path, data=data, dtype=h5py.vlen_dtype("<i4")
+            )
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'selection': '1:', 'format': format_arg})}"
+        )
+
+        if format_arg == "json":
+            assert decode_response(response) == [
+                [row.tolist() for row in rows[2:4]],
+                [row.tolist() for row in rows[4:6]],
+            ]
+            return
+
+        assert response.find_header_value("X-H5grove-Offsets") == "5"
+        assert response.find_header_value("X-H5grove-Dtype") == "<i4"
+        assert response.find_header_value("X-H5grove-Shape") == "[2,2]"
+        offsets = np.frombuffer(response.content[: 5 * 8], dtype="<i8")
+        values = np.frombuffer(response.content[5 * 8 :], dtype="<i4")
+        assert offsets.tolist() == [0, 1, 5, 7, 12]
+        assert np.array_equal(values, np.concatenate(rows[2:]))
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    def test_data_with_fields(self, server, format_arg):
+        """Test /data endpoint on a selection of fields of a compound dataset"""
+        tested_h5entity_path = "/entry/events"
+        data = np.zeros(
+            5, dtype=[("time", "<f8"), ("label", "S4"), ("x", "<i2"), ("y", "<f4")]
+        )
+        data["time"] = np.linspace(0, 1, 5)
+        data["x"] = np.arange(5)
+        data["y"] = -np.arange(5)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'selection': '1:4', 'fields': 'x,y', 'format': format_arg})}"
+        )
+
+        if format_arg == "json":
+            assert decode_response(response) == [[1, -1], [2, -2], [3, -3]]
+        else:
+            layout = json.loads(response.find_header_value("X-H5grove-Fields"))
+            assert layout == [["x", "<i2", 0], ["y", "<f4", 8]]
+            assert response.find_header_value("X-H5grove-Shape") == "[3]"
+            assert np.array_equal(
+                np.frombuffer(response.content[:6], dtype="<i2"), data["x"][1:4]
+            )
+            assert np.array_equal(
+                np.frombuffer(response.content[8:], dtype="<f4"), data["y"][1:4]
+            )
+
+        # A single field is returned as a plain array
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'fields': 'time', 'format': format_arg})}"
+        )
+        retrieved = decode_array_response(response, format_arg, "<f8", (5,))
+        assert np.array_equal(retrieved, data["time"])
+
+    def test_422_on_invalid_fields(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["compound"] = np.zeros(3, dtype=[("a", "<i4"), ("b", "S2")])
+            h5file["numbers"] = np.arange(3)
+
+        for path, fields, endpoint in (
+            ("/compound", "a,c", "data"),
+            ("/compound", "a,a", "data"),
+            ("/numbers", "a", "data"),
+            ("/compound", "b", "stats"),
+            ("/numbers", "a", "stats"),
+        ):
+            server.assert_error_code(
+                f"/{endpoint}?{urlencode({'file': filename, 'path': path, 'fields': fields})}",
+                422,
+            )
+
+        server.assert_error_code(
+            f"/data?{urlencode({'file': filename, 'path': '/compound', 'fields': 'a', 'bin': '2'})}",
+            422,
+        )
+        server.assert_error_code(
+            f"/data?{urlencode({'file': filename, 'path': '/compound', 'fields': 'a', 'selection': '1,2'})}",
+            422,
+        )
+        server.assert_error_code(
+            f"/stats?{urlencode({'file': filename, 'path': '/compound', 'fields': 'a', 'selection': '1,2'})}",
+            422,
+        )
+
+    def test_data_on_arrow(self, server):
+        """Test /data endpoint with the arrow format on compound, nD and string datasets"""
+        pytest.importorskip("pyarrow")
+        table = np.zeros(4, dtype=[("x", "<i4"), ("y", ">f8"), ("label", "S3")])
+        table["x"] = np.arange(4)
+        table["y"] = np.linspace(0, 1, 4)
+        table["label"] = [b"a", b"bc", b"", b"def"]
+        cube = np.arange(24, dtype="<f4").reshape(2, 3, 4)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["table"] = table
+            h5file["cube"] = cube
+            h5file.create_dataset(
+                "strings", data=["é", "xy"], dtype=h5py.string_dtype()
+            )
+
+        response = server.get(f"/data?file={filename}&path=/table&format=arrow")
+        retrieved = decode_response(response, "arrow")
+        assert retrieved.column_names == ["x", "y", "label"]
+        assert retrieved.to_pydict() == {
+            "x": table["x"].tolist(),
+            "y": table["y"].tolist(),
+            "label": ["a", "bc", "", "def"],
+        }
+
+        response = server.get(
+            f"/data?file={filename}&path=/cube&selection=:,1:&format=arrow"
+        )
+        retrieved = decode_response(response, "arrow")
+        assert json.loads(retrieved.schema.metadata[b"shape"]) == [2, 2, 4]
+        assert np.array_equal(
+            np.asarray(retrieved["data"].combine_chunks().flatten()).reshape(2, 2, 4),
+            cube[:, 1:],
+        )
+
+        response = server.get(f"/data?file={filename}&path=/strings&format=arrow")
+        assert decode_response(response, "arrow").to_pydict() == {"data": ["é", "xy"]}
+
+    def test_data_with_json_digits(self, server):
+        tested_h5entity_path = "/entry/values"
+        data = np.array([np.pi, -123456.7, 1.23456e-8, 0, np.nan, np.inf, -np.inf])
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'json_digits': 3})}"
+        )
+        assert response.content == b"[3.14,-123000.0,1.23e-8,0.0,null,null,null]"
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'json_nan': 'string'})}"
+        )
+        assert decode_response(response)[3:] == [0, "NaN", "Infinity", "-Infinity"]
+
+        # Quantized data keeps the headers needed to restore it
+        for quantized_dtype in ("float16", "uint8"):
+            response = server.get(
+                f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, 'dtype': quantized_dtype, 'json_digits': 3, 'json_nan': 'string'})}"
+            )
+            assert response.find_header_value("X-H5grove-Scale") is not None
+            assert response.find_header_value("X-H5grove-Offset") is not None
+            if quantized_dtype == "float16":
+                assert decode_response(response)[:2] == [3.14, "-Infinity"]
+            else:
+                assert response.find_header_value("X-H5grove-Nan") == "255"
+
+        for args in ({"json_digits": 0}, {"json_nan": "nan"}):
+            server.assert_error_code(
+                f"/data?{urlencode({'file': filename, 'path': tested_h5entity_path, **args})}",
+                422,
+            )
+
+    def test_head_on_data(self, server):
+        """Test HEAD requests on /data, /stats and /meta describing responses without content"""
+        data = np.arange(100 * 60, dtype=">f8").reshape(100, 60)
+        table = np.zeros(10, dtype=[("x", "<i4"), ("y", "<f8")])
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(
+                "chunked", data=data, chunks=(10, 20), compression="gzip"
+            )
+            h5file["contiguous"] = data
+            h5file["table"] = table
+
+        for path, args in (
+            ("/chunked", {"format": "bin", "selection": "5:25,::2"}),
+            ("/chunked", {"format": "npy", "dtype": "safe", "bin": "3,7"}),
+            ("/contiguous", {"format": "bin", "bin": "2,2", "reduce": "max"}),
+            ("/contiguous", {"format": "npy", "selection": "3"}),
+            ("/table", {"format": "bin"}),
+            ("/table", {"format": "bin", "fields": "y"}),
+        ):
+            url = f"/data?{urlencode({'file': filename, 'path': path, **args})}"
+            response = server.head(url)
+            assert response.find_header_value("X-H5grove-Exact-Length") == "true"
+            get_response = server.get(url)
+            assert response.find_header_value("content-length") == str(
+                len(get_response.content)
+            )
+            assert response.find_header_value(
+                "content-type"
+            ) == get_response.find_header_value("content-type")
+
+        response = server.head(
+            f"/data?file={filename}&path=/chunked&selection=5:25,30:"
+        )
+        assert response.find_header_value("X-H5grove-Exact-Length") == "false"
+        assert int(response.find_header_value("content-length")) > 0
+        assert response.find_header_value("X-H5grove-Chunks") == "6"
+        with h5py.File(server.served_directory / filename, mode="r") as h5file:
+            dsid = h5file["chunked"].id
+            expected_bytes = sum(
+                dsid.get_chunk_info_by_coord(offset).size
+                for offset in ((0, 20), (0, 40), (10, 20), (10, 40), (20, 20), (20, 40))
+            )
+        assert response.find_header_value("X-H5grove-Stored-Bytes") == str(
+            expected_bytes
+        )
+
+        response = server.head(f"/data?file={filename}&path=/contiguous&selection=3")
+        assert response.find_header_value("X-H5grove-Stored-Bytes") == str(60 * 8)
+        with pytest.raises(KeyError):
+            response.find_header_value("X-H5grove-Chunks")
+
+        # Chunks after the last selected index are not read
+        response = server.head(
+            f"/data?file={filename}&path=/chunked&selection=0:35:9,:20"
+        )
+        assert response.find_header_value("X-H5grove-Chunks") == "3"
+        with h5py.File(server.served_directory / filename, mode="r") as h5file:
+            dsid = h5file["chunked"].id
+            expected_bytes = sum(
+                dsid.get_chunk_info_by_coord(offset).size
+                for offset in ((0, 0), (10, 0), (20, 0))
+            )
+        assert response.find_header_value("X-H5grove-Stored-Bytes") == str(
+            expected_bytes
+        )
+
+        response = server.head(f"/stats?file={filename}&path=/chunked&selection=:10")
+        assert response.find_header_value("X-H5grove-Chunks") == "3"
+        assert int(response.find_header_value("content-length")) > 0
+        assert response.find_header_value("content-type") == "application/json"
+
+        response = server.head(f"/data?file={filename}&path=/chunked&selection=0")
+        assert response.find_header_value("content-type") == "application/json"
+
+        url = f"/meta?file={filename}&path=/table"
+        response = server.head(url)
+        assert response.find_header_value("content-length") == str(
+            len(server.get(url).content)
+        )
+
+    def test_data_with_explain(self, server):
+        """Test /data and /stats endpoints returning the plan of the read of a selection"""
+        data = np.arange(100 * 60, dtype="<f4").reshape(100, 60)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(
+                "chunked", data=data, chunks=(10, 20), compression="gzip"
+            )
+            h5file["contiguous"] = data
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': '/chunked', 'selection': '5:30,20:', 'explain': True, 'format': 'bin'})}"
+        )
+        plan = decode_response(response)
+        assert plan["selection"] == [[5, 30, 1], [20, 60, 1]]
+        assert plan["shape"] == [25, 40]
+        assert plan["chunk_shape"] == [10, 20]
+        assert [f["name"] for f in plan["filters"]] == ["deflate"]
+        assert plan["chunks"] == 6
+        assert plan["full_chunks"] == 4
+        assert plan["partial_chunks"] == 2
+        assert plan["stored_chunks"] == 6
+        assert 0 < plan["stored_bytes"] < plan["decoded_bytes"]
+        assert plan["decoded_bytes"] == 6 * 10 * 20 * 4
+        assert plan["selected_bytes"] == 25 * 40 * 4
+        assert plan["read_amplification"] == 1.2
+        assert plan["content_length"] == 25 * 40 * 4
+        assert plan["exact_length"] is True
+
+        response = server.get(
+            f"/data?file={filename}&path=/chunked&selection=0:35:9,:20&explain=true"
+        )
+        plan = decode_response(response)
+        assert plan["shape"] == [4, 20]
+        assert plan["chunks"] == plan["stored_chunks"] == 3
+        assert plan["full_chunks"] == 0
+        assert plan["decoded_bytes"] == 3 * 10 * 20 * 4
+
+        response = server.get(
+            f"/stats?file={filename}&path=/contiguous&selection=3&explain=true"
+        )
+        plan = decode_response(response)
+        assert plan["chunks"] is None
+        assert plan["selected_bytes"] == plan["decoded_bytes"] == 60 * 4
+        assert plan["read_amplification"] == 1
+        assert "content_length" not in plan
+
     def test_data_on_bool(self, server):
         """Test /data endpoint on boolean dataset with format=bin"""
         tested_h5entity_path = "/bool"
@@ -180,6 +699,87 @@ class BaseTestEndpoints:
         retrieved_data = np.void(response.content)
         assert np.array_equal(retrieved_data, data)
 
+    @pytest.mark.parametrize("format_arg", ("json", "bin", "npy"))
+    def test_expr(self, server, format_arg):
+        """Test /expr endpoint with background subtraction and monitor normalization"""
+        frames = np.random.random((4, 8, 8))
+        dark = np.random.random((8, 8))
+        monitor = np.arange(1, 5, dtype="<f4")
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset("/entry/frames", data=frames, chunks=(1, 8, 8))
+            h5file["/entry/dark"] = dark
+            h5file["/entry/I0"] = monitor
+
+        expression = (
+            "('/entry/frames'[1:] - '/entry/dark') / '/entry/I0'[1:, None, None]"
+        )
+        response = server.get(
+            f"/expr?{urlencode({'file': filename, 'expr': expression, 'format': format_arg})}"
+        )
+        expected = (frames[1:] - dark) / monitor[1:, None, None]
+        retrieved_data = decode_array_response(
+            response, format_arg, expected.dtype.str, expected.shape
+        )
+
+        assert np.allclose(retrieved_data, expected)
+
+    def test_expr_binned(self, server):
+        data = np.arange(7 * 4, dtype="<f8").reshape(7, 4)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset("data", data=data, chunks=(3, 4))
+
+        query = {"expr": "2 * '/data'", "bin": "2,2", "reduce": "max", "format": "bin"}
+        response = server.get(f"/expr?{urlencode({'file': filename, **query})}")
+        expected = (2 * data)[:6].reshape(3, 2, 2, 2).max(axis=(1, 3))
+        retrieved_data = decode_array_response(
+            response, "bin", expected.dtype.str, expected.shape
+        )
+        assert np.array_equal(retrieved_data, expected)
+
+    def test_expr_stats(self, server):
+        data = np.arange(12, dtype="<f8").reshape(3, 4)
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["data"] = data
+
+        expression = "where('/data' > 2, sqrt('/data'), -1)"
+        response = server.get(
+            f"/expr/stats?{urlencode({'file': filename, 'expr': expression})}"
+        )
+        retrieved_stats = decode_response(response)
+
+        expected = np.where(data > 2, np.sqrt(data), -1)
+        assert retrieved_stats["min"] == -1
+        assert retrieved_stats["max"] == pytest.approx(expected.max())
+        assert retrieved_stats["mean"] == pytest.approx(expected.mean())
+        assert retrieved_stats["std"] == pytest.approx(expected.std())
+
+    def test_404_and_422_on_invalid_expr(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["data"] = np.zeros((4, 3))
+            h5file["int"] = np.arange(3)
+            h5file["u8"] = np.arange(3, dtype=np.uint8)
+
+        for expression, error_code in (
+            ("'/not_a_path' + 1", 404),
+            ("'/int' ** -1", 422),
+            ("'/u8' * 1000", 422),
+            ("__import__('os')", 422),
+            ("'/data'.T", 422),
+            ("'/data' + '/data'[0:2]", 422),
+            ("'/data' +", 422),
+        ):
+            server.assert_error_code(
+                f"/expr?{urlencode({'file': filename, 'expr': expression})}",
+                error_code,
+            )
+
     def test_meta_on_datatype(self, server):
         """Test /meta endpoint on a committed datatype"""
         filename = "test.h5"
@@ -411,6 +1011,48 @@ class BaseTestEndpoints:
         assert retrieved_attr_name == list(attributes.keys())
         assert retrieved_children_name == children
 
+    def test_meta_with_inline_values(self, server):
+        """Test /meta endpoint including values of small attributes and datasets"""
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            entry = h5file.create_group("entry")
+            entry.attrs["NX_class"] = "NXentry"
+            entry.attrs["big"] = np.arange(100)
+            entry["title"] = "Scan 12"
+            entry["energy"] = 12.5
+            entry["energy"].attrs["units"] = "keV"
+            entry["image"] = np.zeros((16, 16))
+            # Variable-length strings are stored as small pointers
+            entry.attrs["long_text"] = "a" * 100000
+            entry["long_title"] = "b" * 100000
+            entry["names"] = np.array(["c" * 100, "d"], dtype=h5py.string_dtype())
+            entry["short_names"] = np.array(["e", "f"], dtype=h5py.string_dtype())
+
+        response = server.get(
+            f"/meta?{urlencode({'file': filename, 'path': '/entry', 'inline_values': 64})}"
+        )
+        content = decode_response(response)
+
+        attributes = {attr["name"]: attr for attr in content["attributes"]}
+        assert attributes["NX_class"]["value"] == "NXentry"
+        assert "value" not in attributes["big"]
+
+        children = {child["name"]: child for child in content["children"]}
+        assert children["title"]["value"] == "Scan 12"
+        assert children["energy"]["value"] == 12.5
+        assert children["energy"]["attributes"][0]["value"] == "keV"
+        assert "value" not in children["image"]
+        assert "value" not in attributes["long_text"]
+        assert "value" not in children["long_title"]
+        assert "value" not in children["names"]
+        assert children["short_names"]["value"] == ["e", "f"]
+
+        # Values are not included by default
+        response = server.get(f"/meta?file={filename}&path=/entry/energy")
+        content = decode_response(response)
+        assert "value" not in content
+        assert "value" not in content["attributes"][0]
+
     @pytest.mark.parametrize(
         "resolve_links",
         (LinkResolution.NONE, LinkResolution.ONLY_VALID, LinkResolution.ALL),
@@ -449,6 +1091,461 @@ class BaseTestEndpoints:
                 "type": {"class": 1, "dtype": "<f8", "order": 0, "size": 8},
             }
 
+    @pytest.mark.parametrize("format_arg", ("png", "npy"))
+    def test_preview(self, server, format_arg):
+        tested_h5entity_path = "/entry/stack"
+        stack = np.zeros((2, 30, 20))
+        stack[1] = np.arange(600).reshape(30, 20)
+        stack[1, 0, 0] = np.nan
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=stack, chunks=(1, 7, 20))
+            mask = np.zeros((30, 20), dtype="<u1")
+            mask[-2:, -2:] = 1
+            h5file["/entry/mask"] = mask
+
+        def get_preview(**params):
+            query = urlencode(
+                {
+                    "file": filename,
+                    "path": tested_h5entity_path,
+                    "format": format_arg,
+                    **params,
+                }
+            )
+            return decode_response(server.get(f"/preview?{query}"), format_arg)
+
+        # Binned by 2 to fit in 16 pixels
+        image = get_preview(selection="1", size=16)
+        assert image.shape == (15, 10, 4)
+        assert image.dtype == np.uint8
+        # The bin containing NaN is transparent
+        assert image[0, 0, 3] == 0
+        assert np.count_nonzero(image[..., 3] == 255) == 15 * 10 - 1
+        assert np.all(image[0, 1, :3] == 0)
+        assert np.all(image[-1, -1, :3] == 255)
+        assert np.all(np.diff(image[:, 0, 0].astype(int)) >= 0)
+
+        # Cached previews are served again
+        assert np.array_equal(get_preview(selection="1", size=16), image)
+
+        # Bins without unmasked pixels are transparent
+        masked_image = get_preview(selection="1", size=16, mask="/entry/mask")
+        assert masked_image[-1, -1, 3] == 0
+        assert np.count_nonzero(masked_image[..., 3] == 255) == 15 * 10 - 2
+
+        # Non-finite values and values outside the clipped range
+        image = get_preview(selection="1", size=30, clip="10,90", colormap="viridis")
+        assert image.shape == (30, 20, 4)
+        assert image[0, 0, 3] == 0
+        assert np.array_equal(image[0, 1], image[1, 0])
+        assert np.array_equal(image[0, 1, :3], [0x44, 0x01, 0x54])
+        assert np.array_equal(image[-1, -1, :3], [0xFD, 0xE7, 0x25])
+
+    def test_422_on_invalid_preview_args(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["stack"] = np.zeros((2, 4, 3))
+
+        for query in (
+            "",
+            "&selection=0&colormap=jet",
+            "&selection=0&scale=sqrt",
+            "&selection=0&clip=90,10",
+            "&selection=0&size=0",
+            "&selection=0&format=jpeg",
+        ):
+            server.assert_error_code(
+                f"/preview?file={filename}&path=/stack{query}", 422
+            )
+
+    def test_profile(self, server):
+        tested_h5entity_path = "/entry/stack"
+        rows, cols = np.mgrid[0:16, 0:12]
+        image = (rows * 10 + cols).astype("<f4")
+        stack = np.stack([image, image + 100])
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=stack, chunks=(1, 4, 4))
+
+        def get_profile(format_arg="json", **params):
+            response = server.get(
+                f"/profile?{urlencode({'file': filename, 'path': tested_h5entity_path, 'format': format_arg, **params})}"
+            )
+            return np.asarray(decode_response(response, format_arg))
+
+        # Bilinear interpolation is exact on a linear ramp
+        assert np.allclose(
+            get_profile(start="0,0", end="3,4", selection="0"),
+            np.linspace(0, 34, 6),
+        )
+        assert np.allclose(
+            get_profile(start="2,1", end="2,9", width=3),
+            [np.arange(21, 30), np.arange(121, 130)],
+        )
+        assert np.allclose(
+            get_profile(start="0.4,0.4", end="0.4,4.4", method="nearest", selection=1),
+            np.arange(100, 105),
+        )
+
+        # Samples outside of the image are NaN
+        profile = get_profile("npy", start="15,10", end="15,13", selection="0")
+        assert np.allclose(profile[:2], [160, 161])
+        assert np.all(np.isnan(profile[2:]))
+
+    def test_422_on_invalid_profile_args(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["image"] = np.zeros((4, 3))
+            h5file["line"] = np.zeros((4,))
+
+        for query in (
+            "path=/line&start=0,0&end=1,1",
+            "path=/image&start=0&end=1,1",
+            "path=/image&start=0,a&end=1,1",
+            "path=/image&start=0,0&end=1,1&method=cubic",
+            "path=/image&start=0,0&end=1,1&width=0",
+            "path=/image&start=0,0&end=nan,1",
+            "path=/image&start=inf,0&end=1,1",
+            "path=/image&start=0,0&end=1e7,1e7",
+            "path=/image&start=0,0&end=2000,0&width=1000",
+        ):
+            server.assert_error_code(f"/profile?file={filename}&{query}", 422)
+
+    def test_roi(self, server):
+        tested_h5entity_path = "/entry/stack"
+        stack = np.random.random((5, 12, 10))
+        stack[1, 2, 3] = np.nan
+        mask = np.zeros((12, 10), dtype="<u1")
+        mask[3, 3] = 1
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=stack, chunks=(2, 4, 4))
+            h5file["/entry/mask"] = mask
+
+        def get_roi(*rois, format_arg="npy", **params):
+            query = urlencode(
+                {
+                    "file": filename,
+                    "path": tested_h5entity_path,
+                    "format": format_arg,
+                    "roi": rois,
+                    **params,
+                },
+                doseq=True,
+            )
+            response = server.get(f"/roi?{query}")
+            return decode_response(response, format_arg)
+
+        rectangle = stack[:, 2:4, 3:6]
+        valid = np.isfinite(rectangle)
+        assert np.allclose(
+            get_roi("2:4,3:6"), [np.sum(rectangle, axis=(1, 2), where=valid)]
+        )
+
+        # Triangle containing pixel centers (0, 0), (0, 1), (1, 0)
+        triangle = stack[:, 0, 0] + stack[:, 0, 1] + stack[:, 1, 0]
+        rois = get_roi("2:4,3:6", "0,0;0,1.5;1.5,0", reduce="mean", selection="::2")
+        assert rois.shape == (2, 3)
+        assert np.allclose(rois[0], np.mean(rectangle[::2], axis=(1, 2)))
+        assert np.allclose(rois[1], triangle[::2] / 3)
+
+        # Masked pixels are ignored
+        valid[:, 1, 0] = False
+        assert np.allclose(
+            get_roi("2:4,3:6", reduce="mean", mask="/entry/mask", format_arg="json"),
+            [np.mean(rectangle, axis=(1, 2), where=valid)],
+        )
+
+    def test_422_on_invalid_roi_args(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["image"] = np.zeros((4, 3))
+
+        for query in (
+            "",
+            "&roi=0:2,0:2&reduce=median",
+            "&roi=0,0;1,1",
+            "&roi=0:2,0:2,0:1",
+        ):
+            server.assert_error_code(f"/roi?file={filename}&path=/image{query}", 422)
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    def test_chunks(self, server, format_arg):
+        """Test /chunks endpoint listing the stored chunks of a dataset page by page"""
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            dset = h5file.create_dataset(
+                "chunked", shape=(25, 30), dtype="<f4", chunks=(10, 20)
+            )
+            dset[:20] = 1  # Last row of chunks is not allocated
+            h5file["contiguous"] = np.zeros(3)
+
+            dsid = dset.id
+            infos = [dsid.get_chunk_info(i) for i in range(dsid.get_num_chunks())]
+
+        response = server.get(f"/chunks?file={filename}&path=/chunked&summary=true")
+        assert decode_response(response) == {
+            "shape": [25, 30],
+            "chunk_shape": [10, 20],
+            "grid": [3, 2],
+            "count": 4,
+            "stored_bytes": sum(info.size for info in infos),
+        }
+
+        response = server.get(
+            f"/chunks?file={filename}&path=/chunked&offset=1&limit=2&format={format_arg}"
+        )
+        expected = infos[1:3]
+        if format_arg == "json":
+            assert decode_response(response) == [
+                [list(info.chunk_offset), info.byte_offset, info.size, info.filter_mask]
+                for info in expected
+            ]
+        else:
+            layout = json.loads(response.find_header_value("X-H5grove-Fields"))
+            assert [name for name, _, _ in layout] == [
+                "offset",
+                "byte_offset",
+                "size",
+                "filter_mask",
+            ]
+            offsets = np.frombuffer(response.content[: 2 * 2 * 8], dtype="<i8").reshape(
+                2, 2
+            )
+            assert offsets.tolist() == [list(info.chunk_offset) for info in expected]
+            sizes_start = layout[2][2]
+            assert np.frombuffer(
+                response.content[sizes_start : sizes_start + 16], dtype="<i8"
+            ).tolist() == [info.size for info in expected]
+
+        server.assert_error_code(f"/chunks?file={filename}&path=/contiguous", 422)
+        server.assert_error_code(
+            f"/chunks?file={filename}&path=/chunked&offset=-1", 422
+        )
+
+    def test_data_with_known_hashes(self, server):
+        """Test /data endpoint returning only the chunks whose hash is not known"""
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(
+                "growing",
+                data=np.arange(40, dtype="<i4").reshape(20, 2),
+                chunks=(10, 2),
+                maxshape=(None, 2),
+                compression="gzip",
+            )
+
+        response = server.get(f"/chunks?file={filename}&path=/growing&hashes=true")
+        known_hashes = [chunk[-1] for chunk in decode_response(response)]
+        assert len(known_hashes) == 2
+        assert len(set(known_hashes)) == 2
+
+        with h5py.File(server.served_directory / filename, mode="a") as h5file:
+            dset = h5file["growing"]
+            dset.resize(25, axis=0)
+            dset[20:] = -1
+            dset[0, 0] = 100
+
+        response = server.get(
+            f"/data?{urlencode({'file': filename, 'path': '/growing', 'known_hashes': ','.join(known_hashes), 'format': 'bin'})}"
+        )
+        layout = json.loads(response.find_header_value("X-H5grove-Fields"))
+        assert layout == [
+            ["offset", "<i8", 0],
+            ["hash", "|S16", 32],
+            ["data", "<i4", 64],
+        ]
+        offsets = np.frombuffer(response.content[:32], dtype="<i8").reshape(2, 2)
+        assert sorted(offsets.tolist()) == [[0, 0], [20, 0]]
+        chunks = np.frombuffer(response.content[64:], dtype="<i4").reshape(2, 10, 2)
+        expected_first_chunk = np.arange(20, dtype="<i4").reshape(10, 2)
+        expected_first_chunk[0, 0] = 100
+        expected_last_chunk = np.zeros((10, 2), dtype="<i4")  # Filled with fill value
+        expected_last_chunk[:5] = -1
+        for offset, chunk in zip(offsets, chunks):
+            assert np.array_equal(
+                chunk, expected_first_chunk if offset[0] == 0 else expected_last_chunk
+            )
+
+        # Without known hashes, all chunks are returned
+        response = server.get(f"/data?file={filename}&path=/growing&known_hashes=")
+        assert len(decode_response(response)) == 3
+
+        # Changed chunks are paginated
+        pages = [
+            decode_response(
+                server.get(
+                    f"/data?file={filename}&path=/growing&known_hashes=&limit=2&offset={offset}"
+                )
+            )
+            for offset in (0, 2)
+        ]
+        assert [len(page) for page in pages] == [2, 1]
+        assert [chunk[0] for chunk in pages[0] + pages[1]] == [
+            chunk[0] for chunk in decode_response(response)
+        ]
+        server.assert_error_code(
+            f"/data?file={filename}&path=/growing&known_hashes=&offset=-1", 422
+        )
+
+        # Known hashes can be sent in the body of a POST request
+        response = server.post(
+            f"/data?file={filename}&path=/growing&offset=1",
+            "\n".join(known_hashes).encode(),
+        )
+        changed = decode_response(response)
+        assert len(changed) == 1
+        assert changed[0][0] in ([0, 0], [20, 0])
+
+    @pytest.mark.parametrize("format_arg", ("json", "bin"))
+    def test_query(self, server, format_arg):
+        tested_h5entity_path = "/entry/events"
+        data = np.zeros(
+            100, dtype=[("energy", "<f8"), ("detector", "<i4"), ("name", "S4")]
+        )
+        data["energy"] = np.linspace(0, 99, 100)
+        data["detector"] = np.arange(100) % 4
+        data["name"] = [b"ab", b"cd"] * 50
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=data, chunks=(16,))
+
+        where = '(10 <= energy < 50) & (detector in (1, 2)) and name == "cd"'
+        expected = np.flatnonzero(
+            (data["energy"] >= 10)
+            & (data["energy"] < 50)
+            & np.isin(data["detector"], (1, 2))
+            & (data["name"] == b"cd")
+        )
+
+        response = server.get(
+            f"/query?{urlencode({'file': filename, 'path': tested_h5entity_path, 'where': where, 'fields': 'energy', 'offset': 2, 'limit': 5, 'format': format_arg})}"
+        )
+        indices = expected[2:7]
+        if format_arg == "json":
+            assert decode_response(response) == [
+                [int(i), data["energy"][i]] for i in indices
+            ]
+        else:
+            layout = json.loads(response.find_header_value("X-H5grove-Fields"))
+            assert layout == [["index", "<i8", 0], ["energy", "<f8", 40]]
+            assert np.array_equal(
+                np.frombuffer(response.content[:40], dtype="<i8"), indices
+            )
+            assert np.array_equal(
+                np.frombuffer(response.content[40:], dtype="<f8"),
+                data["energy"][indices],
+            )
+
+        response = server.get(
+            f"/query?{urlencode({'file': filename, 'path': tested_h5entity_path, 'where': where, 'count': True})}"
+        )
+        assert decode_response(response) == len(expected)
+
+    def test_422_on_invalid_query(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["table"] = np.zeros(3, dtype=[("a", "<i4"), ("b", "S2")])
+            h5file["numbers"] = np.arange(3)
+
+        for path, where in (
+            ("/numbers", "a > 0"),
+            ("/table", "c > 0"),
+            ("/table", "a > "),
+            ("/table", "a"),
+            ("/table", "1 < 2"),
+            ("/table", "a == 'x'"),
+            ("/table", "a < b"),
+            ("/table", "abs(a) > 1"),
+        ):
+            server.assert_error_code(
+                f"/query?{urlencode({'file': filename, 'path': path, 'where': where})}",
+                422,
+            )
+
+        server.assert_error_code(
+            f"/query?{urlencode({'file': filename, 'path': '/table', 'where': 'a > 0', 'limit': -1})}",
+            422,
+        )
+
+    def test_radial(self, server):
+        tested_h5entity_path = "/entry/stack"
+        stack = np.random.random((3, 9, 7))
+        stack[1, 4, 5] = np.nan
+        mask = np.zeros((9, 7), dtype="<u1")
+        mask[0, 0] = 1
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=stack, chunks=(2, 4, 4))
+            h5file["/entry/mask"] = mask
+
+        def get_radial(format_arg="npy", **params):
+            query = urlencode(
+                {
+                    "file": filename,
+                    "path": tested_h5entity_path,
+                    "format": format_arg,
+                    **params,
+                }
+            )
+            response = server.get(f"/radial?{query}")
+            return decode_response(response, format_arg)
+
+        rows, cols = np.indices((9, 7))
+        radius = np.hypot(rows - 4, cols - 3)
+        bin_map = np.minimum((radius * 4 / radius.max()).astype(int), 3)
+        valid = np.isfinite(stack)
+
+        def expected(frame, bin_map, n_bins, valid=valid):
+            return [
+                np.mean(stack[frame], where=(bin_map == i) & valid[frame])
+                for i in range(n_bins)
+            ]
+
+        radial = get_radial(center="4,3", bins=4)
+        assert radial.shape == (3, 4)
+        for frame in range(3):
+            assert np.allclose(radial[frame], expected(frame, bin_map, 4))
+
+        # Masked pixels are ignored
+        masked_valid = valid & (mask == 0)
+        radial = get_radial(
+            center="4,3", bins=4, selection="1", mask="/entry/mask", format_arg="json"
+        )
+        assert np.allclose(radial, expected(1, bin_map, 4, masked_valid))
+
+        # Sectors turn from increasing columns towards increasing rows: with two sectors,
+        # the first one holds rows greater than the center and the second one the others
+        radial = get_radial(center="4.5,3", bins=4, sectors=2, selection="0:2")
+        assert radial.shape == (2, 2, 4)
+        radius = np.hypot(rows - 4.5, cols - 3)
+        bin_map = np.minimum((radius * 4 / radius.max()).astype(int), 3)
+        sector_map = bin_map + 4 * (rows < 4.5)
+        for frame in range(2):
+            assert np.allclose(
+                radial[frame].ravel(), expected(frame, sector_map, 8), equal_nan=True
+            )
+
+    def test_422_on_invalid_radial_args(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["image"] = np.zeros((4, 3))
+
+        for query in (
+            "",
+            "&center=1",
+            "&center=1,1&bins=0",
+            "&center=1,1&sectors=-1",
+            "&center=1,nan",
+        ):
+            server.assert_error_code(f"/radial?file={filename}&path=/image{query}", 422)
+
     def test_stats_on_negative_scalar(self, server):
         tested_h5entity_path = "/entry/data"
         h5data = -10
@@ -509,6 +1606,97 @@ class BaseTestEndpoints:
         retrieved_stats = decode_response(response)
         assert retrieved_stats == expected_stats
 
+    def test_stats_with_mask(self, server):
+        tested_h5entity_path = "/entry/frames"
+        frames = np.arange(2 * 3 * 3, dtype="<f4").reshape(2, 3, 3)
+        frames[0, 0, 0] = np.nan
+        mask = np.zeros((3, 3), dtype="<u1")
+        mask[2, :] = 1  # Mask last row of all frames
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = frames
+            h5file["/entry/mask"] = mask
+        with h5py.File(server.served_directory / "mask.h5", mode="w") as h5file:
+            h5file["/pixel_mask"] = mask
+
+        valid = frames[:, :2, :][np.isfinite(frames[:, :2, :])]
+        expected_stats = {
+            "strict_positive_min": 1,
+            "positive_min": 1,
+            "min": 1,
+            "max": float(valid.max()),
+            "mean": float(valid.mean()),
+            "std": float(valid.std()),
+        }
+
+        for mask_arg in ("/entry/mask", "mask.h5::/pixel_mask"):
+            response = server.get(
+                f"/stats?{urlencode({'file': filename, 'path': tested_h5entity_path, 'mask': mask_arg})}"
+            )
+            retrieved_stats = decode_response(response)
+            assert retrieved_stats == pytest.approx(expected_stats)
+
+        # Mask is applied to the selected slice of frames
+        response = server.get(
+            f"/stats?{urlencode({'file': filename, 'path': tested_h5entity_path, 'mask': '/entry/mask', 'selection': '1, 1:'})}"
+        )
+        retrieved_stats = decode_response(response)
+        assert retrieved_stats["min"] == 12
+        assert retrieved_stats["max"] == 14
+
+    def test_stats_with_fields(self, server):
+        tested_h5entity_path = "/entry/events"
+        data = np.zeros(4, dtype=[("x", "<i4"), ("name", "S4"), ("y", "<f8")])
+        data["x"] = [3, -1, 0, 2]
+        data["y"] = [0.5, np.nan, 1.5, 4]
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file[tested_h5entity_path] = data
+
+        # Stats of all numeric fields by default
+        response = server.get(f"/stats?file={filename}&path={tested_h5entity_path}")
+        retrieved_stats = decode_response(response)
+        assert set(retrieved_stats) == {"x", "y"}
+        assert retrieved_stats["x"]["min"] == -1
+        assert retrieved_stats["x"]["max"] == 3
+        assert retrieved_stats["y"]["mean"] == pytest.approx(2)
+
+        response = server.get(
+            f"/stats?{urlencode({'file': filename, 'path': tested_h5entity_path, 'fields': 'y', 'selection': '2:'})}"
+        )
+        retrieved_stats = decode_response(response)
+        assert list(retrieved_stats) == ["y"]
+        assert retrieved_stats["y"]["min"] == 1.5
+
+    def test_422_on_mask_outside_of_directory(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["data"] = np.zeros((4, 3))
+        with h5py.File(server.served_directory.parent / "mask.h5", mode="w") as h5file:
+            h5file["mask"] = np.zeros((3,))
+
+        for mask_arg in (
+            "../mask.h5::/mask",
+            f"{server.served_directory.parent / 'mask.h5'}::/mask",
+        ):
+            server.assert_error_code(
+                f"/stats?{urlencode({'file': filename, 'path': '/data', 'mask': mask_arg})}",
+                422,
+            )
+
+    def test_422_on_stats_with_mismatching_mask(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["data"] = np.zeros((4, 3))
+            h5file["mask"] = np.zeros((4,))
+
+        server.assert_error_code(
+            f"/stats?file={filename}&path=/data&mask=/mask",
+            422,
+        )
+
     def test_paths(self, server):
         filename = "test.h5"
 
@@ -545,6 +1733,52 @@ class BaseTestEndpoints:
             "/tree/branch/fruit_2",
         ]
 
+    def test_peaks(self, server):
+        tested_h5entity_path = "/entry/frames"
+        frames = np.zeros((3, 16, 16), dtype="<f4")
+        frames[0, 4, 4] = 10
+        frames[0, 4, 5] = 9  # Next to the first peak
+        frames[1, 10, 12] = 8
+        frames[2, 1, 1] = 7
+        frames[2, 15, 15] = 100  # Hot pixel
+        mask = np.zeros((16, 16), dtype="<u1")
+        mask[15, 15] = 1
+
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file.create_dataset(tested_h5entity_path, data=frames, chunks=(1, 8, 8))
+            h5file["/entry/mask"] = mask
+
+        def get_peaks(**params):
+            response = server.get(
+                f"/peaks?{urlencode({'file': filename, 'path': tested_h5entity_path, **params})}"
+            )
+            return decode_response(response)
+
+        assert get_peaks(k=3) == {
+            "values": [100, 10, 9],
+            "indices": [[2, 15, 15], [0, 4, 4], [0, 4, 5]],
+        }
+        assert get_peaks(k=3, radius=2, mask="/entry/mask") == {
+            "values": [10, 8, 7],
+            "indices": [[0, 4, 4], [1, 10, 12], [2, 1, 1]],
+        }
+        assert get_peaks(k=1, selection="1:,::2") == {
+            "values": [8],
+            "indices": [[1, 10, 12]],
+        }
+
+    def test_422_on_invalid_peaks_args(self, server):
+        filename = "test.h5"
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["data"] = np.zeros((4, 3))
+            h5file["text"] = "not numeric"
+
+        server.assert_error_code(f"/peaks?file={filename}&path=/data&k=0", 422)
+        server.assert_error_code(f"/peaks?file={filename}&path=/data&radius=-1", 422)
+        server.assert_error_code(f"/peaks?file={filename}&path=/data&radius=101", 422)
+        server.assert_error_code(f"/peaks?file={filename}&path=/text", 422)
+
     def test_404_on_non_existing_path(self, server):
         filename = "test.h5"
         not_a_path = "not_a_path"
@@ -653,6 +1887,21 @@ class BaseTestEndpoints:
             422,
         )
 
+    def test_data_on_empty_dataset_in_bin(self, server):
+        filename = "test.h5"
+
+        with h5py.File(server.served_directory / filename, mode="w") as h5file:
+            h5file["empty"] = h5py.Empty(dtype="<f4")
+
+        response = server.get(f"/data?file={filename}&path=/empty&format=bin")
+        assert response.content == b""
+        assert response.find_header_value("X-H5grove-Shape") == "null"
+        assert response.find_header_value("X-H5grove-Dtype") == "<f4"
+
+        response = server.head(f"/data?file={filename}&path=/empty&format=bin")
+        assert response.find_header_value("Content-Length") == "0"
+        assert response.find_header_value("X-H5grove-Exact-Length") == "true"
+
     @pytest.mark.parametrize("format_arg", ("csv", "tiff"))
     def test_422_on_format_incompatible_with_empty_or_scalar_datasets(
         self, server, format_arg
@@ -8,7 +8,7 @@ import sys
 import time
 from collections.abc import Callable
 from urllib.error import HTTPError
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
 
 import pytest
 from utils import Response, assert_error_response
@@ -27,7 +27,13 @@ class BaseServer:
         """Root directory served by the running server"""
         return self.__served_dir
 
-    def _get_response(self, url: str, benchmark: Callable) -> Response:
+    def _get_response(
+        self,
+        url: str,
+        benchmark: Callable,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Response:
         """Override in subclass to implement fetching response"""
         raise NotImplementedError()
 
@@ -49,6 +55,21 @@ class BaseServer:
 
         return response
 
+    def head(self, url: str) -> Response:
+        """Request url with the HEAD method and return retrieved response"""
+        response = self._get_response(url, lambda f: f(), "HEAD")
+
+        assert response.status == 200
+        assert response.content == b""
+        return response
+
+    def post(self, url: str, body: bytes) -> Response:
+        """Request url with the POST method and return retrieved response"""
+        response = self._get_response(url, lambda f: f(), "POST", body)
+
+        assert response.status == 200
+        return response
+
     def assert_error_code(self, url: str, error_code: int):
         assert_error_response(self._get_response(url, lambda f: f()), error_code)
 
@@ -63,8 +84,16 @@ class SubprocessServer(BaseServer):
         super().__init__(served_dir)
         self.__base_url = base_url
 
-    def _get_response(self, url: str, benchmark: Callable) -> Response:
-        r = benchmark(lambda: urlopen(self.__base_url + url))
+    def _get_response(
+        self,
+        url: str,
+        benchmark: Callable,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Response:
+        r = benchmark(
+            lambda: urlopen(Request(self.__base_url + url, data=body, method=method))
+        )
         return Response(status=r.status, headers=r.headers.items(), content=r.read())
 
     def assert_error_code(self, url: str, error_code: int):
@@ -17,6 +17,7 @@ BENCHMARKS = dict(
     for dtype in ("float32",)
     for size in (64, 128, 256, 512, 1024)
 )
+BENCHMARKS["/1024square_complex64"] = 1024, "complex64"
 
 
 @pytest.fixture(scope="module")
@@ -29,7 +30,10 @@ def h5filepath(subprocess_server) -> Generator[pathlib.Path, None, None]:
 
     with h5py.File(filepath, mode="w") as h5file:
         for name, (size, dtype) in BENCHMARKS.items():
-            h5file[name] = np.random.random((size, size)).astype(dtype)
+            data = np.random.random((size, size))
+            if np.dtype(dtype).kind == "c":
+                data = data + 1j * np.random.random((size, size))
+            h5file[name] = data.astype(dtype)
 
     yield filepath
 
@@ -0,0 +1,134 @@
+import h5py
+import numpy as np
+import pytest
+
+from h5grove import decoding
+from h5grove.chunks import CHUNK_INDEX_CACHE
+from h5grove.content import create_content
+from h5grove.decoding import _unshuffle, decode_chunk, get_filter_ids, read_decoded
+from h5grove.utils import QueryArgumentError, get_dataset_slice
+
+
+@pytest.mark.parametrize(
+    "selection",
+    [None, "::3,5:17", "3,2:40:4", "-1", "1:2,3:4"],
+)
+def test_read_decoded(tmp_path, selection):
+    data = np.arange(40 * 50, dtype="<f4").reshape(40, 50)
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file.create_dataset(
+            "compressed", data=data, chunks=(8, 16), compression="gzip", shuffle=True
+        )
+
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        dataset = h5file["compressed"]
+        selected = read_decoded(dataset, selection)
+        if selected is None:
+            # Selection within a single chunk
+            assert selection == "1:2,3:4"
+        else:
+            expected = get_dataset_slice(dataset, selection)
+            assert selected.dtype == expected.dtype
+            assert np.array_equal(selected, expected)
+
+
+def test_read_decoded_strided_selections(tmp_path):
+    data = np.arange(23 * 17, dtype="<i4").reshape(23, 17)
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file.create_dataset(
+            "compressed", data=data, chunks=(6, 5), compression="gzip"
+        )
+
+    rng = np.random.default_rng(0)
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        dataset = h5file["compressed"]
+        # Ranges ending in a chunk without selected elements
+        selections = ["10:13:3", "0:13:4,1:12:5"]
+        for _ in range(200):
+            starts = rng.integers(0, [23, 17])
+            stops = rng.integers(starts, [24, 18])
+            steps = rng.integers(1, 8, size=2)
+            selections.append(
+                ",".join(f"{a}:{b}:{c}" for a, b, c in zip(starts, stops, steps))
+            )
+        for selection in selections:
+            selected = read_decoded(dataset, selection)
+            if selected is not None:
+                assert np.array_equal(
+                    selected, get_dataset_slice(dataset, selection)
+                ), selection
+
+
+def test_data_with_parallel_decoding(tmp_path, monkeypatch):
+    monkeypatch.setattr(decoding, "MAX_WORKERS", 4)
+    data = np.arange(20 * 10, dtype="<f8").reshape(20, 10)
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file.create_dataset(
+            "compressed", data=data, chunks=(6, 5), compression="gzip"
+        )
+
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        content = create_content(h5file, "/compressed")
+        assert np.array_equal(content.data("10:13:3"), data[10:13:3])
+        assert np.array_equal(
+            content.data("::5,1:9:3", flatten=True), data[::5, 1:9:3].ravel()
+        )
+        assert content.data_stats("1:16:4")["max"] == data[13].max()
+
+
+def test_read_decoded_unstored_and_unfiltered_chunks(tmp_path):
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        dataset = h5file.create_dataset(
+            "partial",
+            shape=(30,),
+            dtype=">i8",
+            chunks=(10,),
+            compression="gzip",
+            fillvalue=-1,
+        )
+        dataset[:10] = np.arange(10)
+        # Chunk stored without applying the deflate filter
+        dataset.id.write_direct_chunk(
+            (20,), np.arange(20, 30, dtype=">i8").tobytes(), filter_mask=1
+        )
+
+    CHUNK_INDEX_CACHE.clear()
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        dataset = h5file["partial"]
+        assert get_filter_ids(dataset) == [h5py.h5z.FILTER_DEFLATE]
+        assert np.array_equal(read_decoded(dataset, "2:28:3"), dataset[2:28:3])
+        assert np.array_equal(read_decoded(dataset, None), dataset[()])
+        # Chunks are looked up without reading the whole chunk index
+        assert len(CHUNK_INDEX_CACHE) == 0
+
+        with pytest.raises(QueryArgumentError):
+            read_decoded(dataset, "1,2")
+
+
+def test_read_decoded_fallback(tmp_path):
+    data = np.arange(100, dtype="<i2")
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file["contiguous"] = data
+        h5file.create_dataset("lzf", data=data, chunks=(10,), compression="lzf")
+        h5file.create_dataset("fletcher32", data=data, chunks=(10,), fletcher32=True)
+        h5file.create_dataset("strings", data=[b"a"] * 10, chunks=(2,))
+        h5file.create_dataset("empty", shape=(0,), maxshape=(None,), dtype="<f4")
+
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        for name in h5file:
+            assert read_decoded(h5file[name], None) is None
+
+
+def test_unshuffle():
+    # The shuffle filter leaves the bytes after the last whole element in place
+    unshuffled = _unshuffle(np.array([0, 2, 4, 1, 3, 5, 6], dtype=np.uint8), 2)
+    assert unshuffled.tolist() == [0, 1, 2, 3, 4, 5, 6]
+
+    decoded = decode_chunk(
+        bytes([0, 2, 4, 1, 3, 5]), 0, [h5py.h5z.FILTER_SHUFFLE], np.dtype("<u2"), (3,)
+    )
+    assert decoded.tolist() == [256, 770, 1284]
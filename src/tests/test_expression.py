@@ -0,0 +1,63 @@
+import h5py
+import numpy as np
+import pytest
+
+from h5grove import expression
+from h5grove.expression import ExpressionContent
+from h5grove.utils import QueryArgumentError
+
+
+@pytest.fixture
+def h5file(tmp_path):
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file.create_dataset(
+            "stack", data=np.arange(10 * 4 * 3).reshape(10, 4, 3), chunks=(3, 4, 3)
+        )
+        h5file["monitor"] = np.linspace(1, 2, 10)
+        h5file["flat"] = np.full((4, 3), 2.0)
+        yield h5file
+
+
+@pytest.mark.parametrize("use_numexpr", (True, False))
+def test_expression_evaluated_by_blocks(h5file, monkeypatch, use_numexpr):
+    if not use_numexpr:
+        monkeypatch.setattr(expression, "numexpr", None)
+
+    # Blocks of one row, aligned on chunks of 3 rows
+    content = ExpressionContent(
+        h5file,
+        "'/stack'[1::1] * '/flat' / '/monitor'[1:, None, None]",
+        block_size=1,
+    )
+    blocks = [block for block, _ in content.iter_blocks()]
+    assert blocks == [slice(0, 2), slice(2, 5), slice(5, 8), slice(8, 9)]
+
+    stack = h5file["stack"][()]
+    expected = stack[1:] * 2.0 / h5file["monitor"][1:][:, None, None]
+    assert content.shape == expected.shape
+    assert np.allclose(content.data(), expected)
+    assert content.data_stats()["mean"] == pytest.approx(expected.mean())
+
+
+def test_expression_on_scalar_result(h5file):
+    content = ExpressionContent(h5file, "-'/stack'[2, 3, -1]")
+    assert content.shape == ()
+    assert content.data() == -h5file["stack"][2, 3, 2]
+
+
+@pytest.mark.parametrize("reduction", ("mean", "max"))
+def test_expression_binned_by_blocks(h5file, reduction):
+    # Blocks of 2, 3, 3 and 1 rows, which do not match bins of 2 rows
+    content = ExpressionContent(h5file, "'/stack'[1:] - 1", block_size=1)
+
+    binned = content.data(binning="2,3,2", reduction=reduction)
+
+    expected = (h5file["stack"][1:] - 1)[:8, :3, :2].reshape(4, 2, 1, 3, 1, 2)
+    expected = getattr(expected, reduction)(axis=(1, 3, 5))
+    assert binned.dtype == expected.dtype
+    assert np.array_equal(binned, expected)
+
+    with pytest.raises(QueryArgumentError):
+        content.data(binning="2,2")
+    with pytest.raises(QueryArgumentError):
+        ExpressionContent(h5file, "-'/stack'[2, 3, -1]").data(binning="")
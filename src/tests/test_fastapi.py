@@ -22,8 +22,14 @@ class _FastApiServer(BaseServer):
         super().__init__(served_dir)
         self.__client = client
 
-    def _get_response(self, url: str, benchmark: Callable) -> Response:
-        r = benchmark(lambda: self.__client.get(url))
+    def _get_response(
+        self,
+        url: str,
+        benchmark: Callable,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Response:
+        r = benchmark(lambda: self.__client.request(method, url, content=body))
         return Response(
             status=r.status_code,
             headers=r.headers.items(),
@@ -23,8 +23,14 @@ class _FlaskServer(BaseServer):
         super().__init__(served_dir)
         self.__client = client
 
-    def _get_response(self, url: str, benchmark: Callable) -> Response:
-        r = benchmark(lambda: self.__client.get(url))
+    def _get_response(
+        self,
+        url: str,
+        benchmark: Callable,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Response:
+        r = benchmark(lambda: self.__client.open(url, method=method, data=body))
         return Response(
             status=r.status_code, headers=list(r.headers), content=r.get_data()
         )
@@ -0,0 +1,50 @@
+import h5py
+import numpy as np
+import pytest
+
+from h5grove.memmap import get_memmap_offset, read_memmap_slice
+from h5grove.utils import QueryArgumentError
+
+
+def test_read_memmap_slice(tmp_path):
+    data = np.arange(60, dtype=">i4").reshape(6, 10)
+
+    with h5py.File(tmp_path / "test.h5", "w", userblock_size=512) as h5file:
+        h5file["contiguous"] = data
+        h5file["scalar"] = 4.5
+
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        dataset = h5file["contiguous"]
+        selected = read_memmap_slice(dataset, "1:5:2, -3")
+        assert selected is not None
+        assert selected.dtype == data.dtype
+        assert np.array_equal(selected, data[1:5:2, -3])
+        # Selected data is copied out of the mapped file
+        assert selected.flags.owndata
+        assert selected.base is None
+
+        assert read_memmap_slice(h5file["scalar"], None) == 4.5
+
+        with pytest.raises(QueryArgumentError):
+            read_memmap_slice(dataset, "1, 2, 3")
+
+
+def test_memmap_fallback(tmp_path):
+    with h5py.File(tmp_path / "test.h5", "w", userblock_size=512) as h5file:
+        h5file.create_dataset("chunked", data=np.arange(10), chunks=(5,))
+        h5file.create_dataset("compressed", data=np.arange(10), compression="gzip")
+        h5file.create_dataset("unallocated", shape=(10,), dtype="<f4")
+        h5file.create_dataset("empty", shape=(0,), dtype="<f4")
+        h5file["strings"] = np.array([b"a", b"bc"])
+        h5file.create_dataset("compound", data=np.zeros(2, dtype="<i4,<f8"))
+
+    with h5py.File(tmp_path / "test.h5", "r") as h5file:
+        for name in h5file:
+            assert get_memmap_offset(h5file[name]) is None
+            assert read_memmap_slice(h5file[name], None) is None
+
+    with h5py.File(
+        tmp_path / "core.h5", "w", driver="core", backing_store=False
+    ) as h5file:
+        h5file["contiguous"] = np.arange(10)
+        assert get_memmap_offset(h5file["contiguous"]) is None
@@ -0,0 +1,92 @@
+import h5py
+import numpy as np
+import pytest
+
+from h5grove.query import Predicate, count_matching_rows, filter_rows
+from h5grove.utils import QueryArgumentError
+
+DTYPE = np.dtype(
+    [("energy", "<f8"), ("detector", "<i2"), ("flagged", "?"), ("label", "S3")]
+)
+
+
+@pytest.fixture
+def table(tmp_path):
+    data = np.zeros(50, dtype=DTYPE)
+    data["energy"] = np.arange(50) / 2
+    data["energy"][7] = np.nan
+    data["detector"] = np.arange(50) % 3
+    data["flagged"] = np.arange(50) % 5 == 0
+    data["label"] = [b"x", b"yz"] * 25
+
+    with h5py.File(tmp_path / "table.h5", mode="w") as h5file:
+        h5file.create_dataset("table", data=data, chunks=(8,))
+    with h5py.File(tmp_path / "table.h5", mode="r") as h5file:
+        yield h5file["table"], data
+
+
+@pytest.mark.parametrize(
+    "predicate,expected",
+    (
+        ("energy > 20", lambda d: d["energy"] > 20),
+        ("-1 < energy <= 3.5", lambda d: (d["energy"] > -1) & (d["energy"] <= 3.5)),
+        (
+            "detector != 0 and not flagged",
+            lambda d: (d["detector"] != 0) & ~d["flagged"],
+        ),
+        ("flagged | (detector == 2)", lambda d: d["flagged"] | (d["detector"] == 2)),
+        ("~(detector in (0, 1))", lambda d: d["detector"] == 2),
+        ("detector not in [1]", lambda d: d["detector"] != 1),
+        ("label == 'yz'", lambda d: d["label"] == b"yz"),
+        ("energy < detector", lambda d: d["energy"] < d["detector"]),
+    ),
+)
+def test_predicate(predicate, expected):
+    data = np.zeros(20, dtype=DTYPE)
+    data["energy"] = np.linspace(-2, 5, 20)
+    data["detector"] = np.arange(20) % 3
+    data["flagged"] = np.arange(20) % 4 == 0
+    data["label"] = [b"x", b"yz"] * 10
+
+    assert np.array_equal(Predicate(predicate, DTYPE).evaluate(data), expected(data))
+
+
+def test_predicate_fields():
+    assert Predicate("energy > 1 or label == 'x'", DTYPE).fields == ["energy", "label"]
+
+
+@pytest.mark.parametrize(
+    "predicate",
+    ("energy", "energy + 1 > 2", "1 < 2", "label > 1", "energy == 'a'", "x > 0", "("),
+)
+def test_invalid_predicate(predicate):
+    with pytest.raises(QueryArgumentError):
+        Predicate(predicate, DTYPE)
+
+
+@pytest.mark.parametrize("block_size", (None, 8 * DTYPE.itemsize, 13 * DTYPE.itemsize))
+def test_filter_rows(table, block_size):
+    dataset, data = table
+    predicate = Predicate("(energy >= 2) & (detector == 1)", DTYPE)
+    expected = np.flatnonzero((data["energy"] >= 2) & (data["detector"] == 1))
+
+    result = filter_rows(dataset, predicate, ["label"], block_size=block_size)
+    assert result.dtype.names == ("index", "label")
+    assert np.array_equal(result["index"], expected)
+    assert np.array_equal(result["label"], data["label"][expected])
+
+    result = filter_rows(
+        dataset, predicate, ["energy"], limit=4, offset=3, block_size=block_size
+    )
+    assert np.array_equal(result["index"], expected[3:7])
+
+    assert count_matching_rows(dataset, predicate, block_size) == len(expected)
+
+
+def test_filter_rows_without_match(table):
+    dataset, _ = table
+    predicate = Predicate("energy > 100", DTYPE)
+
+    assert len(filter_rows(dataset, predicate, ["energy"])) == 0
+    assert len(filter_rows(dataset, Predicate("energy > 0", DTYPE), [], limit=0)) == 0
+    assert count_matching_rows(dataset, predicate) == 0
@@ -0,0 +1,33 @@
+import h5py
+import numpy as np
+
+from h5grove.ragged import is_ragged_dtype, read_ragged
+from h5grove.utils import normalize_selection
+
+
+def test_read_ragged_block_by_block(tmp_path):
+    rows = [np.full(i % 4, i, dtype="<f8") for i in range(12)]
+    data = np.empty((6, 2), dtype=object)
+    data.ravel()[:] = rows
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        dataset = h5file.create_dataset(
+            "ragged", data=data, dtype=h5py.vlen_dtype("<f8"), chunks=(2, 2)
+        )
+        assert is_ragged_dtype(dataset.dtype)
+        assert not is_ragged_dtype(h5py.string_dtype())
+
+        indices = normalize_selection("1:5, 1", dataset.shape)
+        ragged = read_ragged(dataset, indices, block_size=1)
+
+        assert ragged.shape == (4,)
+        expected_rows = [rows[i] for i in (3, 5, 7, 9)]
+        assert ragged.offsets.tolist() == [0, 3, 4, 7, 8]
+        assert np.array_equal(ragged.values, np.concatenate(expected_rows))
+        assert [row.tolist() for row in ragged.to_list()] == [
+            row.tolist() for row in expected_rows
+        ]
+
+        scalar = read_ragged(dataset, normalize_selection("2, 1", dataset.shape))
+        assert scalar.shape == ()
+        assert np.array_equal(scalar.to_list(), rows[5])
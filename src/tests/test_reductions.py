@@ -0,0 +1,162 @@
+import h5py
+import numpy as np
+import pytest
+
+from h5grove import reductions
+from h5grove.utils import normalize_selection
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        yield h5file.create_dataset(
+            "data", data=np.arange(10 * 6).reshape(10, 6), chunks=(4, 6)
+        )
+
+
+def test_iter_selection_blocks(dataset):
+    indices = normalize_selection("1:9, 2", dataset.shape)
+
+    blocks = list(reductions.iter_selection_blocks(dataset, indices, block_size=1))
+
+    # Blocks are made of whole chunks of 4 rows
+    assert blocks == [
+        (0, (slice(1, 4, 1), 2)),
+        (3, (slice(4, 8, 1), 2)),
+        (7, (slice(8, 9, 1), 2)),
+    ]
+
+
+@pytest.mark.parametrize("radius", (0, 1))
+def test_peaks_merged_across_blocks(dataset, monkeypatch, radius):
+    monkeypatch.setattr(reductions, "BLOCK_SIZE", 1)
+    data = dataset[()]
+
+    peaks = reductions.get_peaks(
+        dataset, normalize_selection(None, dataset.shape), k=3, radius=radius
+    )
+
+    if radius == 0:
+        assert peaks == {"values": [59, 58, 57], "indices": [[9, 5], [9, 4], [9, 3]]}
+    else:
+        assert peaks == {"values": [59, 57, 55], "indices": [[9, 5], [9, 3], [9, 1]]}
+    assert peaks["values"] == [data[tuple(index)] for index in peaks["indices"]]
+
+
+@pytest.mark.parametrize("block_size", (8, 1 << 20))
+def test_peaks_do_not_depend_on_blocks(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(reductions, "BLOCK_SIZE", block_size)
+    data = np.zeros(16, dtype="<i8")
+    data[[10, 8, 6]] = [10, 9, 8]
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        dataset = h5file.create_dataset("data", data=data, chunks=(8,))
+        peaks = reductions.get_peaks(
+            dataset, normalize_selection(None, dataset.shape), k=3, radius=2
+        )
+
+    # 9 is discarded by 10, but 8 is not discarded by the discarded 9
+    assert peaks == {"values": [10, 8, 0], "indices": [[10], [6], [0]]}
+
+
+def _greedy_peaks(data: np.ndarray, k: int, radius: int) -> list[tuple[int, ...]]:
+    order = np.argsort(-data.ravel(), kind="stable")
+    coordinates = np.stack(np.unravel_index(order, data.shape), axis=-1)
+    selected: list[np.ndarray] = []
+    for coords in coordinates:
+        if len(selected) == k:
+            break
+        if all(np.max(np.abs(coords - other)) > radius for other in selected):
+            selected.append(coords)
+    return [tuple(coords) for coords in selected]
+
+
+@pytest.mark.parametrize("radius", (0, 1, 3))
+@pytest.mark.parametrize("shape", ((30, 12), (6, 9, 8)))
+def test_peaks_match_greedy_suppression(tmp_path, monkeypatch, radius, shape):
+    monkeypatch.setattr(reductions, "BLOCK_SIZE", 64)
+    data = np.random.default_rng(radius).integers(0, 20, size=shape)
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        dataset = h5file.create_dataset("data", data=data, chunks=(3, *shape[1:]))
+        peaks = reductions.get_peaks(
+            dataset, normalize_selection(None, dataset.shape), k=10, radius=radius
+        )
+
+    assert [tuple(index) for index in peaks["indices"]] == _greedy_peaks(
+        data, 10, radius
+    )
+
+
+def test_peak_candidates_are_capped():
+    assert reductions._get_candidate_count(10, 2, 2) == 250
+    assert (
+        reductions._get_candidate_count(reductions.MAX_PEAKS, 100, 3)
+        == reductions.MAX_PEAK_CANDIDATES
+    )
+
+
+def test_read_pixels(tmp_path):
+    stack = np.random.random((3, 20, 30))
+    rows = np.array([[0, 19], [7, 7]])
+    cols = np.array([[0, 29], [3, 3]])
+
+    with h5py.File(tmp_path / "stack.h5", "w") as h5file:
+        dataset = h5file.create_dataset("stack", data=stack, chunks=(1, 8, 8))
+        pixels = reductions.read_pixels(
+            dataset, normalize_selection("1:", dataset.shape[:-2]), rows, cols
+        )
+
+    assert pixels.shape == (2, 2, 2)
+    assert np.array_equal(pixels, stack[1:, rows, cols])
+
+
+def test_roi_series_cached_per_dataset_version(tmp_path):
+    filepath = tmp_path / "stack.h5"
+    with h5py.File(filepath, "w") as h5file:
+        h5file["stack"] = np.ones((4, 5, 5))
+
+    reductions.ROI_CACHE.clear()
+    for expected in (4, 8):
+        with h5py.File(filepath, "r") as h5file:
+            frame_indices = normalize_selection(None, (4,))
+            series = reductions.get_roi_series(
+                h5file["stack"], frame_indices, ["1:3,0:2"]
+            )
+        assert np.array_equal(series, [[expected] * 4])
+        assert len(reductions.ROI_CACHE) == expected // 4
+
+        with h5py.File(filepath, "a") as h5file:
+            h5file["stack"][...] = 2
+            h5file[f"other{expected}"] = expected  # Changes the file size
+
+
+def test_radial_bins():
+    bin_map, counts = reductions.get_radial_bins((3, 3), (1, 1), bins=2, sectors=4)
+
+    # Center in the first bin, corners at max radius in the last bin of their sector
+    assert bin_map[1, 1] == 0
+    assert bin_map[2, 2] == 1
+    assert bin_map[2, 0] == 2 + 1
+    assert bin_map[0, 0] == 4 + 1
+    assert bin_map[0, 2] == 6 + 1
+    assert counts.sum() == 9 and counts[-1] == 0
+    assert not bin_map.flags.writeable
+
+    mask = np.ones((3, 3), dtype=bool)
+    mask[1, 1] = False
+    bin_map, counts = reductions.get_radial_bins((3, 3), (1, 1), bins=2, mask=mask)
+    assert bin_map[1, 1] == 2 and counts[-1] == 1
+
+
+def test_binned_data_block_by_block(dataset):
+    indices = normalize_selection("1:,::2", dataset.shape)
+
+    binned = reductions.get_binned_data(dataset, indices, (3, 1), "sum")
+
+    expected = dataset[1:10, ::2].reshape(3, 3, 3).sum(axis=1)
+    assert np.array_equal(binned, expected)
+    blocks = list(
+        reductions.iter_selection_blocks(dataset, indices, block_size=1, multiple=3)
+    )
+    assert [offset for offset, _ in blocks] == [0, 3, 6]
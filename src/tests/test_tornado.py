@@ -41,14 +41,22 @@ class _TornadoServer(BaseServer):
         self.__http_client = http_client
         self.__base_url = base_url
 
-    def __fetch(self, url: str):
+    def __fetch(self, url: str, method: str = "GET", body: bytes | None = None):
         """Make a synchronous fetch of given url"""
-        future = self.__http_client.fetch(self.__base_url + url)
+        future = self.__http_client.fetch(
+            self.__base_url + url, method=method, body=body
+        )
         self.__io_loop.run_sync(lambda: future)
         return future.result()
 
-    def _get_response(self, url: str, benchmark: Callable) -> Response:
-        r = benchmark(lambda: self.__fetch(url))
+    def _get_response(
+        self,
+        url: str,
+        benchmark: Callable,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Response:
+        r = benchmark(lambda: self.__fetch(url, method, body))
         return Response(
             status=r.code, headers=list(r.headers.get_all()), content=r.body
         )
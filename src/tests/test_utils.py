@@ -1,7 +1,193 @@
-from h5grove.utils import parse_slice
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from h5grove import cache as cache_module
+from h5grove import content as content_module
+from h5grove import utils
+from h5grove.cache import DiskCache
+from h5grove.chunks import get_selected_chunk_positions
+from h5grove.content import create_content
+from h5grove.encoders import string_bin_encode
+from h5grove.preview import THUMBNAIL_CACHE
+from h5grove.utils import (
+    QueryArgumentError,
+    get_array_stats,
+    normalize_selection,
+    parse_slice,
+)
 
 
 def test_parse_slice():
     assert parse_slice("5") == (5,)
     assert parse_slice("1, 2:5") == (1, slice(2, 5))
     assert parse_slice("0:10:5, 2, 3:") == (slice(0, 10, 5), 2, slice(3, None))
+
+
+def test_normalize_selection():
+    assert normalize_selection(None, (10, 20)) == (slice(0, 10, 1), slice(0, 20, 1))
+    assert normalize_selection("-1,::2", (10, 20)) == (9, slice(0, 20, 2))
+    assert normalize_selection("2:50", (10,)) == (slice(2, 10, 1),)
+
+    with pytest.raises(QueryArgumentError):
+        normalize_selection("1, 2", (10,))
+    with pytest.raises(QueryArgumentError):
+        normalize_selection("10", (10,))
+    with pytest.raises(QueryArgumentError):
+        normalize_selection("::-1", (10,))
+
+
+def test_get_selected_chunk_positions():
+    positions = get_selected_chunk_positions(
+        (10, 4, 5), (slice(5, 25, 1), 6, slice(0, 20, 12))
+    )
+    assert [dim_positions.tolist() for dim_positions in positions] == [
+        [0, 1, 2],
+        [1],
+        [0, 2],
+    ]
+
+    # The last selected index is 27, before the end of the range
+    positions = get_selected_chunk_positions((10,), (slice(0, 35, 9),))
+    assert positions[0].tolist() == [0, 1, 2]
+
+    positions = get_selected_chunk_positions((10,), (slice(5, 5, 1),))
+    assert positions[0].tolist() == []
+
+
+def test_array_stats_with_where():
+    data = np.array([[-2, 0, 3], [5, 7, 9]])
+    where = np.array([True, True, False])
+
+    assert get_array_stats(data, where) == get_array_stats(data[:, :2])
+    assert get_array_stats(data, np.zeros(3, dtype=bool))["min"] is None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set(("b", 1), b"5678")
+    os.utime(cache._get_filepath("a"), ns=(0, 0))
+    os.utime(cache._get_filepath(("b", 1)), ns=(1, 1))
+    assert cache.get("a") == b"1234"  # Marks "a" as recently used
+
+    cache.set("c", b"90")
+    cache.set("d", b"12")
+
+    assert cache.get(("b", 1)) is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"90"
+    assert cache.get("d") == b"12"
+
+    cache.set("too big", b"12345678901")
+    assert cache.get("too big") is None
+
+
+def test_disk_cache_tracks_sizes_in_memory(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    (directory / "previous").write_bytes(b"123456")  # Entry of a previous process
+
+    cache = DiskCache(str(directory), max_bytes=10)
+    cache.set("a", b"1234")
+    assert (directory / "previous").exists()
+
+    # The directory is not listed again
+    monkeypatch.setattr(cache, "_list_entries", lambda: pytest.fail("listed"))
+    cache.set("b", b"12")
+    assert not (directory / "previous").exists()
+    assert cache.get("a") == b"1234"
+    cache.set("a", b"123456789")  # Replaced entries are not counted twice
+    assert cache.get("b") is None
+    assert cache.get("a") == b"123456789"
+
+
+def test_disk_cache_directory_is_private(tmp_path, monkeypatch):
+    exit_callbacks = []
+    monkeypatch.setattr(
+        cache_module.atexit,
+        "register",
+        lambda func, *args, **kwargs: exit_callbacks.append((func, args, kwargs)),
+    )
+    cache = DiskCache(None, max_bytes=10)
+    assert cache.get("a") is None
+    cache.set("a", b"1234")
+    assert cache.directory is not None
+    assert os.stat(cache.directory).st_mode & 0o777 == 0o700
+    assert cache.get("a") == b"1234"
+
+    # The temporary directory is removed at exit
+    for func, args, kwargs in exit_callbacks:
+        func(*args, **kwargs)
+    assert not os.path.exists(cache.directory)
+
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10)
+    cache.set("a", b"1234")
+    assert os.stat(tmp_path / "cache").st_mode & 0o777 == 0o700
+
+
+def test_encoded_previews_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(THUMBNAIL_CACHE, "directory", str(tmp_path / "thumbnails"))
+    rendered = []
+
+    def render_image(*args):
+        rendered.append(args)
+        return np.zeros((2, 3, 4), dtype=np.uint8)
+
+    monkeypatch.setattr(content_module, "render_image", render_image)
+
+    with h5py.File(tmp_path / "test.h5", "w") as h5file:
+        h5file["image"] = np.arange(6.0).reshape(2, 3)
+        content = create_content(h5file, "/image")
+
+        png = content.encoded_preview(format_arg="png")
+        assert png.headers["Content-Type"] == "image/png"
+        cached = content.encoded_preview(format_arg="png")
+        assert cached.content == png.content
+        assert cached.headers == png.headers
+        assert len(rendered) == 1
+
+        # Previews are cached per format
+        npy = content.encoded_preview(format_arg="npy")
+        assert npy.content != png.content
+        assert len(rendered) == 2
+
+
+def test_quantize_block_by_block(monkeypatch):
+    monkeypatch.setattr(utils, "QUANTIZATION_BLOCK_LENGTH", 3)
+    data = np.array([[-1.0, np.nan, 0.5], [1.0, np.inf, 0.0], [3.0, 2.0, -np.inf]])
+
+    quantized = utils.quantize(data, "uint8", "-1,1")
+
+    assert quantized.quantization == {
+        "dtype": "uint8",
+        "scale": 2 / 254,
+        "offset": -1.0,
+        "nan": 255,
+    }
+    assert np.array_equal(quantized, [[0, 255, 190], [254, 254, 127], [254, 254, 0]])
+    assert np.ravel(quantized).quantization == quantized.quantization
+
+
+@pytest.mark.parametrize(
+    "array",
+    (
+        np.array([["é", ""], ["abc", "日本"]]),
+        np.array([b"a\x00b", b"", b"xyz"])[::-1],
+        np.array(["a", b"bc"], dtype=object),
+        np.array([], dtype="U3"),
+    ),
+)
+def test_string_bin_encode(array):
+    strings = [
+        value if isinstance(value, bytes) else value.encode()
+        for value in array.ravel().tolist()
+    ]
+
+    encoded = string_bin_encode(array)
+
+    offsets = np.frombuffer(encoded[: 8 * (len(strings) + 1)], dtype="<i8")
+    assert offsets.tolist() == [0, *np.cumsum([len(s) for s in strings]).tolist()]
+    assert encoded[8 * (len(strings) + 1) :] == b"".join(strings)
@@ -0,0 +1,119 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from h5grove import workers
+from h5grove.content import get_content_from_file
+from h5grove.utils import QueryArgumentError, quantize
+from h5grove.workers import ReaderPool, get_reader_pool, set_reader_pool
+
+
+def create_error(status_code: int, message: str):
+    return Exception(status_code, message)
+
+
+@pytest.fixture(scope="module")
+def reader_pool():
+    with ReaderPool(processes=2) as pool:
+        set_reader_pool(pool)
+        yield pool
+        set_reader_pool(None)
+
+
+def test_reader_pool(tmp_path, reader_pool):
+    assert get_reader_pool() is reader_pool
+    filepath = str(tmp_path / "test.h5")
+    data = np.arange(300 * 400, dtype="<f8").reshape(300, 400)
+
+    with h5py.File(filepath, "w") as h5file:
+        h5file["big"] = data
+        h5file["small"] = np.arange(10, dtype="<i2")
+        h5file["links/soft"] = h5py.SoftLink("/small")
+        h5file["string"] = b"abc"
+
+    with get_content_from_file(filepath, "/big", create_error) as content:
+        # Returned through shared memory
+        assert np.array_equal(content.data("10:200,::3"), data[10:200, ::3])
+        assert content.data_stats("0")["max"] == 399
+        assert np.array_equal(
+            content.data(binning="2,2", reduction="max").shape, (150, 200)
+        )
+
+        # Quantization is returned with quantized arrays, through shared memory or not
+        for selection, expected in ((None, data), ("0", data[0])):
+            quantized = content.data(selection, dtype="uint8")
+            assert quantized.dtype == np.uint8
+            assert quantized.quantization == quantize(expected, "uint8").quantization
+
+    with get_content_from_file(filepath, "/links/soft", create_error) as content:
+        small = content.data(dtype="safe")
+        assert small.dtype == np.int16
+        assert np.array_equal(small, np.arange(10))
+
+    with get_content_from_file(filepath, "/string", create_error) as content:
+        with pytest.raises(
+            QueryArgumentError, match="/string is not a numeric dataset"
+        ):
+            content.peaks()
+
+    # Files modified on disk are reopened by workers
+    with h5py.File(filepath, "a") as h5file:
+        h5file["small"][0] = 100
+        h5file["other"] = np.zeros(1000)
+
+    with get_content_from_file(filepath, "/small", create_error) as content:
+        assert content.data("0") == 100
+
+
+def test_reader_pool_with_h5py_options(tmp_path, reader_pool, monkeypatch):
+    filepath = str(tmp_path / "test.h5")
+    with h5py.File(filepath, "w") as h5file:
+        h5file["data"] = np.arange(10)
+
+    forwarded_options = []
+    run = reader_pool.run
+
+    def recording_run(*args):
+        forwarded_options.append(args[-1])
+        return run(*args)
+
+    monkeypatch.setattr(reader_pool, "run", recording_run)
+
+    options = {"rdcc_nbytes": 1024, "locking": False}
+    with get_content_from_file(
+        filepath, "/data", create_error, h5py_options=options
+    ) as content:
+        assert np.array_equal(content.data(), np.arange(10))
+    assert forwarded_options == [options]
+
+
+def test_worker_opens_files_with_h5py_options(tmp_path):
+    filepath = str(tmp_path / "test.h5")
+    with h5py.File(filepath, "w") as h5file:
+        h5file["data"] = np.arange(10)
+
+    try:
+        with_options = workers._get_file(filepath, {"rdcc_nbytes": 1024})
+        assert with_options.id.get_access_plist().get_cache()[2] == 1024
+        default = workers._get_file(filepath, {})
+        assert default is not with_options
+        assert workers._get_file(filepath, {"rdcc_nbytes": 1024}) is with_options
+        assert workers._get_file(filepath, {}) is default
+    finally:
+        while workers._open_files:
+            workers._open_files.popitem()[1].close()
+
+
+def test_reader_pool_affinity(tmp_path, reader_pool):
+    filepath = tmp_path / "test.h5"
+    os.symlink(filepath, tmp_path / "link.h5")
+
+    assert reader_pool.get_worker_index(filepath) == reader_pool.get_worker_index(
+        tmp_path / "link.h5"
+    )
+    assert {reader_pool.get_worker_index(tmp_path / f"{i}.h5") for i in range(20)} == {
+        0,
+        1,
+    }
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import io
 import json
+import struct
+import zlib
 from typing import NamedTuple
 
 import numpy as np
@@ -50,9 +52,43 @@ def decode_response(response: Response, format: str = "json"):
     if format == "tiff":
         assert content_type == "image/tiff"
         return tifffile.imread(io.BytesIO(response.content))
+    if format == "png":
+        assert content_type == "image/png"
+        return decode_png(response.content)
+    if format == "arrow":
+        import pyarrow.ipc
+
+        assert content_type == "application/vnd.apache.arrow.stream"
+        return pyarrow.ipc.open_stream(response.content).read_all()
     raise ValueError(f"Unsupported format: {format}")
 
 
+def decode_png(content: bytes) -> np.ndarray:
+    """Decode 8-bit PNG images using no or sub filters"""
+    assert content[:8] == b"\x89PNG\r\n\x1a\n"
+    position = 8
+    chunks: dict[bytes, bytes] = {}
+    while position < len(content):
+        (length,) = struct.unpack(">I", content[position : position + 4])
+        chunk_type = content[position + 4 : position + 8]
+        chunks[chunk_type] = (
+            chunks.get(chunk_type, b"") + content[position + 8 : position + 8 + length]
+        )
+        position += length + 12
+
+    width, height, _, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    channels = {0: 1, 2: 3, 6: 4}[color_type]
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    rows = rows.reshape(height, width * channels + 1)
+    filters, pixels = rows[:, 0], rows[:, 1:].copy()
+    assert np.all(np.isin(filters, (0, 1)))
+    for column in range(channels, pixels.shape[1]):
+        pixels[filters == 1, column] += pixels[filters == 1, column - channels]
+
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return pixels.reshape(shape)
+
+
 def decode_array_response(
     response: Response,
     format: str,
@@ -64,6 +100,8 @@ def decode_array_response(
 
     if format == "bin":
         assert content_type == "application/octet-stream"
+        assert json.loads(response.find_header_value("X-H5grove-Shape")) == list(shape)
+        assert np.dtype(response.find_header_value("X-H5grove-Dtype")) == dtype
         return np.frombuffer(response.content, dtype=dtype).reshape(shape)
 
     return np.asarray(decode_response(response, format))